@@ -0,0 +1,97 @@
+# Benchmark A/B de la capa de datos: UserConnection (hilos) vs AsyncUserConnection (event loop).
+#
+# Uso:
+#   python -m benchmarks.async_vs_sync --peticiones 2000 --concurrencia 40 --pool 10
+#
+# Ambas variantes corren con las mismas peticiones en vuelo (--concurrencia: hilos
+# en la variante sync, tareas en la async) y el mismo pool de conexiones (--pool),
+# así la diferencia es solo el modelo de ejecución. 40 es el threadpool de
+# Starlette por defecto (anyio), el límite real de los endpoints síncronos.
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from model.async_user_connection import AsyncUserConnection
+from model.user_connection import UserConnection
+
+
+def _llamadas(n, user_id, exercise_id):
+    # Mezcla de las rutas de solo lectura que pasaron a ser corrutinas
+    nombres = ["get_user_routine", "get_user_progress", "get_trainers_by_specialty", "fetch_exercise_by_id"]
+    for i in range(n):
+        nombre = nombres[i % len(nombres)]
+        if nombre == "get_trainers_by_specialty":
+            yield nombre, ()
+        elif nombre == "fetch_exercise_by_id":
+            yield nombre, (exercise_id,)
+        else:
+            yield nombre, (user_id,)
+
+
+def _resumen(etiqueta, latencias, total):
+    latencias = sorted(latencias)
+    p = lambda q: latencias[min(len(latencias) - 1, int(q * len(latencias)))] * 1000
+    print(
+        f"{etiqueta:>6}: {len(latencias) / total:8.1f} req/s  "
+        f"p50={p(0.50):7.2f} ms  p95={p(0.95):7.2f} ms  p99={p(0.99):7.2f} ms  "
+        f"media={statistics.mean(latencias) * 1000:7.2f} ms"
+    )
+
+
+def bench_sync(args):
+    conn = UserConnection(min_size=args.pool, max_size=args.pool)
+    conn.pool.wait()
+
+    def llamar(item):
+        nombre, params = item
+        inicio = time.perf_counter()
+        getattr(conn, nombre)(*params)
+        return time.perf_counter() - inicio
+
+    try:
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrencia) as executor:
+            latencias = list(executor.map(llamar, _llamadas(args.peticiones, args.user_id, args.exercise_id)))
+        _resumen("sync", latencias, time.perf_counter() - inicio)
+    finally:
+        conn.close()
+
+
+async def bench_async(args):
+    aconn = AsyncUserConnection(min_size=args.pool, max_size=args.pool)
+    await aconn.open()
+    await aconn.pool.wait()
+    semaforo = asyncio.Semaphore(args.concurrencia)
+
+    async def llamar(item):
+        nombre, params = item
+        async with semaforo:
+            inicio = time.perf_counter()
+            await getattr(aconn, nombre)(*params)
+            return time.perf_counter() - inicio
+
+    try:
+        inicio = time.perf_counter()
+        latencias = await asyncio.gather(*(llamar(item) for item in _llamadas(args.peticiones, args.user_id, args.exercise_id)))
+        _resumen("async", latencias, time.perf_counter() - inicio)
+    finally:
+        await aconn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark A/B sync vs async de la capa de datos")
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=40, help="peticiones en vuelo (igual para ambas variantes)")
+    parser.add_argument("--pool", type=int, default=10, help="conexiones del pool (igual para ambas variantes)")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--exercise-id", type=int, default=1)
+    args = parser.parse_args()
+
+    bench_sync(args)
+    asyncio.run(bench_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Costo por llamada de las consultas frecuentes de UserConnection contra PostgreSQL,
+# según cómo se preparan las sentencias (model/queries.py).
+#
+# Uso:
+#   python -m benchmarks.consultas                       # usa DATABASE_URL
+#   python -m benchmarks.consultas --variantes sin_preparar registro
+#   python -m benchmarks.consultas --guardar benchmarks/baselines/consultas.json
+#   python -m benchmarks.consultas --comparar benchmarks/baselines/consultas.json
+#
+# Variantes:
+#   sin_preparar  ninguna sentencia preparada (DB_PREPARED_STATEMENTS=false, p. ej. PgBouncer)
+#   umbral        solo el prepare_threshold de psycopg (se preparan tras 5 ejecuciones
+#                 en cada conexión): el comportamiento anterior al registro
+#   registro      las consultas marcadas como preparadas se preparan en la primera ejecución
+#
+# Cada variante usa su propio pool de una conexión, así todas las llamadas caen en
+# la misma sesión. Se mide una sola hebra y sin red (socket local): la diferencia
+# es el parseo y la planificación del servidor más la construcción de las filas.
+# pico_kb es la memoria de Python asignada en el pico de una llamada (tracemalloc).
+# conexion_nueva mide las primeras --primeras llamadas de cada consulta frecuente
+# tras reemplazar la conexión (reinicio del pool o max_idle), donde umbral todavía
+# no preparó nada.
+import argparse
+import sys
+import time
+import tracemalloc
+
+from benchmarks import resultados
+from model.user_connection import UserConnection
+
+VARIANTES = ("sin_preparar", "umbral", "registro")
+CALIENTES = ("get_user_by_email", "get_user_by_id", "get_user_routine", "fetch_exercise_by_id")
+
+
+def _conexion(variante: str):
+    conn = UserConnection(min_size=1, max_size=1, preparar=variante != "sin_preparar")
+    if variante == "umbral":
+        # Pool con el umbral por defecto, pero sin forzar prepare=True
+        conn.preparar = False
+    conn.pool.wait()
+    return conn
+
+
+def _datos(conn: UserConnection):
+    # Un socio con rutina y un ejercicio reales; el benchmark no escribe
+    with conn.pool.connection() as c:
+        fila = c.execute("""
+            SELECT u.id, u.email
+            FROM usuarios u
+            WHERE EXISTS (SELECT 1 FROM usuario_rutinas r WHERE r.usuario_id = u.id)
+            LIMIT 1
+        """).fetchone()
+        ejercicio = c.execute("SELECT id FROM ejercicios LIMIT 1").fetchone()
+    if fila is None or ejercicio is None:
+        raise SystemExit("La base no tiene socios con rutina o ejercicios; corre antes benchmarks.load --backend postgres")
+    return fila[0], fila[1], ejercicio[0]
+
+
+def _casos(conn: UserConnection, user_id: int, email: str, exercise_id: int):
+    return {
+        "get_user_by_email": lambda: conn.get_user_by_email(email),
+        "get_user_by_id": lambda: conn.get_user_by_id(user_id),
+        "get_user_routine": lambda: conn.get_user_routine(user_id),
+        "fetch_exercise_by_id": lambda: conn.fetch_exercise_by_id(exercise_id),
+        "get_biometric_profile": lambda: conn.get_biometric_profile(user_id=user_id),
+        "get_all_exercises": lambda: conn.get_all_exercises(),
+    }
+
+
+def _conexion_nueva(conn: UserConnection, casos: dict, muestras: int, primeras: int):
+    latencias = []
+    inicio_total = time.perf_counter()
+    for _ in range(muestras):
+        # drain cierra la conexión del pool; wait espera a la nueva
+        conn.pool.drain()
+        conn.pool.wait()
+        inicio = time.perf_counter()
+        for nombre in CALIENTES:
+            for _ in range(primeras):
+                casos[nombre]()
+        latencias.append((time.perf_counter() - inicio) / (primeras * len(CALIENTES)))
+    return resultados.resumir(latencias, (time.perf_counter() - inicio_total) / (primeras * len(CALIENTES)))
+
+
+def _pico_kb(funcion):
+    funcion()
+    tracemalloc.start()
+    try:
+        funcion()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo de las consultas frecuentes según la preparación de sentencias")
+    parser.add_argument("--variantes", nargs="*", default=list(VARIANTES), choices=VARIANTES)
+    parser.add_argument("--muestras", type=int, default=30)
+    parser.add_argument("--duracion-muestra", type=float, default=50, help="ms por muestra")
+    parser.add_argument("--primeras", type=int, default=5, help="llamadas por consulta en conexion_nueva")
+    parser.add_argument("--solo", nargs="*", help="nombres de las consultas a correr")
+    parser.add_argument("--guardar", help="ruta del JSON de baseline a escribir")
+    parser.add_argument("--comparar", help="ruta de una baseline anterior")
+    args = parser.parse_args()
+
+    medidos = {}
+    for variante in args.variantes:
+        conn = _conexion(variante)
+        try:
+            casos = _casos(conn, *_datos(conn))
+            for nombre, funcion in casos.items():
+                if args.solo and nombre not in args.solo:
+                    continue
+                clave = f"{nombre}/{variante}"
+                medidos[clave] = resultados.medir(funcion, args.muestras, args.duracion_muestra / 1000)
+                medidos[clave]["pico_kb"] = _pico_kb(funcion)
+                resultados.imprimir(clave, medidos[clave])
+            if not args.solo or "conexion_nueva" in args.solo:
+                clave = f"conexion_nueva/{variante}"
+                medidos[clave] = _conexion_nueva(conn, casos, args.muestras, args.primeras)
+                resultados.imprimir(clave, medidos[clave])
+        finally:
+            conn.close()
+
+    if args.guardar:
+        resultados.guardar(args.guardar, "consultas", medidos, vars(args))
+    if args.comparar and resultados.comparar(args.comparar, medidos):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
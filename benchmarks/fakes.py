@@ -0,0 +1,302 @@
+# Capa de datos en memoria y cliente de IA falso para correr la API sin
+# PostgreSQL, dlib ni Cohere. Las clases heredan de UserConnection y
+# AsyncUserConnection, así que los cálculos locales (calorías, macros) y las
+# suscripciones de invalidación son los reales; solo cambia el acceso a datos.
+import asyncio
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from model.async_user_connection import AsyncUserConnection
+from model.pagination import decodificar_cursor, pagina_progreso
+from model.routines import objective_mapping
+from model.user_connection import UserConnection
+
+STUBS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs")
+
+
+class _PoolEnMemoria():
+    # Solo las estadísticas que leen /api/db/stats y las métricas de los pools
+    def get_stats(self):
+        return {"pool_size": 0, "pool_available": 0, "requests_waiting": 0}
+
+
+class DatosEnMemoria():
+    # Tablas mínimas para los escenarios de carga; un solo lock, como una base de datos chica
+
+    def __init__(self, ejercicios_por_parte: int = 40):
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.usuarios = {}
+        self.emails = {}
+        self.rutinas = {}
+        self.avances = {}
+        self.recomendaciones = {}
+        partes = sorted({parte for objetivo in objective_mapping.values() for dia in objetivo["body_parts"] for parte in dia})
+        self.ejercicios = [
+            {
+                "id": i + 1,
+                "name_es": f"ejercicio {i + 1}",
+                "equipment_es": f"equipo {i % 4}",
+                "target_es": f"músculo {i % 7}",
+                "body_part_es": partes[i % len(partes)],
+            }
+            for i in range(ejercicios_por_parte * len(partes))
+        ]
+        self.entrenadores = [
+            {
+                "id_entrenador": i,
+                "nombre": f"Entrenador {i}",
+                "especialidad": ("yoga", "crossfit", "funcional")[i % 3],
+                "nombre_clase": f"Clase {i}",
+                "id_horario": i,
+                "dia_semana": ("lunes", "miércoles", "viernes")[i % 3],
+            }
+            for i in range(1, 13)
+        ]
+
+    def nuevo_id(self):
+        return next(self._ids)
+
+
+class FakeUserConnection(UserConnection):
+
+    def __init__(self, datos: DatosEnMemoria = None, latencia: float = 0.0):
+        # No se llama al constructor real: no hay pool, coalescedor ni bus
+        self.datos = datos or DatosEnMemoria()
+        self.latencia = latencia
+        self.pool = _PoolEnMemoria()
+        self.coalescer = None
+        self.bus = None
+        self._suscriptores = []
+
+    def _esperar(self):
+        # Simula el ida y vuelta a la base de datos
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def close(self):
+        pass
+
+    def write(self, data):
+        self._esperar()
+        with self.datos.lock:
+            if data["email"] in self.datos.emails:
+                raise ValueError("El email ya está registrado")
+            user_id = self.datos.nuevo_id()
+            self.datos.usuarios[user_id] = {
+                "id": user_id,
+                "nombre": data["nombre"],
+                "apellido": data["apellido"],
+                "email": data["email"],
+                "password_hash": data["password_hash"],
+                "datos_completos": False,
+                "vector_biometrico": None,
+            }
+            self.datos.emails[data["email"]] = user_id
+        self._notificar("usuario", user_id)
+
+    def get_user_by_email(self, email: str):
+        self._esperar()
+        with self.datos.lock:
+            usuario = self.datos.usuarios.get(self.datos.emails.get(email))
+            return dict(usuario) if usuario else None
+
+    def get_user_by_id(self, user_id: int):
+        self._esperar()
+        with self.datos.lock:
+            usuario = self.datos.usuarios.get(user_id)
+            return {"nombre": usuario["nombre"], "apellido": usuario["apellido"], "email": usuario["email"]} if usuario else None
+
+    def update_user(self, user_id: int, updated_data: dict):
+        self._esperar()
+        with self.datos.lock:
+            self.datos.usuarios[user_id].update({k: v for k, v in updated_data.items() if v is not None})
+        self._notificar("usuario", user_id)
+        return True
+
+    def update_password_hash(self, user_id: int, password_hash: str):
+        self._esperar()
+        with self.datos.lock:
+            self.datos.usuarios[user_id]["password_hash"] = password_hash
+        self._notificar("usuario", user_id)
+
+    def get_biometric_vectors(self):
+        self._esperar()
+        with self.datos.lock:
+            return [(u["id"], u["vector_biometrico"]) for u in self.datos.usuarios.values() if u["vector_biometrico"]]
+
+    def get_biometric_profile(self, user_id: int = None, email: str = None):
+        self._esperar()
+        with self.datos.lock:
+            usuario = self.datos.usuarios.get(user_id if user_id is not None else self.datos.emails.get(email))
+            if not usuario:
+                return None
+            return {k: usuario[k] for k in ("id", "nombre", "apellido", "email", "datos_completos", "vector_biometrico")}
+
+    def get_all_exercises(self):
+        self._esperar()
+        return [dict(ejercicio) for ejercicio in self.datos.ejercicios]
+
+    def get_unique_body_parts(self):
+        self._esperar()
+        return sorted({ejercicio["body_part_es"] for ejercicio in self.datos.ejercicios})
+
+    def save_routine(self, user_id, routine):
+        self._esperar()
+        with self.datos.lock:
+            self.datos.rutinas[user_id] = json.loads(json.dumps(routine))
+        self._notificar("rutina", user_id)
+
+    def fetch_user_routine(self, usuario_id: int):
+        self._esperar()
+        with self.datos.lock:
+            rutina = self.datos.rutinas.get(usuario_id)
+        return {"id": usuario_id, "usuario_id": usuario_id, "routine": rutina} if rutina else {"routine": []}
+
+    def update_user_goals_in_db(self, usuario_id, objetivo=None, nivel_experiencia=None):
+        return self.update_user(usuario_id, {"objetivo": objetivo, "nivel_experiencia": nivel_experiencia})
+
+    def save_user_progress(self, user_id, exercise_id, reps, weight=None):
+        self._esperar()
+        with self.datos.lock:
+            self.datos.avances.setdefault(user_id, []).append(
+                (self.datos.nuevo_id(), reps, weight, datetime.now(), exercise_id)
+            )
+        self._notificar("progreso", user_id)
+        return True
+
+    def get_trainers_by_specialty(self, specialty: str = None):
+        self._esperar()
+        return [e for e in self.datos.entrenadores if specialty is None or e["especialidad"] == specialty]
+
+    def insert_recommendations(self, user_id: int, recommendations: dict):
+        self._esperar()
+        with self.datos.lock:
+            self.datos.recomendaciones[user_id] = recommendations
+        self._notificar("recomendaciones", user_id)
+
+    def fetch_recommendations(self, user_id: int):
+        self._esperar()
+        with self.datos.lock:
+            recomendaciones = self.datos.recomendaciones.get(user_id)
+        return {"recomendaciones": recomendaciones} if recomendaciones else None
+
+
+class FakeAsyncUserConnection(AsyncUserConnection):
+
+    def __init__(self, datos: DatosEnMemoria = None, latencia: float = 0.0):
+        self.datos = datos or DatosEnMemoria()
+        self.latencia = latencia
+        self.pool = _PoolEnMemoria()
+
+    async def _esperar(self):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def get_trainers_by_specialty(self, specialty: str = None):
+        await self._esperar()
+        return [e for e in self.datos.entrenadores if specialty is None or e["especialidad"] == specialty]
+
+    async def get_user_routine(self, user_id):
+        await self._esperar()
+        with self.datos.lock:
+            rutina = self.datos.rutinas.get(user_id)
+        return {"routine": rutina} if rutina else None
+
+    async def get_user_progress(self, user_id, limit: int = 50, cursor: str = None,
+                                desde=None, hasta=None, ejercicio_id: int = None):
+        await self._esperar()
+        with self.datos.lock:
+            avances = list(self.datos.avances.get(user_id, ()))
+        nombres = {e["id"]: e["name_es"] for e in self.datos.ejercicios}
+        if cursor:
+            fecha, registro_id = decodificar_cursor(cursor)
+            avances = [a for a in avances if (a[3], a[0]) < (fecha, registro_id)]
+        if desde is not None:
+            avances = [a for a in avances if a[3].date() >= desde]
+        if hasta is not None:
+            avances = [a for a in avances if a[3].date() <= hasta]
+        if ejercicio_id is not None:
+            avances = [a for a in avances if a[4] == ejercicio_id]
+        avances.sort(key=lambda a: (a[3], a[0]), reverse=True)
+        filas = [
+            (registro_id, reps, peso, fecha.strftime("%d-%m-%Y"), nombres.get(ej_id), fecha)
+            for registro_id, reps, peso, fecha, ej_id in avances[:limit + 1]
+        ]
+        return pagina_progreso(filas, limit)
+
+    async def fetch_exercise_by_id(self, exercise_id: int):
+        await self._esperar()
+        if 1 <= exercise_id <= len(self.datos.ejercicios):
+            return dict(self.datos.ejercicios[exercise_id - 1])
+        return None
+
+
+class FakeCohereClient():
+    # Misma interfaz que model.nutrition.CohereClient. Responde un plan válido
+    # (del generador local) después de `latencia` segundos; en streaming lo
+    # entrega en `fragmentos` partes repartidas en ese tiempo.
+
+    def __init__(self, latencia: float = 0.0, fragmentos: int = 20):
+        self.latencia = latencia
+        self.fragmentos = fragmentos
+        self._texto = None
+
+    def _respuesta(self):
+        # Se arma en la primera llamada, como el cliente real que importa su SDK
+        # recién al usarse (el generador local carga numpy)
+        if self._texto is None:
+            from model.meal_planner import generar_plan_local
+            self._texto = json.dumps(generar_plan_local({"proteinas": 150, "carbohidratos": 250, "grasas": 70}), ensure_ascii=False)
+        return self._texto
+
+    def generar(self, prompt: str, timeout: float = None):
+        time.sleep(self.latencia)
+        return self._respuesta()
+
+    def generar_stream(self, prompt: str, timeout: float = None):
+        texto = self._respuesta()
+        tamaño = max(1, len(texto) // self.fragmentos)
+        for inicio in range(0, len(texto), tamaño):
+            time.sleep(self.latencia / self.fragmentos)
+            yield texto[inicio:inicio + tamaño]
+
+
+def instalar_stub_face():
+    # Debe llamarse antes de importar main (y antes de que el pool facial arranque)
+    if STUBS not in sys.path:
+        sys.path.insert(0, STUBS)
+    sys.modules.pop("face_recognition", None)
+
+
+def cargar_app(backend: str = "memoria", latencia_db: float = 0.0, latencia_llm: float = 0.0, stub_face: bool = True):
+    # Importa main con la capa de datos elegida: "memoria" usa los fakes de este
+    # módulo, "postgres" la base de datos de DATABASE_URL
+    if stub_face:
+        instalar_stub_face()
+    if backend == "memoria":
+        import model.async_user_connection
+        import model.user_connection
+        # migrations hereda de las clases reales: se importa antes de reemplazarlas
+        import model.migrations
+        datos = DatosEnMemoria()
+        model.user_connection.UserConnection = lambda: FakeUserConnection(datos, latencia_db)
+        model.async_user_connection.AsyncUserConnection = lambda: FakeAsyncUserConnection(datos, latencia_db)
+
+    import main
+    if "nutrition" in main.routers:
+        main.routers["nutrition"].plan_client = FakeCohereClient(latencia_llm)
+        if backend == "memoria":
+            # La capa en memoria no tiene la tabla de trabajos: no se arrancan sus hilos
+            main.routers["nutrition"].nutrition_jobs.max_workers = 0
+    return main
@@ -0,0 +1,191 @@
+# Escenarios de carga end-to-end contra la API.
+#
+# Uso:
+#   python -m benchmarks.load                                   # app en proceso, datos en memoria
+#   python -m benchmarks.load --backend postgres                # app en proceso contra DATABASE_URL
+#   python -m benchmarks.load --url http://localhost:8000       # servidor uvicorn ya levantado
+#   python -m benchmarks.load --escenarios login rutina --peticiones 1000 --concurrencia 100
+#   python -m benchmarks.load --guardar benchmarks/baselines/load.json
+#   python -m benchmarks.load --comparar benchmarks/baselines/load.json
+#
+# En proceso, face_recognition y Cohere se reemplazan por los stubs de
+# benchmarks/ (BENCH_FACE_MS y --latencia-llm simulan su costo) y --latencia-db
+# simula el ida y vuelta a la base de datos en memoria. Con --url el servidor
+# usa lo que tenga configurado; para medirlo con los stubs se levanta con
+# PYTHONPATH=benchmarks/stubs. El costo de bcrypt se ajusta con PASSWORD_BCRYPT_ROUNDS.
+#
+# Cliente y servidor comparten el event loop cuando la app corre en proceso: sirve
+# para comparar corridas entre sí, no como medida absoluta de capacidad.
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+import numpy as np
+import httpx
+
+from benchmarks import resultados
+
+ESCENARIOS = ("login", "rutina", "progreso", "entrenadores", "plan_alimenticio", "identificacion")
+PASSWORD = "benchmark-123"
+
+
+def _imagen(semilla: int):
+    import cv2
+    pixeles = np.random.default_rng(semilla).integers(0, 255, (240, 240, 3), dtype=np.uint8)
+    return cv2.imencode(".png", pixeles)[1].tobytes()
+
+
+async def preparar(cliente: httpx.AsyncClient, usuarios: int):
+    # Crea los socios del benchmark a través de la propia API (sirve igual en memoria,
+    # contra PostgreSQL o contra un servidor remoto)
+    corrida = uuid.uuid4().hex[:8]
+    contexto = {"usuarios": [], "imagenes": [], "ejercicio_id": None, "biometria": True}
+    for i in range(usuarios):
+        email = f"bench-{corrida}-{i}@example.com"
+        r = await cliente.post("/api/user/insert", json={"nombre": "Bench", "apellido": str(i), "email": email, "password_hash": PASSWORD})
+        r.raise_for_status()
+        r = await cliente.post("/api/user/login", json={"email": email, "password_hash": PASSWORD})
+        r.raise_for_status()
+        user_id = r.json()["user_id"]
+        contexto["usuarios"].append((user_id, email))
+
+        r = await cliente.post(
+            "/api/exercises/recommendations",
+            params={"user_id": user_id, "objective": "Ganar masa muscular", "experience_level": "Intermedio"},
+        )
+        r.raise_for_status()
+        if contexto["ejercicio_id"] is None:
+            contexto["ejercicio_id"] = r.json()["routine"][0]["exercises"][0]["id"]
+
+        imagen = _imagen(i)
+        contexto["imagenes"].append(imagen)
+        if contexto["biometria"]:
+            r = await cliente.put(
+                f"/api/user/update/biometric/{user_id}",
+                files={"imagen": ("rostro.png", imagen, "image/png")},
+                data={"data": json.dumps({"datos_completos": True})},
+            )
+            # Sin el stub facial las imágenes sintéticas no tienen rostro
+            contexto["biometria"] = r.status_code == 200
+    return contexto
+
+
+def _peticion(escenario: str, contexto: dict):
+    usuarios = contexto["usuarios"]
+
+    def login(cliente, i):
+        return cliente.post("/api/user/login", json={"email": usuarios[i % len(usuarios)][1], "password_hash": PASSWORD})
+
+    def rutina(cliente, i):
+        return cliente.get("/api/exercises/routine", params={"user_id": usuarios[i % len(usuarios)][0]})
+
+    def progreso(cliente, i):
+        return cliente.post("/api/progress", json={
+            "usuario_id": usuarios[i % len(usuarios)][0],
+            "ejercicio_id": contexto["ejercicio_id"],
+            "repeticiones": 8 + i % 5,
+            "peso": 40.0 + i % 20,
+        })
+
+    def entrenadores(cliente, i):
+        return cliente.get("/api/trainers")
+
+    def plan_alimenticio(cliente, i):
+        # Edades distintas para mezclar aciertos y fallos del caché de planes
+        return cliente.post("/api/nutrition-plan", json={
+            "id_usuario": usuarios[i % len(usuarios)][0],
+            "genero": "masculino",
+            "edad": 18 + i % 40,
+            "peso_actual": 80.0,
+            "altura": 178.0,
+            "nivel_experiencia": "Intermedio",
+            "objetivo": "Ganar masa muscular",
+        })
+
+    def identificacion(cliente, i):
+        imagenes = contexto["imagenes"]
+        return cliente.post("/api/user/identify", files={"imagen": ("rostro.png", imagenes[i % len(imagenes)], "image/png")})
+
+    return locals()[escenario]
+
+
+async def correr(cliente: httpx.AsyncClient, peticion, total: int, concurrencia: int):
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias = []
+    errores = 0
+
+    async def una(i):
+        nonlocal errores
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                respuesta = await peticion(cliente, i)
+                fallo = respuesta.status_code >= 400
+            except httpx.HTTPError:
+                fallo = True
+            if fallo:
+                errores += 1
+            else:
+                latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una(i) for i in range(total)))
+    return resultados.resumir(latencias, time.perf_counter() - inicio, errores)
+
+
+async def ejecutar(args, cliente: httpx.AsyncClient):
+    contexto = await preparar(cliente, args.usuarios)
+    medidos = {}
+    for escenario in args.escenarios:
+        if escenario == "identificacion" and not contexto["biometria"]:
+            print(f"{escenario:>22}: omitido (el servidor no detectó rostros en las imágenes sintéticas)")
+            continue
+        peticion = _peticion(escenario, contexto)
+        if args.calentamiento:
+            await correr(cliente, peticion, args.calentamiento, args.concurrencia)
+        medidos[escenario] = await correr(cliente, peticion, args.peticiones, args.concurrencia)
+        resultados.imprimir(escenario, medidos[escenario])
+    return medidos
+
+
+async def principal(args):
+    limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=120, limits=limites) as cliente:
+            return await ejecutar(args, cliente)
+
+    from benchmarks.fakes import cargar_app
+    main = cargar_app(args.backend, args.latencia_db / 1000, args.latencia_llm / 1000)
+    async with main.app.router.lifespan_context(main.app):
+        transporte = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=120, limits=limites) as cliente:
+            return await ejecutar(args, cliente)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escenarios de carga end-to-end de la API")
+    parser.add_argument("--escenarios", nargs="*", default=list(ESCENARIOS), choices=ESCENARIOS)
+    parser.add_argument("--peticiones", type=int, default=500, help="peticiones medidas por escenario")
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--calentamiento", type=int, default=20, help="peticiones previas no medidas")
+    parser.add_argument("--usuarios", type=int, default=20, help="socios creados para el benchmark")
+    parser.add_argument("--url", help="servidor ya levantado; sin --url la app corre en proceso")
+    parser.add_argument("--backend", choices=("memoria", "postgres"), default="memoria")
+    parser.add_argument("--latencia-db", type=float, default=0.5, help="ms por consulta simulados (backend memoria)")
+    parser.add_argument("--latencia-llm", type=float, default=1500, help="ms por respuesta del Cohere simulado")
+    parser.add_argument("--guardar", help="ruta del JSON de baseline a escribir")
+    parser.add_argument("--comparar", help="ruta de una baseline anterior")
+    args = parser.parse_args()
+
+    medidos = asyncio.run(principal(args))
+
+    if args.guardar:
+        resultados.guardar(args.guardar, "load", medidos, vars(args))
+    if args.comparar and resultados.comparar(args.comparar, medidos):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Microbenchmarks de las funciones locales de la API (sin red ni base de datos).
+#
+# Uso:
+#   python -m benchmarks.micro
+#   python -m benchmarks.micro --guardar benchmarks/baselines/micro.json
+#   python -m benchmarks.micro --comparar benchmarks/baselines/micro.json
+#
+# Cada caso se mide en --muestras muestras; cada muestra repite la llamada las
+# veces necesarias para durar ~--duracion-muestra ms, y la latencia por llamada
+# es el promedio dentro de la muestra. Así p50/p95/p99 reflejan la variación
+# entre muestras y no la resolución del reloj.
+import argparse
+import sys
+import numpy as np
+
+from benchmarks import resultados
+from benchmarks.fakes import DatosEnMemoria, FakeUserConnection
+from model.exercise_catalog import ExerciseCatalog
+from model.face_index import buscar_vecinos
+from model.meal_planner import generar_plan_local
+from model.progress_analytics import analizar_progreso
+from model.routines import generar_rutina
+
+
+def _casos(usuarios_indice: int, series_analitica: int):
+    datos = DatosEnMemoria()
+    conn = FakeUserConnection(datos)
+    catalogo = ExerciseCatalog(conn.get_all_exercises)
+    rng = np.random.default_rng(0)
+
+    vector = rng.normal(0, 0.1, 128).astype(np.float32)
+    vector_bytes = vector.tobytes()
+
+    matriz = rng.normal(0, 0.1, (usuarios_indice, 128)).astype(np.float32)
+    ids = np.arange(1, usuarios_indice + 1, dtype=np.int64)
+    normas = np.einsum("ij,ij->i", matriz, matriz)
+
+    filas = [
+        (int(ej), f"ejercicio {ej}", int(reps), float(peso), int(dia))
+        for ej, reps, peso, dia in zip(
+            rng.integers(1, 30, series_analitica),
+            rng.integers(1, 15, series_analitica),
+            rng.uniform(10, 150, series_analitica).round(1),
+            rng.integers(19000, 20000, series_analitica),
+        )
+    ]
+    macros = conn.calcular_macros(2500, "Ganar masa muscular")
+
+    return {
+        "calcular_calorias": lambda: conn.calcular_calorias("masculino", 30, 80.0, 180.0, "Intermedio", "Ganar masa muscular"),
+        "calcular_macros": lambda: conn.calcular_macros(2500.0, "Ganar masa muscular"),
+        "generar_rutina": lambda: generar_rutina(catalogo, "Ganar masa muscular", "Avanzado"),
+        "vector_encode": lambda: vector.tobytes(),
+        "vector_decode": lambda: np.frombuffer(vector_bytes, dtype=np.float32),
+        f"buscar_vecinos_{usuarios_indice}": lambda: buscar_vecinos(matriz, ids, normas, vector, 5, 0.6),
+        "plan_local": lambda: generar_plan_local(macros),
+        f"analitica_{series_analitica}_series": lambda: analizar_progreso(filas),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks de funciones locales")
+    parser.add_argument("--muestras", type=int, default=50)
+    parser.add_argument("--duracion-muestra", type=float, default=20, help="ms por muestra")
+    parser.add_argument("--usuarios-indice", type=int, default=10000, help="vectores en el índice facial")
+    parser.add_argument("--series-analitica", type=int, default=5000, help="series en la analítica de progreso")
+    parser.add_argument("--solo", nargs="*", help="nombres de los casos a correr")
+    parser.add_argument("--guardar", help="ruta del JSON de baseline a escribir")
+    parser.add_argument("--comparar", help="ruta de una baseline anterior")
+    args = parser.parse_args()
+
+    casos = _casos(args.usuarios_indice, args.series_analitica)
+    medidos = {}
+    for nombre, funcion in casos.items():
+        if args.solo and nombre not in args.solo:
+            continue
+        medidos[nombre] = resultados.medir(funcion, args.muestras, args.duracion_muestra / 1000)
+        resultados.imprimir(nombre, medidos[nombre])
+
+    if args.guardar:
+        resultados.guardar(args.guardar, "micro", medidos, vars(args))
+    if args.comparar and resultados.comparar(args.comparar, medidos):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
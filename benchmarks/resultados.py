@@ -0,0 +1,105 @@
+# Resumen de latencias y baselines en JSON compartidos por los benchmarks
+import json
+import os
+import platform
+import time
+import numpy as np
+
+# Métricas comparadas contra la baseline y si un valor mayor es peor
+COMPARADAS = {"p50_ms": True, "p95_ms": True, "p99_ms": True, "rps": False}
+
+
+def resumir(latencias, duracion: float, errores: int = 0):
+    # latencias en segundos; duracion es el tiempo de pared de toda la corrida
+    ms = np.asarray(latencias, dtype=np.float64) * 1000
+    if not len(ms):
+        return {"peticiones": 0, "errores": errores, "rps": 0.0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "peticiones": int(len(ms)),
+        "errores": errores,
+        "rps": round(len(ms) / duracion, 1) if duracion > 0 else 0.0,
+        "p50_ms": round(float(p50), 6),
+        "p95_ms": round(float(p95), 6),
+        "p99_ms": round(float(p99), 6),
+        "media_ms": round(float(ms.mean()), 6),
+        "max_ms": round(float(ms.max()), 6),
+    }
+
+
+def medir(funcion, muestras: int, duracion_muestra: float):
+    # Calibrar cuántas llamadas entran en una muestra
+    funcion()
+    repeticiones = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        if time.perf_counter() - inicio >= duracion_muestra / 10 or repeticiones >= 1_000_000:
+            break
+        repeticiones *= 2
+    repeticiones = max(1, int(repeticiones * duracion_muestra / max(time.perf_counter() - inicio, 1e-9)))
+
+    latencias = []
+    inicio_total = time.perf_counter()
+    for _ in range(muestras):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        latencias.append((time.perf_counter() - inicio) / repeticiones)
+    # rps = llamadas por segundo de una sola hebra
+    return resumir(latencias, (time.perf_counter() - inicio_total) / repeticiones)
+
+
+def imprimir(nombre: str, r: dict):
+    if not r["peticiones"]:
+        print(f"{nombre:>22}: sin resultados ({r['errores']} errores)")
+        return
+    print(
+        f"{nombre:>22}: {r['rps']:10.1f} op/s  p50={r['p50_ms']:10.4f} ms  "
+        f"p95={r['p95_ms']:10.4f} ms  p99={r['p99_ms']:10.4f} ms  errores={r['errores']}"
+    )
+
+
+def guardar(ruta: str, suite: str, resultados: dict, parametros: dict):
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(
+            {
+                "suite": suite,
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "maquina": platform.machine(),
+                "cpus": os.cpu_count(),
+                "parametros": parametros,
+                "resultados": resultados,
+            },
+            archivo,
+            indent=2,
+            ensure_ascii=False,
+        )
+    print(f"Baseline guardada en {ruta}")
+
+
+def comparar(ruta: str, resultados: dict, tolerancia: float = 0.10):
+    # Imprime la variación contra la baseline y devuelve True si hay regresiones
+    # mayores a la tolerancia (10% por defecto)
+    with open(ruta, encoding="utf-8") as archivo:
+        baseline = json.load(archivo)["resultados"]
+
+    regresion = False
+    print(f"\nComparación contra {ruta} (tolerancia {tolerancia:.0%}):")
+    for nombre, actual in resultados.items():
+        anterior = baseline.get(nombre)
+        if not anterior or not actual.get("peticiones"):
+            continue
+        cambios = []
+        for metrica, mayor_es_peor in COMPARADAS.items():
+            if not anterior.get(metrica):
+                continue
+            delta = (actual[metrica] - anterior[metrica]) / anterior[metrica]
+            empeora = delta > tolerancia if mayor_es_peor else delta < -tolerancia
+            regresion |= empeora
+            cambios.append(f"{metrica} {delta:+.1%}{' !' if empeora else ''}")
+        print(f"{nombre:>22}: " + "  ".join(cambios))
+    return regresion
@@ -0,0 +1,148 @@
+# Tiempo de importación, arranque y memoria residente de un worker de la API
+# según su configuración (routers montados, solo lectura, calentamiento).
+#
+# Uso:
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --configuraciones completo catalogo
+#   python -m benchmarks.startup --backend postgres --guardar benchmarks/baselines/startup.json
+#
+# Cada configuración se mide en un proceso nuevo, porque un módulo ya importado no
+# se puede descargar: el proceso importa main, ejecuta el lifespan (con el
+# calentamiento si corresponde) y reporta los tiempos, la memoria residente del
+# worker y de sus procesos hijos (pools facial y de bcrypt) y qué dependencias
+# pesadas quedaron cargadas. La memoria se lee de /proc, así que solo funciona en Linux.
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+CONFIGURACIONES = {
+    "completo": {},
+    "completo_calentado": {"APP_WARMUP": "true"},
+    "solo_lectura": {"APP_READ_ONLY": "true"},
+    "catalogo": {"APP_ROUTERS": "exercises,trainers", "APP_READ_ONLY": "true"},
+}
+PESADOS = ("numpy", "cv2", "dlib", "face_recognition", "cohere", "passlib", "openai")
+MARCA = "RESULTADO_STARTUP "
+
+
+def _rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    return 0.0
+
+
+def _medir(backend: str, stub_face: bool):
+    # Corre dentro del proceso hijo, con la configuración ya en el entorno
+    inicio = time.perf_counter()
+    if backend == "memoria":
+        from benchmarks.fakes import cargar_app
+        main = cargar_app("memoria", stub_face=stub_face)
+    else:
+        if stub_face:
+            from benchmarks.fakes import instalar_stub_face
+            instalar_stub_face()
+        import main
+    importacion = time.perf_counter() - inicio
+    rss_importacion = _rss_mb(os.getpid())
+    # Separa en stderr las importaciones de main de las del arranque y de los pools
+    print(MARCA, file=sys.stderr, flush=True)
+
+    async def arrancar():
+        inicio = time.perf_counter()
+        async with main.app.router.lifespan_context(main.app):
+            arranque = time.perf_counter() - inicio
+            hijos = multiprocessing.active_children()
+            return {
+                "importacion_s": round(importacion, 4),
+                "arranque_s": round(arranque, 4),
+                "rss_importacion_mb": round(rss_importacion, 1),
+                "rss_mb": round(_rss_mb(os.getpid()), 1),
+                "procesos_hijos": len(hijos),
+                "rss_hijos_mb": round(sum(_rss_mb(hijo.pid) for hijo in hijos), 1),
+                "routers": list(main.routers),
+                "rutas": len(main.app.routes),
+                "pesados": [modulo for modulo in PESADOS if modulo in sys.modules],
+            }
+
+    print(MARCA + json.dumps(asyncio.run(arrancar())), flush=True)
+
+
+def _importaciones(stderr: str, cantidad: int):
+    # Salida de -X importtime: "import time: propio | acumulado | módulo". Se
+    # reportan main y los paquetes de primer nivel (numpy, fastapi, psycopg...),
+    # con el tiempo acumulado de su primera importación
+    modulos = {}
+    for linea in stderr.split(MARCA)[0].splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        nombre = nombre.strip()
+        if "." in nombre or nombre in modulos or not acumulado.strip().isdigit():
+            continue
+        modulos[nombre] = int(acumulado) / 1000
+    modulos = sorted(((ms, nombre) for nombre, ms in modulos.items()), reverse=True)
+    return {nombre: round(ms, 1) for ms, nombre in modulos[:cantidad]}
+
+
+def medir_configuracion(nombre: str, args):
+    entorno = dict(os.environ, **CONFIGURACIONES[nombre])
+    comando = [sys.executable, "-X", "importtime", "-m", "benchmarks.startup", "--medir", "--backend", args.backend]
+    if args.stub_face:
+        comando.append("--stub-face")
+    proceso = subprocess.run(comando, env=entorno, capture_output=True, text=True, timeout=args.timeout)
+    for linea in proceso.stdout.splitlines():
+        if linea.startswith(MARCA):
+            medido = json.loads(linea[len(MARCA):])
+            medido["importaciones_ms"] = _importaciones(proceso.stderr, args.importaciones)
+            return medido
+    raise RuntimeError(f"La configuración {nombre} no terminó (código {proceso.returncode}):\n{proceso.stderr[-2000:]}")
+
+
+def imprimir(nombre: str, r: dict):
+    print(
+        f"{nombre:>22}: import {r['importacion_s']:7.3f} s  arranque {r['arranque_s']:7.3f} s  "
+        f"RSS {r['rss_mb']:7.1f} MB  hijos {r['procesos_hijos']} ({r['rss_hijos_mb']:.1f} MB)  "
+        f"pesados: {', '.join(r['pesados']) or '-'}"
+    )
+    for modulo, ms in r["importaciones_ms"].items():
+        print(f"{'':>24}{ms:9.1f} ms  {modulo}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación y memoria de un worker por configuración")
+    parser.add_argument("--configuraciones", nargs="*", default=list(CONFIGURACIONES), choices=CONFIGURACIONES)
+    parser.add_argument("--backend", choices=("memoria", "postgres"), default="memoria")
+    parser.add_argument("--stub-face", action="store_true", help="usar el stub de face_recognition en lugar de dlib")
+    parser.add_argument("--importaciones", type=int, default=8, help="módulos más lentos de importar a mostrar")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--guardar", help="ruta del JSON de resultados a escribir")
+    parser.add_argument("--medir", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        _medir(args.backend, args.stub_face)
+        return
+
+    medidos = {}
+    for nombre in args.configuraciones:
+        medidos[nombre] = medir_configuracion(nombre, args)
+        imprimir(nombre, medidos[nombre])
+
+    if args.guardar:
+        # resultados importa numpy: solo se carga en el proceso que coordina
+        from benchmarks import resultados
+        resultados.guardar(args.guardar, "startup", medidos, vars(args))
+
+
+if __name__ == "__main__":
+    main()
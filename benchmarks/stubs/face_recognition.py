@@ -0,0 +1,31 @@
+# Reemplazo de face_recognition para benchmarks: no necesita dlib ni sus modelos.
+# Siempre detecta un rostro que ocupa toda la imagen y devuelve un vector
+# determinístico derivado de los píxeles. BENCH_FACE_MS simula el costo de CPU
+# de detección + codificación (se reparte mitad y mitad).
+#
+# Se activa anteponiendo benchmarks/stubs a sys.path; los procesos del pool
+# facial (spawn) heredan sys.path, así que también lo usan.
+import os
+import time
+import numpy as np
+
+_COSTO = float(os.getenv("BENCH_FACE_MS", "0")) / 1000
+
+
+def _ocupar_cpu(segundos: float):
+    # Espera activa: el costo real de dlib es CPU, no I/O
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        pass
+
+
+def face_locations(imagen, *args, **kwargs):
+    _ocupar_cpu(_COSTO / 2)
+    alto, ancho = imagen.shape[:2]
+    return [(0, ancho, alto, 0)]
+
+
+def face_encodings(imagen, known_face_locations=None, *args, **kwargs):
+    _ocupar_cpu(_COSTO / 2)
+    semilla = int(imagen[::8, ::8].sum()) % (2 ** 32)
+    return [np.random.default_rng(semilla).normal(0.0, 0.1, 128)]
@@ -0,0 +1,105 @@
+import os
+
+DATABASE_URL = os.getenv("DATABASE_URL", "dbname=gym user=postgres password=password host=localhost port=5432")
+
+# Pool de conexiones a PostgreSQL
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "600"))
+# Sentencias preparadas en el servidor para las consultas frecuentes (model/queries.py).
+# Desactivar detrás de PgBouncer en modo transacción, donde una sentencia preparada
+# en una conexión del servidor no existe en la siguiente
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() in ("1", "true", "yes")
+
+# Pipeline de reconocimiento facial
+FACE_WORKERS = int(os.getenv("FACE_WORKERS", str(os.cpu_count() or 1)))
+FACE_MAX_PENDING = int(os.getenv("FACE_MAX_PENDING", "32"))
+FACE_MAX_DIMENSION = int(os.getenv("FACE_MAX_DIMENSION", "800"))
+# Directorio del almacén de vectores compartido entre workers (vacío = índice en memoria por worker)
+FACE_STORE_DIR = os.getenv("FACE_STORE_DIR", "")
+FACE_VECTOR_CACHE_SIZE = int(os.getenv("FACE_VECTOR_CACHE_SIZE", "4096"))
+# Distancia máxima entre rostros para aceptar un login o una identificación. Solo
+# se fija en el servidor: el cliente puede pedir una más estricta, nunca una mayor
+# (0.6 es la tolerancia por defecto de face_recognition.compare_faces)
+UMBRAL_DISTANCIA = float(os.getenv("FACE_DISTANCE_THRESHOLD", "0.6"))
+
+# Caché de planes alimenticios generados por la IA
+NUTRITION_CACHE_SIZE = int(os.getenv("NUTRITION_CACHE_SIZE", "1024"))
+NUTRITION_CACHE_TTL = float(os.getenv("NUTRITION_CACHE_TTL", "86400"))
+NUTRITION_CACHE_KCAL_STEP = int(os.getenv("NUTRITION_CACHE_KCAL_STEP", "50"))
+NUTRITION_CACHE_GRAMS_STEP = int(os.getenv("NUTRITION_CACHE_GRAMS_STEP", "5"))
+
+# Cliente de IA para planes alimenticios
+COHERE_API_KEY = os.getenv("COHERE_API_KEY", "mmFhYt9j2DRBpEeTv6MhZn6BmD3tzoFmK05zSpsL")
+COHERE_MODEL = os.getenv("COHERE_MODEL", "command-r-plus")
+NUTRITION_LLM_TIMEOUT = float(os.getenv("NUTRITION_LLM_TIMEOUT", "60"))
+
+# Cola de trabajos de planes alimenticios
+NUTRITION_JOB_WORKERS = int(os.getenv("NUTRITION_JOB_WORKERS", "4"))
+NUTRITION_JOB_MAX_PENDING = int(os.getenv("NUTRITION_JOB_MAX_PENDING", "100"))
+NUTRITION_JOB_RETRIES = int(os.getenv("NUTRITION_JOB_RETRIES", "2"))
+NUTRITION_JOB_TTL = float(os.getenv("NUTRITION_JOB_TTL", "3600"))
+# Segundos que un worker retiene un trabajo en proceso; si muere, otro lo retoma al
+# vencer (debe superar NUTRITION_LLM_TIMEOUT). Sondeo de la tabla cuando no hay trabajos
+NUTRITION_JOB_LEASE = float(os.getenv("NUTRITION_JOB_LEASE", "300"))
+NUTRITION_JOB_POLL = float(os.getenv("NUTRITION_JOB_POLL", "2"))
+# Tiempo máximo que el endpoint síncrono espera a la IA antes de usar el generador local
+NUTRITION_SYNC_TIMEOUT = float(os.getenv("NUTRITION_SYNC_TIMEOUT", "20"))
+
+# Paginación del historial de progreso
+PROGRESS_PAGE_SIZE = int(os.getenv("PROGRESS_PAGE_SIZE", "50"))
+PROGRESS_PAGE_MAX = int(os.getenv("PROGRESS_PAGE_MAX", "200"))
+
+# Caché de analítica de progreso (se invalida en cada escritura del usuario)
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "2048"))
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "86400"))
+PROGRESS_BATCH_MAX = int(os.getenv("PROGRESS_BATCH_MAX", "1000"))
+
+# Agrupación de escrituras pequeñas (group commit) en la capa de datos
+WRITE_COALESCE_ENABLED = os.getenv("WRITE_COALESCE_ENABLED", "false").lower() in ("1", "true", "yes")
+WRITE_COALESCE_MAX_ROWS = int(os.getenv("WRITE_COALESCE_MAX_ROWS", "64"))
+WRITE_COALESCE_MAX_DELAY_MS = float(os.getenv("WRITE_COALESCE_MAX_DELAY_MS", "5"))
+# Segundos que un llamador espera la confirmación de su escritura
+WRITE_COALESCE_TIMEOUT = float(os.getenv("WRITE_COALESCE_TIMEOUT", "30"))
+# Modo síncrono: cada escritura se confirma al instante (pruebas)
+WRITE_COALESCE_SYNC = os.getenv("WRITE_COALESCE_SYNC", "false").lower() in ("1", "true", "yes")
+
+# Exportación del historial: filas por lote del cursor del servidor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+# Token de los endpoints de administración (header X-Admin-Token); vacío = deshabilitados
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Caché de entrenadores y horarios de clases (cambian pocas veces por semana)
+TRAINERS_CACHE_SIZE = int(os.getenv("TRAINERS_CACHE_SIZE", "512"))
+TRAINERS_CACHE_TTL = float(os.getenv("TRAINERS_CACHE_TTL", "3600"))
+
+# Invalidación de cachés entre workers con LISTEN/NOTIFY
+CACHE_INVALIDATION_BUS = os.getenv("CACHE_INVALIDATION_BUS", "true").lower() in ("1", "true", "yes")
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "invalidacion_cache")
+# Cantidad de workers de uvicorn (la misma variable que lee uvicorn --workers)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Caché de lecturas por usuario (rutina, recomendaciones, progreso, perfil)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "8192"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "600"))
+
+# Hash de contraseñas (bcrypt) en un pool de procesos dedicado
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "64"))
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+
+# Métricas: consultas más lentas que este umbral se registran en el log (0 = desactivado)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+# Arranque de workers: routers que se montan (los demás ni se importan), modo
+# solo lectura (solo rutas GET y sin biometría, así el worker nunca arranca el
+# pool facial) y calentamiento de pools, índices y clientes antes de aceptar tráfico
+APP_ROUTERS = [nombre.strip() for nombre in os.getenv("APP_ROUTERS", "users,biometrics,exercises,progress,nutrition,trainers").split(",") if nombre.strip()]
+APP_READ_ONLY = os.getenv("APP_READ_ONLY", "false").lower() in ("1", "true", "yes")
+APP_WARMUP = os.getenv("APP_WARMUP", "false").lower() in ("1", "true", "yes")
+
+# Migraciones del esquema (python -m model.migrations upgrade|status|check). Con
+# DB_AUTO_MIGRATE el arranque aplica las pendientes (un lock evita que dos workers
+# lo hagan a la vez); si no, se aplican como paso del despliegue.
+MIGRATIONS_DIR = os.getenv("MIGRATIONS_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"))
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
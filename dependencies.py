@@ -0,0 +1,45 @@
+# Estado compartido por los routers: conexiones a la base de datos y el caché de
+# lecturas por usuario. Solo importa módulos livianos; dlib, OpenCV, numpy, Cohere
+# y passlib los cargan los routers en el primer uso o en el calentamiento.
+import hmac
+from fastapi import Header, HTTPException
+import config
+from model.user_connection import UserConnection
+from model.async_user_connection import AsyncUserConnection
+from model.cache import TTLCache
+from model.invalidation import TODAS
+from model.metrics import metricas
+
+conn = UserConnection()
+aconn = AsyncUserConnection()
+# Lecturas por usuario; la clave empieza con (entidad, user_id), p. ej. ("rutina", 7)
+user_cache = TTLCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
+
+def invalidar_user_cache(entidad: str, clave):
+    # Se llama tras cada escritura de este worker y, vía LISTEN/NOTIFY, de los demás.
+    # Los routers suscriben aparte la invalidación de sus propios cachés.
+    if entidad == TODAS:
+        user_cache.clear()
+        return
+    user_cache.invalidate_where(lambda k: k[0] == entidad and k[1] == clave)
+
+conn.suscribir(invalidar_user_cache)
+
+async def leer_cacheado(clave, cargar):
+    # Lectura asíncrona a través del caché; también guarda resultados vacíos (None)
+    return await user_cache.aget_or_load(clave, cargar)
+
+def verificar_admin(x_admin_token: str = Header(None)):
+    # Dependencia de los endpoints de administración. Sin ADMIN_TOKEN configurado no existen
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Token de administración inválido")
+
+def _gauges_pools():
+    for nombre, pool in (("sync", conn.pool), ("async", aconn.pool)):
+        estado = pool.get_stats()
+        for clave in ("pool_size", "pool_available", "requests_waiting"):
+            metricas.fijar(f"db_{clave}", estado.get(clave, 0), pool=nombre)
+
+metricas.agregar_recolector(_gauges_pools)
@@ -0,0 +1,76 @@
+-- Tablas que usan UserConnection y AsyncUserConnection. Con IF NOT EXISTS la
+-- migración también se puede marcar como aplicada sobre una base ya existente.
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    id serial PRIMARY KEY,
+    nombre text NOT NULL,
+    apellido text NOT NULL,
+    email text NOT NULL UNIQUE,
+    password_hash text NOT NULL,
+    genero text,
+    edad integer,
+    altura double precision,
+    peso_actual double precision,
+    objetivo text,
+    nivel_experiencia text,
+    vector_biometrico bytea,
+    datos_completos boolean NOT NULL DEFAULT false
+);
+
+CREATE TABLE IF NOT EXISTS ejercicios (
+    id serial PRIMARY KEY,
+    name_es text NOT NULL,
+    body_part_es text NOT NULL,
+    target_es text,
+    equipment_es text,
+    instructions_es text,
+    gif_url text
+);
+
+CREATE TABLE IF NOT EXISTS usuario_rutinas (
+    id serial PRIMARY KEY,
+    usuario_id integer NOT NULL REFERENCES usuarios (id) ON DELETE CASCADE,
+    rutina jsonb NOT NULL,
+    fecha_creacion timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS usuario_avances (
+    id serial PRIMARY KEY,
+    usuario_id integer NOT NULL REFERENCES usuarios (id) ON DELETE CASCADE,
+    ejercicio_id integer NOT NULL REFERENCES ejercicios (id),
+    repeticiones integer NOT NULL,
+    peso double precision,
+    fecha timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS recomendaciones_diarias (
+    id serial PRIMARY KEY,
+    id_usuario integer NOT NULL REFERENCES usuarios (id) ON DELETE CASCADE,
+    recomendaciones jsonb NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS entrenadores (
+    id_entrenador serial PRIMARY KEY,
+    nombre text NOT NULL,
+    especialidad text,
+    descripcion text,
+    telefono text,
+    correo text,
+    estado boolean NOT NULL DEFAULT true
+);
+
+CREATE TABLE IF NOT EXISTS clases (
+    id_clase serial PRIMARY KEY,
+    id_entrenador integer NOT NULL REFERENCES entrenadores (id_entrenador),
+    nombre_clase text NOT NULL,
+    descripcion text,
+    nivel text
+);
+
+CREATE TABLE IF NOT EXISTS horario (
+    id_horario serial PRIMARY KEY,
+    id_clase integer NOT NULL REFERENCES clases (id_clase),
+    dia_semana text NOT NULL,
+    hora_inicio time NOT NULL,
+    hora_fin time NOT NULL
+);
@@ -0,0 +1,8 @@
+-- Carga por lotes de avances (save_user_progress_bulk): ON CONFLICT necesita un
+-- índice único exactamente sobre (usuario_id, clave_idempotencia). Las filas sin
+-- clave (NULL) no chocan entre sí.
+
+ALTER TABLE usuario_avances ADD COLUMN IF NOT EXISTS clave_idempotencia text;
+
+CREATE UNIQUE INDEX IF NOT EXISTS usuario_avances_idempotencia_key
+    ON usuario_avances (usuario_id, clave_idempotencia);
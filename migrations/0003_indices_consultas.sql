@@ -0,0 +1,33 @@
+-- Índices de las consultas frecuentes de UserConnection / AsyncUserConnection.
+-- python -m model.migrations check verifica con EXPLAIN que ninguna consulta
+-- por usuario o por id termine en un Seq Scan.
+
+-- Login (get_user_by_email) y perfil biométrico por email. En una base creada
+-- por 0001 ya existe como restricción UNIQUE con este mismo nombre; en una base
+-- anterior falla si hay emails duplicados, que deben depurarse antes.
+CREATE UNIQUE INDEX IF NOT EXISTS usuarios_email_key ON usuarios (email);
+
+-- get_random_exercises, get_exercises_filtered y get_unique_body_parts: las
+-- columnas incluidas permiten responder con un Index Only Scan
+CREATE INDEX IF NOT EXISTS ejercicios_body_part_idx
+    ON ejercicios (body_part_es) INCLUDE (id, name_es, equipment_es, target_es);
+
+-- Historial paginado por keyset (ORDER BY fecha DESC, id DESC se recorre hacia
+-- atrás), series de la analítica y exportación ordenada por usuario
+CREATE INDEX IF NOT EXISTS usuario_avances_usuario_fecha_idx
+    ON usuario_avances (usuario_id, fecha, id);
+
+-- Última rutina del usuario (ORDER BY fecha_creacion DESC LIMIT 1) y exportación
+CREATE INDEX IF NOT EXISTS usuario_rutinas_usuario_fecha_idx
+    ON usuario_rutinas (usuario_id, fecha_creacion);
+
+CREATE INDEX IF NOT EXISTS recomendaciones_diarias_usuario_idx
+    ON recomendaciones_diarias (id_usuario);
+
+-- Joins entrenadores -> clases -> horario del listado y del detalle de clase
+CREATE INDEX IF NOT EXISTS clases_entrenador_idx ON clases (id_entrenador);
+CREATE INDEX IF NOT EXISTS horario_clase_idx ON horario (id_clase);
+
+-- Listado de entrenadores activos filtrado por especialidad
+CREATE INDEX IF NOT EXISTS entrenadores_activos_especialidad_idx
+    ON entrenadores (especialidad) WHERE estado;
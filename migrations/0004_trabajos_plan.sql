@@ -0,0 +1,23 @@
+-- Cola de trabajos de planes alimenticios (model/nutrition_jobs.py). El estado vive
+-- en la base para que cualquier worker responda GET /jobs/{id} y los trabajos
+-- sobrevivan a un reinicio. "disponible" es el momento desde el que un worker puede
+-- tomar el trabajo: el backoff de un reintento o el fin del arriendo de uno en
+-- proceso (si su worker murió, otro lo retoma).
+
+CREATE TABLE IF NOT EXISTS trabajos_plan (
+    id text PRIMARY KEY,
+    estado text NOT NULL DEFAULT 'pendiente',
+    payload jsonb NOT NULL,
+    intentos integer NOT NULL DEFAULT 0,
+    resultado jsonb,
+    error text,
+    disponible timestamptz NOT NULL DEFAULT now(),
+    creado timestamptz NOT NULL DEFAULT now(),
+    actualizado timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS trabajos_plan_activos_idx
+    ON trabajos_plan (disponible) WHERE estado IN ('pendiente', 'en_proceso');
+
+CREATE INDEX IF NOT EXISTS trabajos_plan_terminados_idx
+    ON trabajos_plan (actualizado) WHERE estado IN ('completado', 'fallido');
@@ -0,0 +1,93 @@
+import time
+from contextlib import asynccontextmanager
+from psycopg_pool import AsyncConnectionPool
+import config
+from model import queries
+from model.queries import Consulta
+from datetime import date
+from model.pagination import consulta_progreso, pagina_progreso
+from model.metrics import metricas, registrar_consulta
+
+
+class AsyncUserConnection():
+    pool = None
+    preparar = True
+
+    def __init__(self, min_size: int = config.DB_POOL_MIN_SIZE, max_size: int = config.DB_POOL_MAX_SIZE,
+                 preparar: bool = config.DB_PREPARED_STATEMENTS):
+        # El pool asíncrono se abre en el arranque de la app (necesita un event loop activo)
+        self.preparar = preparar
+        self.pool = AsyncConnectionPool(
+            config.DATABASE_URL,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=config.DB_POOL_TIMEOUT,
+            max_idle=config.DB_POOL_MAX_IDLE,
+            check=AsyncConnectionPool.check_connection,
+            kwargs=None if preparar else {"prepare_threshold": None},
+            open=False,
+        )
+
+    async def open(self):
+        await self.pool.open()
+
+    async def close(self):
+        await self.pool.close()
+
+    @asynccontextmanager
+    async def _cursor(self, nombre: str):
+        # Igual que UserConnection: una conexión y una transacción por llamada,
+        # con las mismas métricas por consulta
+        inicio = time.perf_counter()
+        filas = 0
+        error = False
+        try:
+            async with self.pool.connection() as conn:
+                metricas.observar("db_pool_wait_seconds", time.perf_counter() - inicio, pool="async")
+                async with conn.cursor() as cur:
+                    yield cur
+                    filas = cur.rowcount
+        except BaseException:
+            error = True
+            raise
+        finally:
+            registrar_consulta(nombre, time.perf_counter() - inicio, max(filas, 0), error)
+
+    async def _fila(self, consulta: Consulta, params=None):
+        async with self._cursor(consulta.nombre) as cur:
+            await cur.execute(consulta.sql, params, prepare=True if consulta.preparada and self.preparar else None)
+            fila = await cur.fetchone()
+            if fila is None:
+                return None
+            return consulta.diccionarios(cur, [fila])[0]
+
+    async def _filas(self, consulta: Consulta, params=None):
+        async with self._cursor(consulta.nombre) as cur:
+            await cur.execute(consulta.sql, params, prepare=True if consulta.preparada and self.preparar else None)
+            filas = await cur.fetchall()
+            if not filas:
+                return filas
+            return consulta.diccionarios(cur, filas)
+
+    async def get_trainers_by_specialty(self, specialty: str = None):
+        if specialty:
+            return await self._filas(queries.ENTRENADORES_POR_ESPECIALIDAD, (specialty,))
+        return await self._filas(queries.ENTRENADORES)
+
+    async def get_user_routine(self, user_id):
+        return await self._fila(queries.RUTINA_ACTUAL, (user_id,))
+
+    async def get_user_progress(self, user_id, limit: int = config.PROGRESS_PAGE_SIZE, cursor: str = None,
+                                desde: date = None, hasta: date = None, ejercicio_id: int = None):
+        query, params = consulta_progreso(user_id, limit, cursor, desde, hasta, ejercicio_id)
+        async with self._cursor("get_user_progress") as cur:
+            await cur.execute(query, params)
+            results = await cur.fetchall()
+
+        return pagina_progreso(results, limit)
+
+    async def fetch_exercise_by_id(self, exercise_id: int):
+        try:
+            return await self._fila(queries.EJERCICIO_POR_ID, (exercise_id,))
+        except Exception as e:
+            raise Exception(f"Error al consultar la base de datos: {str(e)}")
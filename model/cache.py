@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class _Carga():
+    # Una carga en curso de get_or_load: su futuro y si una invalidación de su
+    # clave llegó mientras tanto (entonces el valor no se guarda)
+    __slots__ = ("futuro", "obsoleta")
+
+    def __init__(self):
+        self.futuro = Future()
+        self.obsoleta = False
+
+
+class TTLCache():
+    # Caché en memoria con expiración por TTL y desalojo LRU. get_or_load (y
+    # aget_or_load, su variante asíncrona) además agrupa las cargas concurrentes
+    # de una misma clave en una sola llamada. Una invalidación marca las cargas en
+    # curso de las claves afectadas: su valor se devuelve a quien lo pidió pero no
+    # se guarda, para no volver a cachear datos ya obsoletos. Las demás claves no
+    # se ven afectadas.
+
+    def __init__(self, max_entradas: int = 1024, ttl: float = 300):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._en_vuelo = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.descartadas = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def _leer(self, clave):
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return False, None
+        expira, valor = entrada
+        if expira < time.monotonic():
+            del self._entradas[clave]
+            return False, None
+        self._entradas.move_to_end(clave)
+        return True, valor
+
+    def get(self, clave, default=None):
+        with self._lock:
+            encontrado, valor = self._leer(clave)
+            if encontrado:
+                self.hits += 1
+                return valor
+            self.misses += 1
+            return default
+
+    def _guardar(self, clave, valor):
+        self._entradas[clave] = (time.monotonic() + self.ttl, valor)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def put(self, clave, valor):
+        with self._lock:
+            self._guardar(clave, valor)
+
+    def _descartar_cargas(self, claves):
+        # Las peticiones nuevas de estas claves inician otra carga en vez de
+        # sumarse a una que ya leyó datos viejos
+        for clave in claves:
+            self._en_vuelo.pop(clave).obsoleta = True
+
+    def invalidate(self, clave):
+        with self._lock:
+            self._entradas.pop(clave, None)
+            if clave in self._en_vuelo:
+                self._descartar_cargas([clave])
+
+    def invalidate_where(self, predicado):
+        with self._lock:
+            for clave in [clave for clave in self._entradas if predicado(clave)]:
+                del self._entradas[clave]
+            self._descartar_cargas([clave for clave in self._en_vuelo if predicado(clave)])
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self._descartar_cargas(list(self._en_vuelo))
+
+    def _reservar(self, clave):
+        # Devuelve (encontrado, valor, carga, propia): el valor si la clave está en
+        # caché; si no, la carga en curso y si esta llamada es la que debe cargar
+        with self._lock:
+            encontrado, valor = self._leer(clave)
+            if encontrado:
+                self.hits += 1
+                return True, valor, None, False
+
+            carga = self._en_vuelo.get(clave)
+            propia = carga is None
+            if propia:
+                self.misses += 1
+                carga = _Carga()
+                self._en_vuelo[clave] = carga
+            else:
+                self.coalesced += 1
+            return False, None, carga, propia
+
+    def _terminar(self, clave, carga, valor=None, error=None):
+        with self._lock:
+            if error is None:
+                if carga.obsoleta:
+                    self.descartadas += 1
+                else:
+                    self._guardar(clave, valor)
+            # Tras una invalidación la clave puede tener ya otra carga en curso
+            if self._en_vuelo.get(clave) is carga:
+                del self._en_vuelo[clave]
+        if error is None:
+            carga.futuro.set_result(valor)
+        else:
+            carga.futuro.set_exception(error)
+
+    def get_or_load(self, clave, loader):
+        encontrado, valor, carga, propia = self._reservar(clave)
+        if encontrado:
+            return valor
+
+        # Otra petición ya está cargando esta clave: esperar su resultado
+        if not propia:
+            return carga.futuro.result()
+
+        try:
+            valor = loader()
+        except BaseException as e:
+            self._terminar(clave, carga, error=e)
+            raise
+        self._terminar(clave, carga, valor)
+        return valor
+
+    async def aget_or_load(self, clave, loader):
+        # Igual que get_or_load para cargas asíncronas: loader() devuelve una corrutina
+        # y quienes esperan la misma clave lo hacen sin bloquear el event loop
+        encontrado, valor, carga, propia = self._reservar(clave)
+        if encontrado:
+            return valor
+
+        if not propia:
+            return await asyncio.wrap_future(carga.futuro)
+
+        try:
+            valor = await loader()
+        except BaseException as e:
+            self._terminar(clave, carga, error=e)
+            raise
+        self._terminar(clave, carga, valor)
+        return valor
+
+    def stats(self):
+        with self._lock:
+            consultas = self.hits + self.misses + self.coalesced
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "descartadas": self.descartadas,
+                "en_vuelo": len(self._en_vuelo),
+                "hit_ratio": round((self.hits + self.coalesced) / consultas, 4) if consultas else 0.0,
+            }
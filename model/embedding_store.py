@@ -0,0 +1,158 @@
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from model.face_index import DIMENSION, UMBRAL_DISTANCIA, buscar_vecinos
+
+BYTES_VECTOR = DIMENSION * 4
+BYTES_ID = 8
+
+
+class EmbeddingStore():
+    # Almacén de vectores biométricos en disco, compartido por todos los workers:
+    #   vectores.f32 -> matriz float32 de stride fijo (128 floats por fila)
+    #   ids.i64      -> id de usuario de cada fila
+    # Cada worker lo mapea con np.memmap (sin copias, las páginas las comparte el
+    # kernel). Las actualizaciones se agregan al final; si un usuario se registra
+    # de nuevo, su fila anterior queda excluida de las búsquedas.
+
+    def __init__(self, directorio: str, loader):
+        self._loader = loader
+        self._ruta_vectores = os.path.join(directorio, "vectores.f32")
+        self._ruta_ids = os.path.join(directorio, "ids.i64")
+        self._ruta_lock = os.path.join(directorio, ".lock")
+        os.makedirs(directorio, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._firma = None
+        self._matriz = np.empty((0, DIMENSION), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._normas = np.empty(0, dtype=np.float32)
+        self._excluir = np.empty(0, dtype=np.intp)
+
+    def __len__(self):
+        with self._lock:
+            self._refrescar()
+            return len(self._ids) - len(self._excluir)
+
+    def cargar(self):
+        # Misma interfaz que FaceIndex.cargar: construye o mapea los archivos
+        return len(self)
+
+    @contextmanager
+    def _flock(self, modo):
+        # Lock entre procesos: exclusivo para escribir, compartido para mapear
+        with open(self._ruta_lock, "a+b") as f:
+            fcntl.flock(f, modo)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _asegurar_archivos(self):
+        # El primer worker que arranca sin archivos los construye desde "usuarios";
+        # el resto solo los mapea.
+        if os.path.exists(self._ruta_ids):
+            return
+        with self._flock(fcntl.LOCK_EX):
+            if not os.path.exists(self._ruta_ids):
+                self._escribir(self._loader())
+
+    def reconstruir(self):
+        # Reescribe los archivos desde la base de datos, eliminando filas obsoletas
+        with self._flock(fcntl.LOCK_EX):
+            self._escribir(self._loader())
+
+    def _escribir(self, filas):
+        ultimos = {}
+        for user_id, vector_bytes in filas:
+            if len(vector_bytes) == BYTES_VECTOR:
+                ultimos[user_id] = vector_bytes
+
+        ids = np.fromiter(ultimos.keys(), dtype=np.int64, count=len(ultimos))
+        for ruta, contenido in (
+            (self._ruta_vectores, b"".join(ultimos.values())),
+            (self._ruta_ids, ids.tobytes()),
+        ):
+            temporal = ruta + ".tmp"
+            with open(temporal, "wb") as f:
+                f.write(contenido)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, ruta)
+
+    def _firma_actual(self):
+        estado = os.stat(self._ruta_ids)
+        return (estado.st_ino, estado.st_size)
+
+    def _refrescar(self):
+        self._asegurar_archivos()
+        if self._firma_actual() == self._firma:
+            return
+
+        with self._flock(fcntl.LOCK_SH):
+            firma = self._firma_actual()
+            # Las filas finales sin id (escritura interrumpida) no se mapean
+            n = min(os.path.getsize(self._ruta_vectores) // BYTES_VECTOR, firma[1] // BYTES_ID)
+            if n:
+                matriz = np.memmap(self._ruta_vectores, dtype=np.float32, mode="r", shape=(n, DIMENSION))
+                ids = np.memmap(self._ruta_ids, dtype=np.int64, mode="r", shape=(n,))
+            else:
+                matriz = np.empty((0, DIMENSION), dtype=np.float32)
+                ids = np.empty(0, dtype=np.int64)
+
+        # Si solo se agregaron filas al mismo archivo, calcular normas únicamente de las nuevas
+        previas = len(self._normas) if self._firma and self._firma[0] == firma[0] else 0
+        nuevas = np.einsum("ij,ij->i", matriz[previas:], matriz[previas:])
+        self._normas = np.concatenate((self._normas[:previas], nuevas)).astype(np.float32, copy=False)
+
+        # La última fila de cada usuario es la vigente
+        _, ultimas = np.unique(ids[::-1], return_index=True)
+        vigentes = np.zeros(n, dtype=bool)
+        vigentes[n - 1 - ultimas] = True
+        self._excluir = np.flatnonzero(~vigentes)
+
+        self._matriz, self._ids, self._firma = matriz, ids, firma
+
+    def upsert(self, user_id: int, vector: np.ndarray):
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (DIMENSION,):
+            return
+        self._asegurar_archivos()
+        # El vector se escribe antes que el id: una fila solo cuenta cuando su id existe
+        with self._flock(fcntl.LOCK_EX):
+            with open(self._ruta_vectores, "r+b") as vectores, open(self._ruta_ids, "r+b") as ids:
+                # Un proceso que murió entre ambas escrituras deja un vector sin id (o una
+                # fila a medias): se recortan los dos archivos a las filas completas para
+                # que el nuevo id quede en la misma fila que su vector
+                filas = min(os.fstat(vectores.fileno()).st_size // BYTES_VECTOR, os.fstat(ids.fileno()).st_size // BYTES_ID)
+                vectores.truncate(filas * BYTES_VECTOR)
+                ids.truncate(filas * BYTES_ID)
+                for f, contenido, fila in (
+                    (vectores, vector.tobytes(), filas * BYTES_VECTOR),
+                    (ids, np.int64(user_id).tobytes(), filas * BYTES_ID),
+                ):
+                    f.seek(fila)
+                    f.write(contenido)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def search(self, vector: np.ndarray, k: int = 1, umbral: float = UMBRAL_DISTANCIA):
+        with self._lock:
+            self._refrescar()
+            return buscar_vecinos(self._matriz, self._ids, self._normas, vector, k, umbral, excluir=self._excluir)
+
+
+if __name__ == "__main__":
+    # Reconstrucción manual: python -m model.embedding_store
+    import config
+    from model.user_connection import UserConnection
+
+    conn = UserConnection(min_size=1, max_size=1)
+    try:
+        store = EmbeddingStore(config.FACE_STORE_DIR or "data/embeddings", conn.get_biometric_vectors)
+        store.reconstruir()
+        print(f"Almacén reconstruido con {len(store)} vectores")
+    finally:
+        conn.close()
@@ -0,0 +1,18 @@
+import hashlib
+import json
+
+
+def serializar_json(contenido):
+    # Cuerpo JSON ya serializado y su ETag fuerte (sha256 del cuerpo exacto)
+    cuerpo = json.dumps(contenido, ensure_ascii=False, default=str).encode("utf-8")
+    return cuerpo, f'"{hashlib.sha256(cuerpo).hexdigest()}"'
+
+
+def etag_coincide(if_none_match: str, etag: str) -> bool:
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidatos = (valor.strip() for valor in if_none_match.split(","))
+    return any(candidato.removeprefix("W/") == etag for candidato in candidatos)
@@ -0,0 +1,62 @@
+import random
+import threading
+
+
+class ExerciseCatalog():
+    # Catálogo de ejercicios en memoria, indexado por body_part_es, target_es y
+    # equipment_es. Se carga una vez desde la base de datos; refresh() lo recarga
+    # e invalidate() fuerza la recarga en el próximo uso.
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._indices = None
+
+    def _asegurar_cargado(self):
+        indices = self._indices
+        if indices is None:
+            with self._lock:
+                if self._indices is None:
+                    self._indices = self._construir(self._loader())
+                indices = self._indices
+        return indices
+
+    def _construir(self, ejercicios):
+        indices = {"body_part_es": {}, "target_es": {}, "equipment_es": {}}
+        for ejercicio in ejercicios:
+            fila = {
+                "id": ejercicio["id"],
+                "name_es": ejercicio["name_es"],
+                "equipment_es": ejercicio["equipment_es"],
+                "target_es": ejercicio["target_es"],
+            }
+            for campo, indice in indices.items():
+                indice.setdefault(ejercicio[campo], []).append(fila)
+        return indices
+
+    def refresh(self):
+        indices = self._construir(self._loader())
+        # Reemplazo atómico: las lecturas en curso siguen usando los índices anteriores
+        self._indices = indices
+        return sum(len(filas) for filas in indices["body_part_es"].values())
+
+    def invalidate(self):
+        self._indices = None
+
+    def sample(self, body_part: str, limit: int, target: str = None, equipment: str = None):
+        indices = self._asegurar_cargado()
+        candidatos = indices["body_part_es"].get(body_part, [])
+        if target is not None:
+            candidatos = [fila for fila in candidatos if fila["target_es"] == target]
+        if equipment is not None:
+            candidatos = [fila for fila in candidatos if fila["equipment_es"] == equipment]
+
+        # random.sample elige k elementos sin ordenar todo el grupo
+        elegidos = random.sample(candidatos, min(limit, len(candidatos)))
+        return [dict(fila) for fila in elegidos]
+
+    def by_target(self, target: str):
+        return [dict(fila) for fila in self._asegurar_cargado()["target_es"].get(target, [])]
+
+    def by_equipment(self, equipment: str):
+        return [dict(fila) for fila in self._asegurar_cargado()["equipment_es"].get(equipment, [])]
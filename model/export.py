@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+# Datos exportables: columnas, consulta base, columna de usuario y orden
+# (el orden sigue los índices por usuario para que el recorrido sea secuencial)
+EXPORTACIONES = {
+    "progreso": (
+        ("id", "usuario_id", "ejercicio_id", "name_es", "repeticiones", "peso", "fecha"),
+        """
+            SELECT u.id, u.usuario_id, u.ejercicio_id, e.name_es, u.repeticiones, u.peso, u.fecha
+            FROM usuario_avances u
+            JOIN ejercicios e ON u.ejercicio_id = e.id
+        """,
+        "u.usuario_id",
+        "u.usuario_id, u.fecha, u.id",
+    ),
+    "rutinas": (
+        ("id", "usuario_id", "rutina", "fecha_creacion"),
+        """
+            SELECT id, usuario_id, rutina, fecha_creacion
+            FROM usuario_rutinas
+        """,
+        "usuario_id",
+        "usuario_id, fecha_creacion",
+    ),
+    "recomendaciones": (
+        ("usuario_id", "recomendaciones"),
+        """
+            SELECT id_usuario, recomendaciones
+            FROM recomendaciones_diarias
+        """,
+        "id_usuario",
+        "id_usuario",
+    ),
+}
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def consulta_exportacion(entidad: str, user_id: int = None):
+    columnas, query, columna_usuario, orden = EXPORTACIONES[entidad]
+    params = []
+    if user_id is not None:
+        query += f" WHERE {columna_usuario} = %s"
+        params.append(user_id)
+    query += f" ORDER BY {orden}"
+    return columnas, query, params
+
+
+def _serializar(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def lotes_ndjson(columnas, lotes, tipo: str = None):
+    # Un fragmento por lote de filas (no uno por fila) para no saturar el envío
+    for filas in lotes:
+        lineas = []
+        for fila in filas:
+            registro = dict(zip(columnas, fila))
+            if tipo:
+                registro = {"tipo": tipo, **registro}
+            lineas.append(json.dumps(registro, ensure_ascii=False, default=_serializar))
+        yield "\n".join(lineas) + "\n"
+
+
+def lotes_csv(columnas, lotes):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    for filas in lotes:
+        for fila in filas:
+            # Las columnas JSON (rutina, recomendaciones) van como texto JSON en la celda
+            escritor.writerow([
+                json.dumps(valor, ensure_ascii=False) if isinstance(valor, (dict, list)) else valor
+                for valor in fila
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Sin filas: solo la cabecera
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,86 @@
+import os
+import time
+import numpy as np
+import config
+from model.process_pool import PoolSaturado, ProcessPool
+
+ETAPAS = ("cola", "decode", "resize", "detect", "encode")
+
+
+class FaceEncoderSaturado(PoolSaturado):
+    pass
+
+
+def _precargar():
+    # OpenCV y face_recognition (modelos de dlib) solo se importan dentro de los
+    # procesos del pool; el worker de la API nunca los carga
+    import cv2
+    import face_recognition
+    return os.getpid()
+
+
+def _codificar(imagen_bytes: bytes, max_dimension: int):
+    # Corre dentro de un proceso del pool: todo el trabajo de OpenCV/dlib queda
+    # fuera del event loop y del GIL del worker de la API.
+    import cv2
+    import face_recognition
+    tiempos = {}
+
+    inicio = time.perf_counter()
+    imagen = cv2.imdecode(np.frombuffer(imagen_bytes, np.uint8), cv2.IMREAD_COLOR)
+    tiempos["decode"] = time.perf_counter() - inicio
+    if imagen is None:
+        return None, tiempos
+
+    # Reducir fotos grandes antes de la detección HOG, cuyo costo crece con los píxeles
+    inicio = time.perf_counter()
+    alto, ancho = imagen.shape[:2]
+    escala = max_dimension / max(alto, ancho)
+    if escala < 1:
+        imagen = cv2.resize(imagen, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    tiempos["resize"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    ubicaciones = face_recognition.face_locations(imagen)
+    tiempos["detect"] = time.perf_counter() - inicio
+    if not ubicaciones:
+        return None, tiempos
+
+    # Solo se usa el primer rostro, así que solo se codifica ese
+    inicio = time.perf_counter()
+    vectores = face_recognition.face_encodings(imagen, known_face_locations=ubicaciones[:1])
+    tiempos["encode"] = time.perf_counter() - inicio
+
+    return np.asarray(vectores[0], dtype=np.float32), tiempos
+
+
+class FaceEncoder(ProcessPool):
+    # Pool de procesos acotado para detección y codificación de rostros. Si hay
+    # más de max_pendientes imágenes en cola se rechazan nuevas con FaceEncoderSaturado.
+    saturado = FaceEncoderSaturado
+    mensaje_saturado = "Demasiadas imágenes en proceso, intenta nuevamente en unos segundos"
+    metrica = "face_stage_duration_seconds"
+    etiqueta = "etapa"
+
+    def __init__(
+        self,
+        max_workers: int = config.FACE_WORKERS,
+        max_pendientes: int = config.FACE_MAX_PENDING,
+        max_dimension: int = config.FACE_MAX_DIMENSION,
+    ):
+        super().__init__(max_workers, max_pendientes, _precargar, ETAPAS)
+        self.max_dimension = max_dimension
+
+    async def encode(self, imagen_bytes: bytes):
+        inicio = time.perf_counter()
+        vector, tiempos = await self._ejecutar(_codificar, imagen_bytes, self.max_dimension)
+        # Lo que no se gastó en el proceso hijo es espera en cola (más serialización)
+        tiempos["cola"] = max(0.0, time.perf_counter() - inicio - sum(tiempos.values()))
+        self._registrar(tiempos)
+        return vector, tiempos
+
+    def stats(self):
+        estado = super().stats()
+        estado["max_dimension"] = self.max_dimension
+        estado["etapas"] = estado.pop("tiempos")
+        return estado
@@ -0,0 +1,164 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import config
+
+DIMENSION = 128
+UMBRAL_DISTANCIA = config.UMBRAL_DISTANCIA
+
+
+def buscar_vecinos(matriz: np.ndarray, ids: np.ndarray, normas: np.ndarray, vector: np.ndarray, k: int, umbral: float, excluir=None):
+    # Distancia euclídea de la consulta contra toda la matriz en una sola operación:
+    # |a - b|² = |a|² - 2·a·b + |b|²
+    if len(ids) == 0:
+        return []
+    vector = np.asarray(vector, dtype=np.float32)
+    distancias = normas - 2.0 * (matriz @ vector) + float(vector @ vector)
+    np.sqrt(np.maximum(distancias, 0.0, out=distancias), out=distancias)
+    # Filas reemplazadas por un registro más reciente del mismo usuario
+    if excluir is not None and len(excluir):
+        distancias[excluir] = np.inf
+
+    k = min(k, len(ids))
+    candidatos = np.argpartition(distancias, k - 1)[:k]
+    candidatos = candidatos[np.argsort(distancias[candidatos])]
+    return [
+        {"usuario_id": int(ids[i]), "distancia": float(distancias[i])}
+        for i in candidatos
+        if distancias[i] <= umbral
+    ]
+
+
+class FaceIndex():
+    # Índice en memoria de los vectores biométricos: una matriz float32 contigua
+    # (una fila por usuario) que se carga una sola vez desde la base de datos y
+    # luego se actualiza fila a fila en cada registro biométrico.
+
+    def __init__(self, loader, capacidad_inicial: int = 1024):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._cargado = False
+        self._matriz = np.empty((capacidad_inicial, DIMENSION), dtype=np.float32)
+        self._normas = np.empty(capacidad_inicial, dtype=np.float32)
+        self._ids = np.empty(capacidad_inicial, dtype=np.int64)
+        self._filas = {}
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def _asegurar_cargado(self):
+        if self._cargado:
+            return
+        with self._lock:
+            if self._cargado:
+                return
+            for user_id, vector_bytes in self._loader():
+                self._insertar(user_id, np.frombuffer(vector_bytes, dtype=np.float32))
+            self._cargado = True
+
+    def cargar(self):
+        # Carga anticipada (calentamiento); devuelve los vectores en el índice
+        self._asegurar_cargado()
+        return self._n
+
+    def _insertar(self, user_id: int, vector: np.ndarray):
+        if vector.shape != (DIMENSION,):
+            return
+        fila = self._filas.get(user_id)
+        if fila is None:
+            if self._n == len(self._ids):
+                self._crecer()
+            fila = self._n
+            self._filas[user_id] = fila
+            self._ids[fila] = user_id
+            self._n += 1
+        self._matriz[fila] = vector
+        self._normas[fila] = float(vector @ vector)
+
+    def _crecer(self):
+        capacidad = len(self._ids) * 2
+        self._matriz = np.resize(self._matriz, (capacidad, DIMENSION))
+        self._normas = np.resize(self._normas, capacidad)
+        self._ids = np.resize(self._ids, capacidad)
+
+    def upsert(self, user_id: int, vector: np.ndarray):
+        # Si el índice aún no se cargó no hace falta tocarlo: la carga inicial
+        # leerá el vector recién guardado desde la base de datos.
+        if not self._cargado:
+            return
+        with self._lock:
+            self._insertar(user_id, np.asarray(vector, dtype=np.float32))
+
+    def remove(self, user_id: int):
+        if not self._cargado:
+            return
+        with self._lock:
+            fila = self._filas.pop(user_id, None)
+            if fila is None:
+                return
+            # La última fila ocupa el hueco para que la matriz siga compacta
+            ultima = self._n - 1
+            if fila != ultima:
+                self._matriz[fila] = self._matriz[ultima]
+                self._normas[fila] = self._normas[ultima]
+                self._ids[fila] = self._ids[ultima]
+                self._filas[int(self._ids[fila])] = fila
+            self._n = ultima
+
+    @property
+    def cargado(self):
+        return self._cargado
+
+    def invalidar(self):
+        # La próxima búsqueda vuelve a cargar todos los vectores desde la base de datos
+        with self._lock:
+            self._cargado = False
+            self._filas = {}
+            self._n = 0
+
+    def search(self, vector: np.ndarray, k: int = 1, umbral: float = UMBRAL_DISTANCIA):
+        self._asegurar_cargado()
+        with self._lock:
+            n = self._n
+            return buscar_vecinos(self._matriz[:n], self._ids[:n], self._normas[:n], vector, k, umbral)
+
+
+class VectorCache():
+    # LRU de perfiles biométricos ya decodificados (datos del usuario + vector
+    # float32), accesible por id o por email, para el login por rostro.
+
+    def __init__(self, max_entradas: int = 4096):
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._emails = {}
+
+    def get(self, user_id: int = None, email: str = None):
+        with self._lock:
+            if user_id is None:
+                user_id = self._emails.get(email)
+            entrada = self._entradas.get(user_id)
+            if entrada is not None:
+                self._entradas.move_to_end(user_id)
+            return entrada
+
+    def put(self, user_id: int, email: str, entrada: dict):
+        with self._lock:
+            self._entradas[user_id] = entrada
+            self._entradas.move_to_end(user_id)
+            self._emails[email] = user_id
+            while len(self._entradas) > self.max_entradas:
+                _, descartada = self._entradas.popitem(last=False)
+                self._emails.pop(descartada["usuario"]["email"], None)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            entrada = self._entradas.pop(user_id, None)
+            if entrada is not None:
+                self._emails.pop(entrada["usuario"]["email"], None)
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self._emails.clear()
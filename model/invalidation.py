@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import threading
+import uuid
+import psycopg
+from psycopg import sql
+import config
+
+logger = logging.getLogger(__name__)
+
+# Entidad especial: se perdieron notificaciones (p. ej. reconexión) y hay que vaciar todo
+TODAS = "*"
+
+# Una sola sentencia para todos los avisos de una transacción
+NOTIFICAR = "SELECT pg_notify(%s, mensaje) FROM unnest(%s::text[]) AS mensaje"
+
+
+class InvalidationBus():
+    # Bus de invalidación entre workers sobre LISTEN/NOTIFY de Postgres. Cada escritura
+    # publica (entidad, clave) dentro de su misma transacción y cada worker escucha
+    # en un hilo con su propia conexión para desalojar sus cachés locales. Los
+    # mensajes propios se ignoran porque el worker que escribe ya invalidó sus
+    # cachés al momento.
+
+    def __init__(self, pool, dsn: str = config.DATABASE_URL, canal: str = config.CACHE_INVALIDATION_CHANNEL):
+        self.pool = pool
+        self.dsn = dsn
+        self.canal = canal
+        self.origen = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._suscriptores = []
+        self._detener = threading.Event()
+        self._escuchando = threading.Event()
+        self._hilo = None
+        self.publicados = 0
+        self.recibidos = 0
+        self.conexiones = 0
+
+    def suscribir(self, callback):
+        self._suscriptores.append(callback)
+
+    def publicar_en(self, conn, avisos):
+        # avisos: lista de (entidad, clave). Se ejecuta en la conexión de la escritura,
+        # antes del commit: Postgres entrega el NOTIFY al confirmar (y solo si confirma),
+        # sin otra conexión del pool ni otro commit
+        mensajes = [json.dumps({"o": self.origen, "e": entidad, "k": clave}) for entidad, clave in avisos]
+        if not mensajes:
+            return
+        conn.execute(NOTIFICAR, (self.canal, mensajes))
+        self.publicados += len(mensajes)
+
+    def publicar(self, entidad: str, claves):
+        # Para invalidaciones que no acompañan a una escritura (p. ej. entrenadores
+        # editados fuera de la API): transacción propia
+        try:
+            with self.pool.connection() as conn:
+                self.publicar_en(conn, [(entidad, clave) for clave in claves])
+        except Exception:
+            # Los demás workers quedan cubiertos por el TTL
+            logger.exception("No se pudo publicar la invalidación de %s", entidad)
+
+    def start(self, espera: float = 5.0):
+        # Espera (a lo sumo espera segundos) a que el LISTEN esté activo y se haya
+        # despachado el vaciado inicial, así los cachés que se cargan después en el
+        # arranque (calentamiento) no se descartan enseguida
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._escuchar, name="invalidation-bus", daemon=True)
+            self._hilo.start()
+        self._escuchando.wait(espera)
+
+    def stop(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+
+    def _despachar(self, entidad, clave):
+        for callback in self._suscriptores:
+            try:
+                callback(entidad, clave)
+            except Exception:
+                logger.exception("Error al invalidar %s %s", entidad, clave)
+
+    def _escuchar(self):
+        espera = 0.5
+        while not self._detener.is_set():
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.canal)))
+                    # Antes de escuchar (o mientras no hubo conexión) se pudieron perder
+                    # invalidaciones: se vacían los cachés locales
+                    self.conexiones += 1
+                    self._despachar(TODAS, None)
+                    self._escuchando.set()
+                    espera = 0.5
+                    while not self._detener.is_set():
+                        # El timeout permite revisar periódicamente si hay que detenerse
+                        for notificacion in conn.notifies(timeout=1.0):
+                            mensaje = json.loads(notificacion.payload)
+                            if mensaje["o"] == self.origen:
+                                continue
+                            self.recibidos += 1
+                            self._despachar(mensaje["e"], mensaje["k"])
+            except Exception:
+                logger.exception("Conexión LISTEN perdida, reintentando en %.1f s", espera)
+                self._detener.wait(espera)
+                espera = min(espera * 2, 30)
+
+    def stats(self):
+        return {
+            "canal": self.canal,
+            "origen": self.origen,
+            "escuchando": self._hilo is not None and self._hilo.is_alive(),
+            "publicados": self.publicados,
+            "recibidos": self.recibidos,
+            "conexiones": self.conexiones,
+        }
@@ -0,0 +1,95 @@
+import numpy as np
+
+# Tabla local de comidas: (descripción, proteínas g, carbohidratos g, grasas g) por porción
+COMIDAS = {
+    "desayuno": [
+        ("Avena cocida con leche descremada, plátano y nueces", 18, 70, 14),
+        ("Huevos revueltos (3) con pan integral y palta", 24, 32, 26),
+        ("Yogur griego con granola y frutos rojos", 25, 45, 9),
+        ("Tortilla de claras con espinaca y tostadas integrales", 28, 30, 5),
+        ("Panqueques de avena y plátano con miel", 15, 75, 8),
+        ("Batido de proteína con leche, avena y mantequilla de maní", 35, 40, 16),
+        ("Pan integral con queso fresco, tomate y jamón de pavo", 26, 38, 10),
+        ("Quinoa con leche, manzana y canela", 14, 62, 7),
+    ],
+    "almuerzo": [
+        ("Pechuga de pollo a la plancha con arroz integral y ensalada", 45, 60, 10),
+        ("Salmón al horno con papas cocidas y brócoli", 38, 45, 20),
+        ("Lomo de res salteado con arroz y verduras", 40, 65, 18),
+        ("Lentejas guisadas con arroz y ensalada fresca", 24, 80, 6),
+        ("Pasta integral con atún, tomate y aceite de oliva", 35, 75, 14),
+        ("Pavo al horno con camote y vainitas", 42, 50, 8),
+        ("Quinoa con garbanzos, verduras asadas y palta", 20, 65, 18),
+        ("Tallarines de arroz con langostinos y verduras", 30, 70, 9),
+    ],
+    "cena": [
+        ("Pescado blanco a la plancha con ensalada y quinoa", 35, 35, 8),
+        ("Omelette de 3 huevos con champiñones y ensalada", 22, 8, 18),
+        ("Pollo al horno con verduras salteadas", 38, 15, 10),
+        ("Tortillas integrales con pollo, frijoles y pico de gallo", 32, 45, 12),
+        ("Crema de zapallo con tofu salteado", 20, 30, 14),
+        ("Atún con papa sancochada y ensalada de pepino", 30, 35, 9),
+        ("Carne molida magra con puré de coliflor", 34, 12, 16),
+        ("Sopa de pollo con fideos y verduras", 28, 40, 7),
+    ],
+    "snack": [
+        ("Manzana con mantequilla de maní", 7, 28, 16),
+        ("Yogur natural con semillas de chía", 12, 15, 8),
+        ("Puñado de almendras y una mandarina", 7, 15, 15),
+        ("Batido de proteína con agua", 25, 4, 2),
+        ("Queso fresco con galletas integrales", 12, 20, 8),
+        ("Plátano con un vaso de leche descremada", 9, 38, 1),
+        ("Huevos duros (2) con tomate", 13, 4, 10),
+        ("Hummus con palitos de zanahoria", 6, 20, 9),
+    ],
+}
+
+# Rango permitido para escalar las porciones de un día completo
+PORCION_MIN = 0.5
+PORCION_MAX = 2.0
+
+
+def _matriz(tiempo: str):
+    return np.array([comida[1:] for comida in COMIDAS[tiempo]], dtype=np.float64)
+
+
+def generar_plan_local(macros: dict, dias: int = 4):
+    objetivo = np.array([macros["proteinas"], macros["carbohidratos"], macros["grasas"]], dtype=np.float64)
+    tiempos = list(COMIDAS)
+
+    # Macros de todas las combinaciones desayuno x almuerzo x cena x snack de una vez
+    desayuno, almuerzo, cena, snack = (_matriz(t) for t in tiempos)
+    totales = (
+        desayuno[:, None, None, None, :]
+        + almuerzo[None, :, None, None, :]
+        + cena[None, None, :, None, :]
+        + snack[None, None, None, :, :]
+    )
+    forma = totales.shape[:-1]
+    totales = totales.reshape(-1, 3)
+
+    # Factor de porción óptimo por combinación (mínimos cuadrados sobre el error
+    # relativo de cada macro) y el error que queda tras aplicarlo
+    pesos = 1.0 / np.maximum(objetivo, 1.0) ** 2
+    factor = (totales * pesos) @ objetivo / ((totales * totales) @ pesos)
+    factor = np.clip(factor, PORCION_MIN, PORCION_MAX)
+    error = (((totales * factor[:, None] - objetivo) / np.maximum(objetivo, 1.0)) ** 2).sum(axis=1)
+
+    # Elegir las mejores combinaciones sin repetir comidas entre días
+    usadas = [set() for _ in tiempos]
+    plan = {}
+    for indice in np.argsort(error, kind="stable"):
+        combinacion = np.unravel_index(indice, forma)
+        if any(opcion in usadas[i] for i, opcion in enumerate(combinacion)):
+            continue
+        for i, opcion in enumerate(combinacion):
+            usadas[i].add(opcion)
+
+        porcion = f" (porción x{factor[indice]:.1f})" if round(factor[indice], 1) != 1.0 else ""
+        plan[f"dia {len(plan) + 1}"] = {
+            tiempo: COMIDAS[tiempo][opcion][0] + porcion
+            for tiempo, opcion in zip(tiempos, combinacion)
+        }
+        if len(plan) == dias:
+            break
+    return plan
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+import config
+
+logger = logging.getLogger(__name__)
+
+# Límites (segundos) de los buckets de todos los histogramas: desde consultas
+# de medio milisegundo hasta llamadas a la IA de un minuto
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Histograma():
+    __slots__ = ("cuentas", "suma", "total")
+
+    def __init__(self):
+        self.cuentas = [0] * len(BUCKETS)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        for i, limite in enumerate(BUCKETS):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                break
+        self.suma += valor
+        self.total += 1
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(etiquetas, extra=()):
+    partes = [f'{clave}="{_escapar(valor)}"' for clave, valor in (*etiquetas, *extra)]
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class Metricas():
+    # Registro en memoria de histogramas, contadores y gauges con etiquetas, que
+    # se exporta en el formato de texto de Prometheus. Las etiquetas se guardan
+    # como tuplas ordenadas de (nombre, valor).
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}
+        self._contadores = {}
+        self._gauges = {}
+        self._ayuda = {}
+        self._recolectores = []
+
+    def describir(self, nombre: str, ayuda: str):
+        self._ayuda[nombre] = ayuda
+
+    def agregar_recolector(self, funcion):
+        # funcion() se llama antes de cada exportación para fijar gauges del estado
+        # actual (pools, colas); así cada router registra solo lo que montó
+        self._recolectores.append(funcion)
+
+    def observar(self, nombre: str, segundos: float, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            serie = self._histogramas.setdefault(nombre, {})
+            histograma = serie.get(clave)
+            if histograma is None:
+                histograma = serie[clave] = _Histograma()
+            histograma.observar(segundos)
+
+    def incrementar(self, nombre: str, valor: float = 1, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            serie = self._contadores.setdefault(nombre, {})
+            serie[clave] = serie.get(clave, 0) + valor
+
+    def fijar(self, nombre: str, valor: float, **etiquetas):
+        with self._lock:
+            self._gauges.setdefault(nombre, {})[tuple(sorted(etiquetas.items()))] = valor
+
+    @contextmanager
+    def cronometro(self, nombre: str, **etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio, **etiquetas)
+
+    def prometheus(self):
+        for funcion in self._recolectores:
+            try:
+                funcion()
+            except Exception:
+                logger.exception("Error al recolectar métricas")
+        lineas = []
+        with self._lock:
+            for tipo, metricas in (("counter", self._contadores), ("gauge", self._gauges)):
+                for nombre, serie in sorted(metricas.items()):
+                    if nombre in self._ayuda:
+                        lineas.append(f"# HELP {nombre} {self._ayuda[nombre]}")
+                    lineas.append(f"# TYPE {nombre} {tipo}")
+                    for clave, valor in serie.items():
+                        lineas.append(f"{nombre}{_etiquetas(clave)} {valor}")
+
+            for nombre, serie in sorted(self._histogramas.items()):
+                if nombre in self._ayuda:
+                    lineas.append(f"# HELP {nombre} {self._ayuda[nombre]}")
+                lineas.append(f"# TYPE {nombre} histogram")
+                for clave, histograma in serie.items():
+                    acumulado = 0
+                    for limite, cuenta in zip(BUCKETS, histograma.cuentas):
+                        acumulado += cuenta
+                        lineas.append(f"{nombre}_bucket{_etiquetas(clave, (('le', limite),))} {acumulado}")
+                    lineas.append(f"{nombre}_bucket{_etiquetas(clave, (('le', '+Inf'),))} {histograma.total}")
+                    lineas.append(f"{nombre}_sum{_etiquetas(clave)} {histograma.suma}")
+                    lineas.append(f"{nombre}_count{_etiquetas(clave)} {histograma.total}")
+        return "\n".join(lineas) + "\n"
+
+
+# Registro compartido por la capa de datos, los pools y la API
+metricas = Metricas()
+metricas.describir("http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta y estado")
+metricas.describir("db_query_duration_seconds", "Duración de las consultas de UserConnection (incluye commit)")
+metricas.describir("db_pool_wait_seconds", "Espera para obtener una conexión del pool")
+metricas.describir("db_query_rows_total", "Filas devueltas o afectadas por consulta")
+metricas.describir("db_query_errors_total", "Consultas que terminaron con error")
+metricas.describir("face_stage_duration_seconds", "Duración de cada etapa del pipeline facial")
+metricas.describir("llm_request_duration_seconds", "Duración de las llamadas al modelo de IA")
+metricas.describir("password_hash_duration_seconds", "Duración de las operaciones bcrypt (incluye cola)")
+
+
+def registrar_consulta(nombre: str, segundos: float, filas: int, error: bool = False):
+    metricas.observar("db_query_duration_seconds", segundos, query=nombre)
+    if filas > 0:
+        metricas.incrementar("db_query_rows_total", filas, query=nombre)
+    if error:
+        metricas.incrementar("db_query_errors_total", query=nombre)
+    if config.SLOW_QUERY_MS and segundos * 1000 >= config.SLOW_QUERY_MS:
+        logger.warning("Consulta lenta %s: %.1f ms, %d filas", nombre, segundos * 1000, filas)
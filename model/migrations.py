@@ -0,0 +1,320 @@
+import argparse
+import asyncio
+import hashlib
+import os
+import re
+import sys
+from contextlib import asynccontextmanager, contextmanager
+from datetime import date, datetime
+import psycopg
+from psycopg.types.json import Jsonb
+import config
+from model import nutrition_jobs
+from model.async_user_connection import AsyncUserConnection
+from model.export import EXPORTACIONES, consulta_exportacion
+from model.pagination import codificar_cursor
+from model.user_connection import UserConnection
+
+# Archivos NNNN_descripcion.sql de MIGRATIONS_DIR; cada uno se aplica en su propia
+# transacción y queda registrado en schema_migraciones con su checksum
+PATRON = re.compile(r"^(\d{4})_(\w+)\.sql$")
+# Serializa upgrade entre workers o pods que arrancan a la vez
+LOCK_MIGRACIONES = 72070024
+
+
+def cargar_migraciones(directorio: str = config.MIGRATIONS_DIR):
+    migraciones = []
+    for archivo in sorted(os.listdir(directorio)):
+        coincidencia = PATRON.match(archivo)
+        if not coincidencia:
+            continue
+        with open(os.path.join(directorio, archivo), "rb") as f:
+            contenido = f.read()
+        migraciones.append({
+            "version": int(coincidencia.group(1)),
+            "nombre": coincidencia.group(2),
+            "sql": contenido.decode("utf-8"),
+            "checksum": hashlib.sha256(contenido).hexdigest(),
+        })
+    versiones = [m["version"] for m in migraciones]
+    if len(versiones) != len(set(versiones)):
+        raise ValueError(f"Hay versiones de migración repetidas en {directorio}")
+    return migraciones
+
+
+def _asegurar_tabla(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migraciones (
+            version integer PRIMARY KEY,
+            nombre text NOT NULL,
+            checksum text NOT NULL,
+            aplicada timestamptz NOT NULL DEFAULT now()
+        )
+    """)
+
+
+def estado(conn, migraciones):
+    # Una entrada por migración: aplicada, pendiente o modificada (el archivo
+    # cambió después de aplicarse)
+    _asegurar_tabla(conn)
+    aplicadas = {
+        version: (checksum, aplicada)
+        for version, checksum, aplicada in conn.execute("SELECT version, checksum, aplicada FROM schema_migraciones")
+    }
+    resultado = []
+    for migracion in migraciones:
+        registro = aplicadas.get(migracion["version"])
+        if registro is None:
+            situacion = "pendiente"
+        elif registro[0] != migracion["checksum"]:
+            situacion = "modificada"
+        else:
+            situacion = "aplicada"
+        resultado.append({
+            "version": migracion["version"],
+            "nombre": migracion["nombre"],
+            "estado": situacion,
+            "aplicada": registro[1] if registro else None,
+        })
+    return resultado
+
+
+def upgrade(conn, migraciones):
+    # conn debe estar en autocommit: cada migración abre su propia transacción.
+    # Devuelve las versiones aplicadas.
+    conn.execute("SELECT pg_advisory_lock(%s)", (LOCK_MIGRACIONES,))
+    try:
+        situacion = {fila["version"]: fila["estado"] for fila in estado(conn, migraciones)}
+        modificadas = [version for version, valor in situacion.items() if valor == "modificada"]
+        if modificadas:
+            raise RuntimeError(f"Migraciones ya aplicadas cuyo archivo cambió: {modificadas}. Cree una migración nueva en su lugar.")
+
+        aplicadas = []
+        for migracion in migraciones:
+            if situacion[migracion["version"]] != "pendiente":
+                continue
+            with conn.transaction():
+                conn.execute(migracion["sql"])
+                conn.execute(
+                    "INSERT INTO schema_migraciones (version, nombre, checksum) VALUES (%s, %s, %s)",
+                    (migracion["version"], migracion["nombre"], migracion["checksum"]),
+                )
+            aplicadas.append(migracion["version"])
+        return aplicadas
+    finally:
+        conn.execute("SELECT pg_advisory_unlock(%s)", (LOCK_MIGRACIONES,))
+
+
+def migrar(dsn: str = config.DATABASE_URL, directorio: str = config.MIGRATIONS_DIR):
+    # Conexión propia (no del pool) en autocommit; la usa el arranque con DB_AUTO_MIGRATE
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        return upgrade(conn, cargar_migraciones(directorio))
+
+
+class _CursorGrabador():
+    # Registra las consultas en lugar de ejecutarlas; las lecturas no devuelven filas
+    rowcount = 0
+
+    def __init__(self, nombre: str, consultas: list):
+        self.nombre = nombre
+        self.consultas = consultas
+
+    def execute(self, query, params=None, prepare=None):
+        self.consultas.append((self.nombre, query, params))
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+
+class _CursorGrabadorAsync(_CursorGrabador):
+
+    async def execute(self, query, params=None, prepare=None):
+        super().execute(query, params, prepare)
+
+    async def fetchone(self):
+        return None
+
+    async def fetchall(self):
+        return []
+
+
+class _ConexionGrabadora(UserConnection):
+
+    def __init__(self, consultas: list):
+        # Sin pool, coalescedor ni bus: solo se quieren las consultas de cada método
+        self.pool = None
+        self.coalescer = None
+        self.bus = None
+        self._suscriptores = []
+        self.consultas = consultas
+
+    @contextmanager
+    def _cursor(self, nombre: str):
+        yield _CursorGrabador(nombre, self.consultas)
+
+
+class _ConexionGrabadoraAsync(AsyncUserConnection):
+
+    def __init__(self, consultas: list):
+        self.pool = None
+        self.consultas = consultas
+
+    @asynccontextmanager
+    async def _cursor(self, nombre: str):
+        yield _CursorGrabadorAsync(nombre, self.consultas)
+
+
+def consultas_verificadas():
+    # Devuelve (nombre, consulta, params, recorrido_completo) de cada consulta de la
+    # capa de datos. Se obtienen llamando a los métodos reales con un cursor que solo
+    # registra, así el check sigue al código sin duplicar el SQL. recorrido_completo
+    # marca las que leen toda la tabla a propósito (carga de índices y catálogos).
+    registradas = []
+    sync = _ConexionGrabadora(registradas)
+    asincrona = _ConexionGrabadoraAsync(registradas)
+    cursor = codificar_cursor(datetime(2024, 1, 1), 1)
+
+    casos = [
+        (False, lambda: sync.write({"nombre": "n", "apellido": "a", "email": "socio@example.com", "password_hash": "h"})),
+        (False, lambda: sync.get_user_by_email("socio@example.com")),
+        (False, lambda: sync.get_user_by_id(1)),
+        (False, lambda: sync.update_user(1, {"objetivo": "Bajar de peso", "vector_biometrico": b"\0" * 512})),
+        (False, lambda: sync.update_password_hash(1, "h")),
+        (False, lambda: sync.update_user_goals_in_db(1, "Bajar de peso", "Intermedio")),
+        (True, lambda: sync.get_biometric_vectors()),
+        (False, lambda: sync.get_biometric_profile(user_id=1)),
+        (False, lambda: sync.get_biometric_profile(email="socio@example.com")),
+        (False, lambda: sync.get_trainers_by_specialty()),
+        (False, lambda: sync.get_trainers_by_specialty("yoga")),
+        (False, lambda: sync.get_class_details_by_schedule(1)),
+        (False, lambda: sync.get_random_exercises("pecho", 5)),
+        (True, lambda: sync.get_all_exercises()),
+        (False, lambda: sync.get_unique_body_parts()),
+        (False, lambda: sync.get_exercises_filtered("pecho")),
+        (False, lambda: sync.fetch_exercise_by_id(1)),
+        (False, lambda: sync.save_routine(1, [])),
+        (False, lambda: sync.get_user_routine(1)),
+        (False, lambda: sync.fetch_user_routine(1)),
+        (False, lambda: sync.save_user_progress(1, 1, 10, 50.0)),
+        (False, lambda: sync.get_user_progress(1)),
+        (False, lambda: sync.get_user_progress(1, cursor=cursor, desde=date(2024, 1, 1), hasta=date(2024, 12, 31), ejercicio_id=1)),
+        (False, lambda: sync.get_progress_series(1)),
+        (False, lambda: sync.delete_user_progress(1)),
+        (False, lambda: sync.insert_recommendations(1, {})),
+        (False, lambda: sync.fetch_recommendations(1)),
+        (False, lambda: asyncio.run(asincrona.get_trainers_by_specialty("yoga"))),
+        (False, lambda: asyncio.run(asincrona.get_user_routine(1))),
+        (False, lambda: asyncio.run(asincrona.get_user_progress(1, cursor=cursor))),
+        (False, lambda: asyncio.run(asincrona.fetch_exercise_by_id(1))),
+    ]
+
+    consultas = []
+    for recorrido_completo, llamada in casos:
+        previas = len(registradas)
+        try:
+            llamada()
+        except Exception:
+            # Sin filas algunos métodos fallan al leer el resultado; la consulta ya quedó registrada
+            pass
+        consultas.extend((nombre, query, params, recorrido_completo) for nombre, query, params in registradas[previas:])
+
+    # La exportación usa un cursor del servidor fuera de _cursor
+    for entidad in EXPORTACIONES:
+        _, query, params = consulta_exportacion(entidad, 1)
+        consultas.append((f"exportar_{entidad}", query, params, False))
+        _, query, params = consulta_exportacion(entidad)
+        consultas.append((f"exportar_{entidad}_todos", query, params, True))
+
+    # Cola de trabajos de planes alimenticios (SQL propio, sobre el pool)
+    consultas.extend([
+        ("trabajos_insertar", nutrition_jobs.INSERTAR, ("job", Jsonb({}), 100), False),
+        ("trabajos_tomar", nutrition_jobs.TOMAR, (300,), False),
+        ("trabajos_completar", nutrition_jobs.COMPLETAR, (Jsonb({}), "job", 1), False),
+        ("trabajos_reintentar", nutrition_jobs.REINTENTAR, ("error", 1.0, "job", 1), False),
+        ("trabajos_fallar", nutrition_jobs.FALLAR, ("error", "job", 1), False),
+        ("trabajos_obtener", nutrition_jobs.OBTENER, ("job",), False),
+        ("trabajos_purgar", nutrition_jobs.PURGAR, (3600,), False),
+        ("trabajos_contar", nutrition_jobs.CONTAR, None, True),
+    ])
+    return consultas
+
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get("Plans", ()):
+        yield from _nodos(hijo)
+
+
+def check(conn, con_estadisticas: bool = False):
+    # EXPLAIN (sin ejecutar) de cada consulta. Por defecto se desactiva el Seq Scan
+    # en el planificador: si aun así aparece, ningún índice sirve para esa consulta,
+    # sin importar cuántas filas tengan las tablas (en una base recién creada el
+    # planificador elegiría Seq Scan de todos modos). Con con_estadisticas se usa
+    # el plan que elegiría con los datos actuales.
+    resultados = []
+    with conn.transaction(force_rollback=True):
+        if not con_estadisticas:
+            conn.execute("SET LOCAL enable_seqscan = off")
+        for nombre, query, params, recorrido_completo in consultas_verificadas():
+            try:
+                with conn.transaction():
+                    plan = conn.execute("EXPLAIN (FORMAT JSON) " + query, params).fetchone()[0][0]["Plan"]
+            except psycopg.Error as e:
+                resultados.append({"consulta": nombre, "seq_scan": [], "indices": [], "permitido": False, "error": str(e).strip()})
+                continue
+            nodos = list(_nodos(plan))
+            resultados.append({
+                "consulta": nombre,
+                "seq_scan": [nodo["Relation Name"] for nodo in nodos if nodo["Node Type"] == "Seq Scan"],
+                "indices": sorted({nodo["Index Name"] for nodo in nodos if "Index Name" in nodo}),
+                "permitido": recorrido_completo,
+                "error": None,
+            })
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la base de datos")
+    parser.add_argument("comando", choices=("upgrade", "status", "check"))
+    parser.add_argument("--dsn", default=config.DATABASE_URL)
+    parser.add_argument("--directorio", default=config.MIGRATIONS_DIR)
+    parser.add_argument("--con-estadisticas", action="store_true", help="check: usar el plan real en lugar de desactivar el Seq Scan")
+    args = parser.parse_args()
+
+    migraciones = cargar_migraciones(args.directorio)
+    with psycopg.connect(args.dsn, autocommit=True) as conn:
+        if args.comando == "upgrade":
+            aplicadas = upgrade(conn, migraciones)
+            print(f"Migraciones aplicadas: {aplicadas}" if aplicadas else "El esquema ya está al día")
+            return 0
+
+        if args.comando == "status":
+            for fila in estado(conn, migraciones):
+                fecha = fila["aplicada"].strftime("%Y-%m-%d %H:%M") if fila["aplicada"] else ""
+                print(f"{fila['version']:04d}  {fila['nombre']:<32} {fila['estado']:<10} {fecha}")
+            return 0
+
+        pendientes = [fila["version"] for fila in estado(conn, migraciones) if fila["estado"] != "aplicada"]
+        if pendientes:
+            print(f"Aviso: migraciones sin aplicar {pendientes}; el resultado puede no reflejar el esquema final")
+        problemas = 0
+        for r in check(conn, args.con_estadisticas):
+            if r["error"]:
+                marca, detalle = "ERROR", r["error"].splitlines()[0]
+            elif r["seq_scan"] and not r["permitido"]:
+                marca, detalle = "SEQ", "Seq Scan en " + ", ".join(r["seq_scan"])
+            else:
+                marca = "ok"
+                detalle = "recorrido completo esperado" if r["seq_scan"] else ", ".join(r["indices"])
+            problemas += marca != "ok"
+            print(f"{marca:>5}  {r['consulta']:<32} {detalle}")
+        print(f"\n{problemas} consultas con problemas" if problemas else "\nNinguna consulta recorre tablas completas sin necesidad")
+        return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    # python -m model.migrations upgrade|status|check
+    sys.exit(main())
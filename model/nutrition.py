@@ -0,0 +1,189 @@
+import json
+import time
+import config
+from model.metrics import metricas
+
+
+class PlanInvalido(Exception):
+    pass
+
+
+class CohereClient():
+    # Cliente de IA por defecto. Cualquier objeto con generar(prompt, timeout)
+    # que devuelva el texto de la respuesta puede reemplazarlo (p. ej. un fake local).
+
+    def __init__(self, api_key: str = config.COHERE_API_KEY, model: str = config.COHERE_MODEL):
+        self.model = model
+        self.api_key = api_key
+        self._client = None
+
+    def _cliente(self):
+        # El SDK de Cohere (y sus dependencias) se importa en la primera llamada
+        if self._client is None:
+            import cohere
+            self._client = cohere.Client(self.api_key)
+        return self._client
+
+    def calentar(self):
+        self._cliente()
+
+    def generar(self, prompt: str, timeout: float = None):
+        request_options = {"timeout_in_seconds": timeout} if timeout else None
+        inicio = time.perf_counter()
+        resultado = "error"
+        try:
+            response = self._cliente().chat(model=self.model, message=prompt, request_options=request_options)
+            resultado = "ok"
+        finally:
+            metricas.observar("llm_request_duration_seconds", time.perf_counter() - inicio, operacion="chat", resultado=resultado)
+        return extraer_texto(response)
+
+    def generar_stream(self, prompt: str, timeout: float = None):
+        # Devuelve el texto a medida que el modelo lo genera
+        request_options = {"timeout_in_seconds": timeout} if timeout else None
+        inicio = time.perf_counter()
+        primer_texto = True
+        resultado = "error"
+        try:
+            for event in self._cliente().chat_stream(model=self.model, message=prompt, request_options=request_options):
+                if event.event_type == "text-generation":
+                    if primer_texto:
+                        primer_texto = False
+                        metricas.observar("llm_request_duration_seconds", time.perf_counter() - inicio, operacion="chat_stream_primer_texto", resultado="ok")
+                    yield event.text
+            resultado = "ok"
+        finally:
+            metricas.observar("llm_request_duration_seconds", time.perf_counter() - inicio, operacion="chat_stream", resultado=resultado)
+
+
+def construir_prompt(data, calorias, macros):
+    return f"""
+        Genera un plan alimenticio para 4 días basado en los siguientes datos:
+        - Género: {data.genero}
+        - Edad: {data.edad}
+        - Peso actual: {data.peso_actual} kg
+        - Altura: {data.altura} cm
+        - Nivel de experiencia: {data.nivel_experiencia}
+        - Objetivo: {data.objetivo}
+        - Calorías calculadas: {calorias} kcal
+        - Macronutrientes (g): Proteínas: {macros["proteinas"]}, Carbohidratos: {macros["carbohidratos"]}, Grasas: {macros["grasas"]}
+
+        Devuelve las recomendaciones en formato JSON con la siguiente estructura:
+        {{
+            "dia 1": {{
+                "desayuno": "Descripción del desayuno",
+                "almuerzo": "Descripción del almuerzo",
+                "cena": "Descripción de la cena",
+                "snack": "Descripción del snack"
+            }},
+            "dia 2": {{
+                "desayuno": "...",
+                "almuerzo": "...",
+                "cena": "...",
+                "snack": "..."
+            }},
+            "dia 3": {{
+                ...
+            }},
+            "dia 4": {{
+                ...
+            }}
+        }}
+        No incluyas explicaciones ni introducciones, solo responde en formato JSON.
+        """
+
+
+def extraer_texto(response):
+    # Extraer la respuesta de Cohere
+    if hasattr(response, 'text'):
+        return response.text
+    elif hasattr(response, 'reply'):
+        return response.reply
+    raise AttributeError("No se encontró un atributo adecuado en la respuesta de Cohere")
+
+
+def limpiar_recomendaciones(raw_recommendations: str):
+    # Convertir la respuesta a JSON limpio
+    try:
+        recommendations = json.loads(raw_recommendations)
+    except json.JSONDecodeError:
+        raise PlanInvalido("La IA no devolvió un JSON válido. Revisa el prompt o los datos.")
+
+    for day, meals in recommendations.items():
+        recommendations[day] = limpiar_dia(meals)
+    return recommendations
+
+
+def limpiar_dia(meals: dict):
+    return {meal: description.replace('\n', ' ') for meal, description in meals.items()}
+
+
+class ParserPlanIncremental():
+    # Parser incremental del JSON del plan: recibe el texto por partes y devuelve
+    # cada día ("dia N": {...}) en cuanto su objeto se cierra, sin esperar el
+    # documento completo. Ignora lo que esté fuera de las llaves (p. ej. ```json).
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._profundidad = 0
+        self._en_string = False
+        self._escape = False
+        self._inicio_string = None
+        self._inicio_objeto = None
+        self._ultima_clave = None
+        self.dias = {}
+
+    def feed(self, texto: str):
+        self._buffer += texto
+        completos = []
+        for i in range(self._pos, len(self._buffer)):
+            c = self._buffer[i]
+            if self._en_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._en_string = False
+                    # En el primer nivel los únicos strings son las claves de los días
+                    if self._profundidad == 1:
+                        self._ultima_clave = json.loads(self._buffer[self._inicio_string:i + 1])
+            elif c == '"':
+                self._en_string = True
+                self._inicio_string = i
+            elif c == "{":
+                self._profundidad += 1
+                if self._profundidad == 2:
+                    self._inicio_objeto = i
+            elif c == "}":
+                if self._profundidad == 2:
+                    try:
+                        meals = json.loads(self._buffer[self._inicio_objeto:i + 1])
+                    except json.JSONDecodeError:
+                        raise PlanInvalido("La IA no devolvió un JSON válido. Revisa el prompt o los datos.")
+                    dia = limpiar_dia(meals)
+                    self.dias[self._ultima_clave] = dia
+                    completos.append((self._ultima_clave, dia))
+                self._profundidad = max(0, self._profundidad - 1)
+        self._pos = len(self._buffer)
+        return completos
+
+
+def evento_sse(evento: str, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+def clave_plan(calorias, macros, objetivo, nivel_experiencia, genero):
+    # Entradas que difieren en pocas kcal o gramos comparten el mismo plan
+    paso_kcal = config.NUTRITION_CACHE_KCAL_STEP
+    paso_gramos = config.NUTRITION_CACHE_GRAMS_STEP
+    return (
+        round(calorias / paso_kcal) * paso_kcal,
+        round(macros["proteinas"] / paso_gramos) * paso_gramos,
+        round(macros["carbohidratos"] / paso_gramos) * paso_gramos,
+        round(macros["grasas"] / paso_gramos) * paso_gramos,
+        objetivo,
+        nivel_experiencia,
+        genero,
+    )
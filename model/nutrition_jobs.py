@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+import uuid
+from psycopg.types.json import Jsonb
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class ColaLlena(Exception):
+    pass
+
+
+# El límite de pendientes se cuenta en la tabla: vale para todos los workers juntos
+INSERTAR = """
+    INSERT INTO trabajos_plan (id, payload)
+    SELECT %s, %s
+    WHERE (SELECT count(*) FROM trabajos_plan WHERE estado IN ('pendiente', 'en_proceso')) < %s
+    RETURNING id
+"""
+
+# SKIP LOCKED: dos workers nunca toman el mismo trabajo ni se esperan entre sí.
+# Un trabajo en proceso cuyo arriendo venció (su worker murió) vuelve a tomarse.
+TOMAR = """
+    UPDATE trabajos_plan
+    SET estado = 'en_proceso',
+        intentos = intentos + 1,
+        disponible = now() + make_interval(secs => %s),
+        actualizado = now()
+    WHERE id = (
+        SELECT id
+        FROM trabajos_plan
+        WHERE estado IN ('pendiente', 'en_proceso') AND disponible <= now()
+        ORDER BY disponible
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, payload, intentos
+"""
+
+# Las actualizaciones de estado solo aplican si nadie retomó el trabajo mientras tanto
+COMPLETAR = """
+    UPDATE trabajos_plan
+    SET estado = 'completado', resultado = %s, error = NULL, actualizado = now()
+    WHERE id = %s AND intentos = %s AND estado = 'en_proceso'
+"""
+
+REINTENTAR = """
+    UPDATE trabajos_plan
+    SET estado = 'pendiente', error = %s, disponible = now() + make_interval(secs => %s), actualizado = now()
+    WHERE id = %s AND intentos = %s AND estado = 'en_proceso'
+"""
+
+FALLAR = """
+    UPDATE trabajos_plan
+    SET estado = 'fallido', error = %s, actualizado = now()
+    WHERE id = %s AND intentos = %s AND estado = 'en_proceso'
+"""
+
+OBTENER = """
+    SELECT
+        id AS job_id,
+        estado,
+        intentos,
+        extract(epoch FROM creado)::float8 AS creado,
+        extract(epoch FROM actualizado)::float8 AS actualizado,
+        resultado,
+        error
+    FROM trabajos_plan
+    WHERE id = %s
+"""
+
+# Los trabajos terminados se conservan ttl segundos para poder consultarlos
+PURGAR = """
+    DELETE FROM trabajos_plan
+    WHERE estado IN ('completado', 'fallido') AND actualizado < now() - make_interval(secs => %s)
+"""
+
+CONTAR = "SELECT estado, count(*) FROM trabajos_plan GROUP BY estado"
+
+
+class NutritionJobQueue():
+    # Cola de trabajos para generar planes alimenticios fuera del ciclo de la
+    # petición HTTP. Los trabajos se guardan en la tabla trabajos_plan, así
+    # cualquier worker puede consultar su estado y no se pierden al reiniciar.
+    # Cada worker corre max_workers hilos que toman trabajos de la tabla, con
+    # reintentos y backoff exponencial.
+
+    def __init__(
+        self,
+        procesar,
+        pool,
+        max_workers: int = config.NUTRITION_JOB_WORKERS,
+        max_pendientes: int = config.NUTRITION_JOB_MAX_PENDING,
+        reintentos: int = config.NUTRITION_JOB_RETRIES,
+        ttl: float = config.NUTRITION_JOB_TTL,
+        arriendo: float = config.NUTRITION_JOB_LEASE,
+        intervalo: float = config.NUTRITION_JOB_POLL,
+        backoff: float = 1.0,
+    ):
+        # procesar(payload) recibe el JSON guardado y devuelve un resultado serializable
+        self._procesar = procesar
+        self.pool = pool
+        self.max_workers = max_workers
+        self.max_pendientes = max_pendientes
+        self.reintentos = reintentos
+        self.ttl = ttl
+        self.arriendo = arriendo
+        self.intervalo = intervalo
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        # Despierta a un hilo cuando este worker encola; los trabajos encolados en
+        # otros workers se descubren en el siguiente sondeo
+        self._aviso = threading.Semaphore(0)
+        self._detener = threading.Event()
+        self._hilos = []
+        self._activos = 0
+        self._ultima_purga = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._hilos:
+                return
+            self._detener.clear()
+            self._hilos = [
+                threading.Thread(target=self._trabajar, name=f"nutrition-job-{i}", daemon=True)
+                for i in range(self.max_workers)
+            ]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def submit(self, payload: dict):
+        job_id = uuid.uuid4().hex
+        with self.pool.connection() as conn:
+            insertado = conn.execute(INSERTAR, (job_id, Jsonb(payload), self.max_pendientes)).fetchone()
+        if insertado is None:
+            raise ColaLlena("La cola de planes alimenticios está llena, intenta nuevamente más tarde")
+        self._aviso.release()
+        return job_id
+
+    def get(self, job_id: str):
+        with self.pool.connection() as conn:
+            cur = conn.execute(OBTENER, (job_id,))
+            fila = cur.fetchone()
+            if fila is None:
+                return None
+            return dict(zip((columna.name for columna in cur.description), fila))
+
+    def _guardar(self, query, params):
+        with self.pool.connection() as conn:
+            conn.execute(query, params)
+
+    def _tomar(self):
+        with self.pool.connection() as conn:
+            return conn.execute(TOMAR, (self.arriendo,)).fetchone()
+
+    def _trabajar(self):
+        while not self._detener.is_set():
+            try:
+                trabajo = self._tomar()
+            except Exception:
+                logger.exception("No se pudo tomar un trabajo de plan alimenticio")
+                trabajo = None
+            if trabajo is None:
+                self._purgar()
+                self._aviso.acquire(timeout=self.intervalo)
+                continue
+            self._ejecutar(*trabajo)
+
+    def _ejecutar(self, job_id, payload, intento):
+        with self._lock:
+            self._activos += 1
+        try:
+            if intento > self.reintentos + 1:
+                # Se retomó tras vencer el arriendo del último intento permitido
+                self._guardar(FALLAR, ("El trabajo se interrumpió antes de terminar", job_id, intento))
+                return
+            try:
+                resultado = self._procesar(payload)
+            except Exception as e:
+                if intento <= self.reintentos:
+                    self._guardar(REINTENTAR, (str(e), self.backoff * 2 ** (intento - 1), job_id, intento))
+                else:
+                    self._guardar(FALLAR, (str(e), job_id, intento))
+                return
+            self._guardar(COMPLETAR, (Jsonb(resultado), job_id, intento))
+        except Exception:
+            # Sin poder guardar el estado el arriendo vence y otro hilo lo retoma
+            logger.exception("No se pudo guardar el estado del trabajo %s", job_id)
+        finally:
+            with self._lock:
+                self._activos -= 1
+
+    def _purgar(self):
+        # A lo sumo una vez por minuto por worker, cuando un hilo está ocioso
+        if time.monotonic() - self._ultima_purga < 60:
+            return
+        self._ultima_purga = time.monotonic()
+        try:
+            self._guardar(PURGAR, (self.ttl,))
+        except Exception:
+            logger.exception("No se pudieron purgar los trabajos de planes alimenticios")
+
+    def stats(self):
+        with self.pool.connection() as conn:
+            estados = dict(conn.execute(CONTAR).fetchall())
+        with self._lock:
+            activos = self._activos
+        return {
+            "workers": len(self._hilos),
+            "activos": activos,
+            "max_pendientes": self.max_pendientes,
+            "estados": estados,
+        }
+
+    def shutdown(self):
+        # Los trabajos en curso no se esperan: al vencer su arriendo otro worker los retoma
+        self._detener.set()
+        for _ in self._hilos:
+            self._aviso.release()
+        self._hilos = []
@@ -0,0 +1,82 @@
+import base64
+from datetime import date, datetime, timedelta
+
+
+def codificar_cursor(fecha, registro_id: int):
+    texto = f"{fecha.isoformat()}|{registro_id}"
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+def decodificar_cursor(cursor: str):
+    try:
+        fecha, registro_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(fecha), int(registro_id)
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+
+
+def consulta_progreso(
+    user_id: int,
+    limit: int,
+    cursor: str = None,
+    desde: date = None,
+    hasta: date = None,
+    ejercicio_id: int = None,
+):
+    # Paginación por keyset sobre (fecha, id): cada página continúa desde la última
+    # fila de la anterior, así que el costo no depende de cuántas páginas hay detrás.
+    condiciones = ["u.usuario_id = %s"]
+    params = [user_id]
+
+    if desde is not None:
+        condiciones.append("u.fecha >= %s")
+        params.append(desde)
+    if hasta is not None:
+        condiciones.append("u.fecha < %s")
+        params.append(hasta + timedelta(days=1))
+    if ejercicio_id is not None:
+        condiciones.append("u.ejercicio_id = %s")
+        params.append(ejercicio_id)
+    if cursor:
+        condiciones.append("(u.fecha, u.id) < (%s, %s)")
+        params.extend(decodificar_cursor(cursor))
+
+    query = f"""
+        SELECT
+            u.id,
+            u.repeticiones,
+            u.peso,
+            TO_CHAR(u.fecha, 'DD-MM-YYYY'),
+            e.name_es,
+            u.fecha
+        FROM usuario_avances u
+        INNER JOIN ejercicios e ON e.id = u.ejercicio_id
+        WHERE {" AND ".join(condiciones)}
+        ORDER BY u.fecha DESC, u.id DESC
+        LIMIT %s
+    """
+    # Una fila extra indica si existe una página siguiente
+    params.append(limit + 1)
+    return query, params
+
+
+def pagina_progreso(results, limit: int):
+    filas = results[:limit]
+    siguiente = None
+    if len(results) > limit:
+        ultima = filas[-1]
+        siguiente = codificar_cursor(ultima[5], ultima[0])
+
+    return {
+        "progress": [
+            {
+                "id": row[0],
+                "repeticiones": row[1],
+                "peso": row[2],
+                "fecha": row[3],
+                "name_es": row[4]
+            }
+            for row in filas
+        ],
+        "next_cursor": siguiente,
+    }
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+import time
+import config
+from model.process_pool import PoolSaturado, ProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Se crea una vez por proceso, en el primer uso. El worker de la API solo
+# delega en el pool, así que passlib y bcrypt se cargan únicamente en sus procesos.
+_pwd_context = None
+
+
+def _contexto():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=config.PASSWORD_BCRYPT_ROUNDS)
+    return _pwd_context
+
+
+class PasswordHasherSaturado(PoolSaturado):
+    pass
+
+
+def _precargar():
+    _contexto().handler("bcrypt").get_backend()
+    return os.getpid()
+
+
+def _hash(password: str):
+    return _contexto().hash(password)
+
+
+def _verificar(password: str, password_hash: str):
+    # Además del resultado indica si el hash usa un costo distinto al configurado
+    pwd_context = _contexto()
+    valido = pwd_context.verify(password, password_hash)
+    return valido, valido and pwd_context.needs_update(password_hash)
+
+
+class PasswordHasher(ProcessPool):
+    # Pool de procesos acotado para bcrypt (100-300 ms de CPU por operación), así
+    # una ráfaga de logins no ocupa el threadpool que usan los demás endpoints.
+    # Con más de max_pendientes operaciones en cola se rechaza con PasswordHasherSaturado.
+    saturado = PasswordHasherSaturado
+    mensaje_saturado = "Demasiados inicios de sesión en proceso, intenta nuevamente en unos segundos"
+    metrica = "password_hash_duration_seconds"
+
+    def __init__(self, max_workers: int = config.PASSWORD_WORKERS, max_pendientes: int = config.PASSWORD_MAX_PENDING):
+        super().__init__(max_workers, max_pendientes, _precargar, ("hash", "verify"))
+        self._rehashes = 0
+
+    async def _medir(self, operacion: str, funcion, *args):
+        inicio = time.perf_counter()
+        resultado = await self._ejecutar(funcion, *args)
+        self._registrar({operacion: time.perf_counter() - inicio})
+        return resultado
+
+    async def hash(self, password: str):
+        return await self._medir("hash", _hash, password)
+
+    async def verify(self, password: str, password_hash: str):
+        # Devuelve (valido, necesita_rehash)
+        return await self._medir("verify", _verificar, password, password_hash)
+
+    async def rehash(self, password: str, guardar):
+        # Pensado para correr en segundo plano después de responder el login; si
+        # falla o el pool está saturado se reintentará en el próximo login
+        try:
+            nuevo_hash = await self.hash(password)
+            # guardar escribe en la base de datos: se ejecuta fuera del event loop
+            await asyncio.to_thread(guardar, nuevo_hash)
+            with self._lock:
+                self._rehashes += 1
+        except Exception:
+            logger.exception("No se pudo actualizar el hash de la contraseña")
+
+    def stats(self):
+        estado = super().stats()
+        with self._lock:
+            estado["rehashes"] = self._rehashes
+        estado["rounds"] = config.PASSWORD_BCRYPT_ROUNDS
+        estado["operaciones"] = estado.pop("tiempos")
+        return estado
@@ -0,0 +1,101 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from model.metrics import metricas
+
+
+class PoolSaturado(Exception):
+    pass
+
+
+class ProcessPool():
+    # Base de FaceEncoder y PasswordHasher: pool de procesos acotado que se crea en
+    # el primer uso (o en calentar()). Con max_pendientes operaciones en curso las
+    # nuevas se rechazan con la excepción `saturado`. Los tiempos se acumulan por
+    # operación (o etapa) y se publican en el histograma `metrica`.
+    saturado = PoolSaturado
+    mensaje_saturado = "Demasiadas operaciones en proceso, intenta nuevamente en unos segundos"
+    metrica = None
+    etiqueta = "operacion"
+
+    def __init__(self, max_workers: int, max_pendientes: int, precargar, operaciones=()):
+        # precargar() corre una vez en cada proceso desde calentar() y devuelve su pid
+        self.max_workers = max_workers
+        self.max_pendientes = max_pendientes
+        self._precargar = precargar
+        self._executor = None
+        # Aparte de _lock (contadores): el calentamiento corre en un hilo y las
+        # primeras operaciones en el event loop, y podrían crear dos pools
+        self._lock_executor = threading.Lock()
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._rechazadas = 0
+        self._tiempos = {operacion: {"total": 0.0, "max": 0.0, "count": 0} for operacion in operaciones}
+
+    def _get_executor(self):
+        executor = self._executor
+        if executor is not None:
+            return executor
+        with self._lock_executor:
+            if self._executor is None:
+                # spawn: los procesos no heredan los hilos del pool de conexiones
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    async def _ejecutar(self, funcion, *args):
+        with self._lock:
+            if self._pendientes >= self.max_pendientes:
+                self._rechazadas += 1
+                raise self.saturado(self.mensaje_saturado)
+            self._pendientes += 1
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), funcion, *args)
+        finally:
+            with self._lock:
+                self._pendientes -= 1
+
+    def _registrar(self, tiempos: dict):
+        for operacion, segundos in tiempos.items():
+            metricas.observar(self.metrica, segundos, **{self.etiqueta: operacion})
+        with self._lock:
+            for operacion, segundos in tiempos.items():
+                acumulado = self._tiempos[operacion]
+                acumulado["total"] += segundos
+                acumulado["count"] += 1
+                acumulado["max"] = max(acumulado["max"], segundos)
+
+    def calentar(self):
+        # Arranca los procesos del pool con sus librerías ya cargadas, para que la
+        # primera operación no pague ese costo. Devuelve cuántos procesos respondieron.
+        executor = self._get_executor()
+        futuros = [executor.submit(self._precargar) for _ in range(self.max_workers)]
+        return len({futuro.result() for futuro in futuros})
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "pendientes": self._pendientes,
+                "max_pendientes": self.max_pendientes,
+                "rechazadas": self._rechazadas,
+                "tiempos": {
+                    operacion: {
+                        "count": t["count"],
+                        "media_ms": round(t["total"] / t["count"] * 1000, 3) if t["count"] else 0.0,
+                        "max_ms": round(t["max"] * 1000, 3),
+                    }
+                    for operacion, t in self._tiempos.items()
+                },
+            }
+
+    def shutdown(self):
+        with self._lock_executor:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
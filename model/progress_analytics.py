@@ -0,0 +1,129 @@
+import numpy as np
+
+
+def _grupos(*claves: np.ndarray):
+    # Índices de inicio de cada grupo en arreglos ya ordenados por esas claves
+    cambios = np.zeros(len(claves[0]) - 1, dtype=bool)
+    for clave in claves:
+        cambios |= clave[1:] != clave[:-1]
+    return np.flatnonzero(np.r_[True, cambios])
+
+
+def _ultimo_maximo(valores: np.ndarray, inicios: np.ndarray, limites: np.ndarray):
+    # Índice (global) de la última fila con el valor máximo de cada grupo
+    maximos = np.maximum.reduceat(valores, inicios)
+    es_maximo = valores == np.repeat(maximos, np.diff(limites))
+    return np.maximum.reduceat(np.where(es_maximo, np.arange(len(valores)), -1), inicios)
+
+
+def _redondear(valor):
+    return None if valor is None or np.isnan(valor) else round(float(valor), 2)
+
+
+def analizar_progreso(filas, ventana: int = 4):
+    # filas: (ejercicio_id, name_es, repeticiones, peso, dia) de usuario_avances, donde
+    # dia es la fecha como número de días desde 1970-01-01 (así se evita convertir
+    # objetos datetime uno por uno). Todo el cálculo es vectorizado con NumPy.
+    if not filas:
+        return {"resumen": {"series": 0, "volumen_total": 0.0}, "ejercicios": []}
+
+    ejercicio_ids, nombres, repeticiones, pesos, dias = zip(*filas)
+    ejercicio = np.array(ejercicio_ids, dtype=np.int64)
+    reps = np.array(repeticiones, dtype=np.float64)
+    peso = np.array([p if p is not None else 0.0 for p in pesos], dtype=np.float64)
+    dias = np.array(dias, dtype=np.int64)
+    nombre_por_id = dict(zip(ejercicio_ids, nombres))
+
+    volumen = reps * peso
+    # 1RM estimado: Epley y Brzycki (esta última solo es válida por debajo de 37 repeticiones)
+    epley = np.where(reps > 1, peso * (1 + reps / 30), peso)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        brzycki = np.where(reps < 37, peso * 36 / (37 - reps), np.nan)
+
+    # Semana ISO (lunes) de cada serie; 1970-01-01 fue jueves
+    semana = dias - (dias + 3) % 7
+
+    # Orden por (ejercicio, semana, 1RM): los máximos quedan al final de cada grupo
+    orden = np.lexsort((epley, semana, ejercicio))
+    ejercicio, semana, dia = ejercicio[orden], semana[orden], dias[orden].astype("datetime64[D]")
+    reps, peso, volumen, epley, brzycki = reps[orden], peso[orden], volumen[orden], epley[orden], brzycki[orden]
+
+    # Agregados por (ejercicio, semana)
+    inicio_semana = _grupos(ejercicio, semana)
+    fin_semana = np.r_[inicio_semana[1:], len(ejercicio)] - 1
+    volumen_semana = np.add.reduceat(volumen, inicio_semana)
+    series_semana = np.diff(np.r_[inicio_semana, len(ejercicio)])
+    max_1rm_semana = epley[fin_semana]
+    ejercicio_semana = ejercicio[inicio_semana]
+    fecha_semana = semana[inicio_semana].astype("datetime64[D]").astype(str).tolist()
+
+    # Media móvil del mejor 1RM semanal dentro de cada ejercicio
+    inicio_ej_semanas = _grupos(ejercicio_semana)
+    limites_semanas = np.r_[inicio_ej_semanas, len(ejercicio_semana)]
+    posicion = np.arange(len(ejercicio_semana))
+    primera = np.repeat(inicio_ej_semanas, np.diff(limites_semanas))
+    desde = np.maximum(posicion - ventana + 1, primera)
+    acumulado = np.r_[0.0, np.cumsum(max_1rm_semana)]
+    media_movil = (acumulado[posicion + 1] - acumulado[desde]) / (posicion - desde + 1)
+
+    # Tendencia (kg/semana): pendiente de mínimos cuadrados del mejor 1RM semanal
+    x = (semana[inicio_semana] - semana[inicio_semana][primera]) / 7.0
+    y = max_1rm_semana
+    n = np.diff(limites_semanas).astype(np.float64)
+    sx, sy = np.add.reduceat(x, inicio_ej_semanas), np.add.reduceat(y, inicio_ej_semanas)
+    sxx, sxy = np.add.reduceat(x * x, inicio_ej_semanas), np.add.reduceat(x * y, inicio_ej_semanas)
+    denominador = n * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pendiente = np.where(denominador > 0, (n * sxy - sx * sy) / denominador, np.nan)
+
+    # Récords personales por ejercicio
+    inicio_ej = _grupos(ejercicio)
+    limites = np.r_[inicio_ej, len(ejercicio)]
+    volumen_ej = np.add.reduceat(volumen, inicio_ej)
+    idx_1rm = _ultimo_maximo(epley, inicio_ej, limites)
+    idx_peso = _ultimo_maximo(peso, inicio_ej, limites)
+
+    # Solo el armado de la respuesta recorre los resultados
+    series_semana = series_semana.tolist()
+    volumen_semana = np.round(volumen_semana, 2).tolist()
+    max_1rm_semana = np.round(max_1rm_semana, 2).tolist()
+    media_movil = np.round(media_movil, 2).tolist()
+    ejercicios = []
+    for i, ej_id in enumerate(ejercicio[inicio_ej]):
+        ejercicios.append({
+            "ejercicio_id": int(ej_id),
+            "name_es": nombre_por_id[int(ej_id)],
+            "series": int(limites[i + 1] - limites[i]),
+            "volumen_total": _redondear(volumen_ej[i]),
+            "pr_peso": {
+                "peso": _redondear(peso[idx_peso[i]]),
+                "repeticiones": int(reps[idx_peso[i]]),
+                "fecha": str(dia[idx_peso[i]]),
+            },
+            "pr_1rm": {
+                "epley": _redondear(epley[idx_1rm[i]]),
+                "brzycki": _redondear(brzycki[idx_1rm[i]]),
+                "fecha": str(dia[idx_1rm[i]]),
+            },
+            "tendencia_1rm_kg_semana": _redondear(pendiente[i]),
+            "semanas": [
+                {
+                    "semana": fecha_semana[j],
+                    "series": series_semana[j],
+                    "volumen": volumen_semana[j],
+                    "max_1rm": max_1rm_semana[j],
+                    "media_movil_1rm": media_movil[j],
+                }
+                for j in range(limites_semanas[i], limites_semanas[i + 1])
+            ],
+        })
+
+    return {
+        "resumen": {
+            "series": int(len(ejercicio)),
+            "volumen_total": _redondear(volumen.sum()),
+            "primera_fecha": str(dia.min()),
+            "ultima_fecha": str(dia.max()),
+        },
+        "ejercicios": ejercicios,
+    }
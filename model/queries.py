@@ -0,0 +1,229 @@
+# Registro central de las consultas de UserConnection y AsyncUserConnection.
+# Las columnas se nombran como las claves que devuelve la API, así cada consulta
+# convierte sus filas a diccionarios sin índices escritos a mano. Las consultas
+# marcadas como preparadas (las del camino caliente) se envían con prepare=True:
+# psycopg las prepara en el servidor la primera vez en cada conexión del pool y
+# las siguientes ejecuciones omiten el parseo y la planificación. El resto se
+# prepara solo tras varias ejecuciones (prepare_threshold de psycopg).
+# Las consultas con filtros variables viven con su lógica: model/pagination.py
+# (historial de progreso) y model/export.py (exportaciones).
+
+
+class Consulta():
+    __slots__ = ("nombre", "sql", "preparada", "columnas")
+
+    def __init__(self, nombre: str, sql: str, preparada: bool = False):
+        # nombre identifica la consulta en las métricas (db_query_duration_seconds)
+        self.nombre = nombre
+        self.sql = sql
+        self.preparada = preparada
+        self.columnas = None
+
+    def diccionarios(self, cur, filas: list):
+        # psycopg arma las tuplas en C; la conversión recorre el resultado una vez.
+        # Los nombres se toman de la primera respuesta (las columnas no cambian):
+        # cur.description crea sus objetos en cada acceso, por eso se lee una sola vez
+        if self.columnas is None:
+            self.columnas = tuple(columna.name for columna in cur.description)
+        columnas = self.columnas
+        return [dict(zip(columnas, fila)) for fila in filas]
+
+
+# Columnas que update_user puede modificar (las del registro biométrico)
+CAMPOS_USUARIO = ("genero", "edad", "altura", "peso_actual", "objetivo", "nivel_experiencia", "vector_biometrico", "datos_completos")
+
+INSERTAR_USUARIO = Consulta("write", """
+    INSERT INTO "usuarios"(nombre, apellido, email, password_hash) VALUES(%(nombre)s, %(apellido)s, %(email)s, %(password_hash)s)
+    RETURNING id
+""")
+
+USUARIO_POR_EMAIL = Consulta("get_user_by_email", """
+    SELECT id, nombre, apellido, email, password_hash, datos_completos FROM "usuarios" WHERE email = %s
+""", preparada=True)
+
+USUARIO_POR_ID = Consulta("get_user_by_id", """
+    SELECT nombre, apellido, email, genero, edad, altura, peso_actual, objetivo, nivel_experiencia
+    FROM "usuarios"
+    WHERE id = %s
+""", preparada=True)
+
+# Sentencia fija para cualquier combinación de campos: un campo en NULL conserva
+# su valor, así que el plan se reutiliza en vez de armar un SET distinto por llamada
+ACTUALIZAR_USUARIO = Consulta("update_user", f"""
+    UPDATE "usuarios" SET {", ".join(f"{campo} = COALESCE(%({campo})s, {campo})" for campo in CAMPOS_USUARIO)}
+    WHERE id = %(user_id)s
+""")
+
+ACTUALIZAR_PASSWORD = Consulta("update_password_hash", """
+    UPDATE "usuarios" SET password_hash = %s WHERE id = %s
+""")
+
+ACTUALIZAR_OBJETIVOS = Consulta("update_user_goals_in_db", """
+    UPDATE usuarios
+    SET objetivo = COALESCE(%s, objetivo),
+        nivel_experiencia = COALESCE(%s, nivel_experiencia)
+    WHERE id = %s
+""")
+
+VECTORES_BIOMETRICOS = Consulta("get_biometric_vectors", """
+    SELECT id, vector_biometrico
+    FROM "usuarios"
+    WHERE vector_biometrico IS NOT NULL
+""")
+
+PERFIL_BIOMETRICO_POR_ID = Consulta("get_biometric_profile", """
+    SELECT id, nombre, apellido, email, datos_completos, vector_biometrico
+    FROM "usuarios"
+    WHERE id = %s
+""", preparada=True)
+
+PERFIL_BIOMETRICO_POR_EMAIL = Consulta("get_biometric_profile", """
+    SELECT id, nombre, apellido, email, datos_completos, vector_biometrico
+    FROM "usuarios"
+    WHERE email = %s
+""", preparada=True)
+
+_ENTRENADORES = """
+    SELECT
+        e.id_entrenador,
+        e.nombre,
+        e.especialidad,
+        c.nombre_clase,
+        h.id_horario,
+        h.dia_semana
+    FROM entrenadores e
+    INNER JOIN clases c ON c.id_entrenador = e.id_entrenador
+    INNER JOIN horario h ON h.id_clase = c.id_clase
+    WHERE e.estado = true
+"""
+
+ENTRENADORES = Consulta("get_trainers_by_specialty", _ENTRENADORES)
+
+ENTRENADORES_POR_ESPECIALIDAD = Consulta("get_trainers_by_specialty", _ENTRENADORES + " AND e.especialidad = %s")
+
+DETALLE_CLASE = Consulta("get_class_details_by_schedule", """
+    SELECT
+        e.nombre,
+        e.descripcion,
+        e.telefono,
+        e.correo,
+        c.nombre_clase,
+        c.descripcion AS descripcion_clase,
+        c.nivel,
+        h.dia_semana,
+        TO_CHAR(h.hora_inicio, 'HH24:MI') AS hora_inicio,
+        TO_CHAR(h.hora_fin, 'HH24:MI') AS hora_fin
+    FROM entrenadores e
+    INNER JOIN clases c ON c.id_entrenador = e.id_entrenador
+    INNER JOIN horario h ON h.id_clase = c.id_clase
+    WHERE h.id_horario = %s
+""")
+
+EJERCICIOS_ALEATORIOS = Consulta("get_random_exercises", """
+    SELECT id, name_es, equipment_es, target_es
+    FROM ejercicios
+    WHERE body_part_es = %s
+    ORDER BY RANDOM()
+    LIMIT %s
+""")
+
+EJERCICIOS = Consulta("get_all_exercises", """
+    SELECT id, name_es, equipment_es, target_es, body_part_es
+    FROM ejercicios
+""")
+
+PARTES_DEL_CUERPO = Consulta("get_unique_body_parts", """
+    SELECT body_part_es
+    FROM ejercicios
+    GROUP BY body_part_es
+""")
+
+EJERCICIOS_POR_PARTE = Consulta("get_exercises_filtered", """
+    SELECT id, name_es
+    FROM ejercicios
+    WHERE body_part_es = %s
+""")
+
+EJERCICIO_POR_ID = Consulta("fetch_exercise_by_id", """
+    SELECT id, name_es, body_part_es, target_es, equipment_es, instructions_es, gif_url
+    FROM ejercicios
+    WHERE id = %s
+""", preparada=True)
+
+INSERTAR_RUTINA = Consulta("save_routine", """
+    INSERT INTO usuario_rutinas (usuario_id, rutina)
+    VALUES (%s, %s)
+""")
+
+COPIAR_RUTINAS = Consulta("save_routines_bulk", "COPY usuario_rutinas (usuario_id, rutina) FROM STDIN")
+
+RUTINA_ACTUAL = Consulta("get_user_routine", """
+    SELECT rutina AS routine
+    FROM usuario_rutinas
+    WHERE usuario_id = %s
+    ORDER BY fecha_creacion DESC
+    LIMIT 1
+""", preparada=True)
+
+RUTINA_USUARIO = Consulta("fetch_user_routine", """
+    SELECT id, usuario_id, rutina AS routine
+    FROM public.usuario_rutinas
+    WHERE usuario_id = %s
+""")
+
+INSERTAR_AVANCE = Consulta("save_user_progress", """
+    INSERT INTO usuario_avances (usuario_id, ejercicio_id, repeticiones, peso)
+    VALUES (%s, %s, %s, %s)
+""")
+
+# Carga por lotes: COPY a una tabla temporal y un solo INSERT ... ON CONFLICT
+CREAR_LOTE_AVANCES = Consulta("save_user_progress_bulk", """
+    CREATE TEMP TABLE avances_lote (
+        usuario_id integer,
+        ejercicio_id integer,
+        repeticiones integer,
+        peso double precision,
+        fecha timestamptz,
+        clave_idempotencia text
+    ) ON COMMIT DROP
+""")
+
+COPIAR_LOTE_AVANCES = Consulta("save_user_progress_bulk", """
+    COPY avances_lote (usuario_id, ejercicio_id, repeticiones, peso, fecha, clave_idempotencia) FROM STDIN
+""")
+
+INSERTAR_LOTE_AVANCES = Consulta("save_user_progress_bulk", """
+    INSERT INTO usuario_avances (usuario_id, ejercicio_id, repeticiones, peso, fecha, clave_idempotencia)
+    SELECT usuario_id, ejercicio_id, repeticiones, peso, COALESCE(fecha, now()), clave_idempotencia
+    FROM avances_lote
+    ON CONFLICT (usuario_id, clave_idempotencia) DO NOTHING
+    RETURNING usuario_id
+""")
+
+# Series completas para analítica; la fecha va como días desde 1970-01-01
+SERIES_PROGRESO = Consulta("get_progress_series", """
+    SELECT
+        u.ejercicio_id,
+        e.name_es,
+        u.repeticiones,
+        u.peso,
+        u.fecha::date - DATE '1970-01-01'
+    FROM usuario_avances u
+    INNER JOIN ejercicios e ON e.id = u.ejercicio_id
+    WHERE u.usuario_id = %s
+""")
+
+ELIMINAR_AVANCE = Consulta("delete_user_progress", """
+    DELETE FROM usuario_avances WHERE id = %s RETURNING usuario_id
+""")
+
+RECOMENDACIONES = Consulta("fetch_recommendations", """
+    SELECT recomendaciones
+    FROM recomendaciones_diarias
+    WHERE id_usuario = %s
+""")
+
+INSERTAR_RECOMENDACIONES = Consulta("insert_recommendations", """
+    INSERT INTO public.recomendaciones_diarias (id_usuario, recomendaciones)
+    VALUES (%(id_usuario)s, %(recomendaciones)s)
+""")
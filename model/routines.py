@@ -0,0 +1,51 @@
+# Configuración de rutinas compartida por la generación individual y por lotes
+level_config = {
+    "Principiante": {"days": 3, "exercises_per_day": 6},
+    "Intermedio": {"days": 4, "exercises_per_day": 8},
+    "Avanzado": {"days": 5, "exercises_per_day": 8}
+}
+
+# Mapeo de objetivos con grupos musculares y targets
+objective_mapping = {
+    "Bajar de peso": {
+        "body_parts": [
+            ["cardio", "parte superior de las piernas", "cintura"],  # Día 1
+            ["espalda", "cardio", "cintura"],                        # Día 2
+            ["cardio", "parte superior de las piernas", "espalda"],  # Día 3
+            ["cintura", "espalda"],                                  # Día 4
+            ["cardio", "cintura"],                                   # Día 5
+        ],
+    },
+    "Ganar masa muscular": {
+        "body_parts": [
+            ["pecho", "hombros"],                                    # Día 1
+            ["parte superior de los brazos", "parte superior de las piernas"],  # Día 2
+            ["espalda", "pecho"],                                    # Día 3
+            ["hombros", "parte superior de los brazos"],             # Día 4
+            ["parte superior de las piernas", "espalda"],            # Día 5
+        ],
+    },
+    "Mantenerse en forma": {
+        "body_parts": [
+            ["cintura", "parte inferior de las piernas"],            # Día 1
+            ["espalda", "brazos inferiores"],                        # Día 2
+            ["hombros", "cintura"],                                  # Día 3
+            ["brazos inferiores", "parte inferior de las piernas"],  # Día 4
+            ["cintura", "espalda"],                                  # Día 5
+        ],
+    },
+}
+
+
+def generar_rutina(catalog, objective: str, experience_level: str):
+    config = level_config[experience_level]
+    body_parts_per_day = objective_mapping[objective]["body_parts"]
+
+    routine = []
+    for day, body_parts in enumerate(body_parts_per_day[:config["days"]], start=1):
+        # Obtener ejercicios aleatorios para cada grupo muscular del día
+        exercises = []
+        for body_part in body_parts:
+            exercises += catalog.sample(body_part, config["exercises_per_day"] // len(body_parts))
+        routine.append({"day": day, "exercises": exercises})
+    return routine
@@ -1,75 +1,160 @@
 import json
-import openai
-import psycopg
-import pickle
-import numpy as np
+import time
+from contextlib import contextmanager
+from psycopg_pool import ConnectionPool
+import config
+from model import queries
+from model.queries import Consulta
+from datetime import date
+from model.pagination import consulta_progreso, pagina_progreso
+from model.write_coalescer import WriteCoalescer
+from model.export import consulta_exportacion
+from model.invalidation import InvalidationBus
+from model.metrics import metricas, registrar_consulta
 
 
 class UserConnection():
-    conn = None
-
-    def __init__(self):
+    pool = None
+    # Con False no se prepara ninguna sentencia en el servidor (PgBouncer en modo transacción)
+    preparar = True
+
+    def __init__(self, min_size: int = config.DB_POOL_MIN_SIZE, max_size: int = config.DB_POOL_MAX_SIZE,
+                 preparar: bool = config.DB_PREPARED_STATEMENTS):
+        # Pool compartido por los hilos del threadpool de FastAPI; check_connection
+        # descarta conexiones rotas antes de entregarlas.
+        self.preparar = preparar
+        self.pool = ConnectionPool(
+            config.DATABASE_URL,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=config.DB_POOL_TIMEOUT,
+            max_idle=config.DB_POOL_MAX_IDLE,
+            check=ConnectionPool.check_connection,
+            kwargs=None if preparar else {"prepare_threshold": None},
+            open=True,
+        )
+        self._suscriptores = []
+        # Propaga las invalidaciones a los demás workers (LISTEN/NOTIFY)
+        self.bus = InvalidationBus(self.pool) if config.CACHE_INVALIDATION_BUS else None
+        # Escrituras de una fila de alta frecuencia agrupadas en un solo commit (opcional)
+        self.coalescer = WriteCoalescer(
+            self.pool, publicar=self.bus.publicar_en if self.bus is not None else None
+        ) if config.WRITE_COALESCE_ENABLED else None
+
+    def suscribir(self, callback):
+        # callback(entidad, clave) se llama después de cada escritura confirmada,
+        # p. ej. ("progreso", user_id), para invalidar cachés derivados. Con el bus
+        # activo también recibe las escrituras hechas en otros workers.
+        self._suscriptores.append(callback)
+        if self.bus is not None:
+            self.bus.suscribir(callback)
+
+    def escuchar_invalidaciones(self):
+        if self.bus is not None:
+            self.bus.start()
+
+    def invalidar(self, entidad: str, *claves):
+        # Para datos que no se escriben a través de esta clase (p. ej. entrenadores)
+        self._notificar(entidad, *claves)
+        if self.bus is not None:
+            self.bus.publicar(entidad, claves)
+
+    def _publicar(self, cur, entidad: str, *claves):
+        # Dentro de la transacción de la escritura, en la misma conexión: los demás
+        # workers reciben el aviso al confirmarse, sin otro commit. Va por un cursor
+        # aparte para no pisar el rowcount de la escritura.
+        if self.bus is not None:
+            self.bus.publicar_en(cur.connection, [(entidad, clave) for clave in claves])
+
+    def _notificar(self, entidad: str, *claves):
+        # Cachés de este worker, después del commit
+        for clave in claves:
+            for callback in self._suscriptores:
+                callback(entidad, clave)
+
+    @contextmanager
+    def _cursor(self, nombre: str):
+        # Cada llamada usa su propia conexión y su propia transacción:
+        # commit al salir sin errores, rollback si ocurre una excepción.
+        # nombre identifica la consulta en las métricas (duración, filas, errores).
+        inicio = time.perf_counter()
+        filas = 0
+        error = False
         try:
-            self.conn = psycopg.connect("dbname=gym user=postgres password=password host=localhost port=5432")
-        except psycopg.OperationalError as err:
-            print(err)
-            self.conn.close()
+            with self.pool.connection() as conn:
+                metricas.observar("db_pool_wait_seconds", time.perf_counter() - inicio, pool="sync")
+                with conn.cursor() as cur:
+                    yield cur
+                    filas = cur.rowcount
+        except BaseException:
+            error = True
+            raise
+        finally:
+            registrar_consulta(nombre, time.perf_counter() - inicio, max(filas, 0), error)
+
+    def _ejecutar(self, cur, consulta: Consulta, params=None):
+        # prepare=None deja la decisión al prepare_threshold de psycopg
+        cur.execute(consulta.sql, params, prepare=True if consulta.preparada and self.preparar else None)
+
+    def _fila(self, consulta: Consulta, params=None, diccionario: bool = True):
+        # Primera fila como diccionario (o tupla), None si no hay resultados
+        with self._cursor(consulta.nombre) as cur:
+            self._ejecutar(cur, consulta, params)
+            fila = cur.fetchone()
+            if fila is None or not diccionario:
+                return fila
+            return consulta.diccionarios(cur, [fila])[0]
+
+    def _filas(self, consulta: Consulta, params=None, diccionarios: bool = True):
+        with self._cursor(consulta.nombre) as cur:
+            self._ejecutar(cur, consulta, params)
+            filas = cur.fetchall()
+            if not filas or not diccionarios:
+                return filas
+            return consulta.diccionarios(cur, filas)
+
+    def _escribir(self, consulta: Consulta, params, entidad: str, clave):
+        # Pasa por el coalescedor si está activo; invalida (entidad, clave) en este y
+        # en los demás workers y devuelve las filas afectadas
+        if self.coalescer is not None:
+            inicio = time.perf_counter()
+            filas = self.coalescer.execute(consulta.sql, params, (entidad, clave))
+            # Incluye la espera hasta que se confirma el lote
+            registrar_consulta(consulta.nombre, time.perf_counter() - inicio, filas)
+        else:
+            with self._cursor(consulta.nombre) as cur:
+                self._ejecutar(cur, consulta, params)
+                filas = cur.rowcount
+                self._publicar(cur, entidad, clave)
+        self._notificar(entidad, clave)
+        return filas
 
     def write(self, data):
-        with self.conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO "usuarios"(nombre, apellido, email, password_hash) VALUES(%(nombre)s, %(apellido)s, %(email)s, %(password_hash)s)
-            """, data)
-            self.conn.commit()
+        with self._cursor(queries.INSERTAR_USUARIO.nombre) as cur:
+            self._ejecutar(cur, queries.INSERTAR_USUARIO, data)
+            user_id = cur.fetchone()[0]
+            self._publicar(cur, "usuario", user_id)
+        # Un id consultado antes de existir pudo quedar cacheado como inexistente
+        self._notificar("usuario", user_id)
 
     def get_user_by_email(self, email: str):
-        with self.conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, nombre, apellido, email, password_hash, datos_completos FROM "usuarios" WHERE email = %s
-            """, (email,))
-            result = cur.fetchone()
-
-            if result:
-                return {
-                    "id": result[0],
-                    "nombre": result[1],
-                    "apellido": result[2],
-                    "email": result[3],
-                    "password_hash": result[4],
-                    "datos_completos": result[5]
-                }
-            return None
+        return self._fila(queries.USUARIO_POR_EMAIL, (email,))
 
     def get_user_by_id(self, user_id: int):
-        with self.conn.cursor() as cur:
-            cur.execute("""
-                SELECT nombre, apellido, email, genero, edad, altura, peso_actual, objetivo, nivel_experiencia
-                FROM "usuarios" 
-                WHERE id = %s
-            """, (user_id,))
-            result = cur.fetchone()
+        return self._fila(queries.USUARIO_POR_ID, (user_id,))
 
-            if result:
-                return {
-                    "nombre": result[0],
-                    "apellido": result[1],
-                    "email": result[2],
-                    "genero": result[3],
-                    "edad": result[4],
-                    "altura": result[5],
-                    "peso_actual": result[6],
-                    "objetivo": result[7],
-                    "nivel_experiencia": result[8]
-                }
-            return None
-        
     def update_user(self, user_id: int, updated_data: dict):
         update_fields = {key: value for key, value in updated_data.items() if value is not None}
         if not update_fields:
             raise ValueError("No hay datos para actualizar.")
+        desconocidos = set(update_fields) - set(queries.CAMPOS_USUARIO)
+        if desconocidos:
+            raise ValueError(f"Campos no actualizables: {', '.join(sorted(desconocidos))}.")
 
         # Validar vector biométrico antes de procesarlo
         if "vector_biometrico" in update_fields:
+            # Solo el registro biométrico llega aquí, y ese router ya cargó numpy
+            import numpy as np
             vector_biometrico = updated_data["vector_biometrico"]
 
             # Si el vector ya está en bytes
@@ -82,241 +167,151 @@ class UserConnection():
                 update_fields["vector_biometrico"] = vector_biometrico.tobytes()
             else:
                 raise ValueError("El vector biométrico tiene un formato desconocido.")
-            
-        # Crear la consulta SQL dinámica
-        set_clause = ", ".join([f"{key} = %({key})s" for key in update_fields])
-        
-        query = f"""
-            UPDATE "usuarios" SET {set_clause} WHERE id = %(user_id)s
-        """
-        update_fields["user_id"] = user_id
-
-        with self.conn.cursor() as cur:
-            cur.execute(query, update_fields)
-            self.conn.commit()
 
+        # Misma sentencia para cualquier combinación: los campos ausentes van en NULL
+        # y COALESCE conserva el valor actual
+        params = dict.fromkeys(queries.CAMPOS_USUARIO)
+        params.update(update_fields)
+        params["user_id"] = user_id
+
+        # "biometria" solo cuando cambia el vector: los índices faciales de los demás
+        # workers no releen el perfil en cada cambio de datos del usuario
+        biometria = "vector_biometrico" in update_fields
+        with self._cursor(queries.ACTUALIZAR_USUARIO.nombre) as cur:
+            self._ejecutar(cur, queries.ACTUALIZAR_USUARIO, params)
+            self._publicar(cur, "usuario", user_id)
+            if biometria:
+                self._publicar(cur, "biometria", user_id)
+
+        self._notificar("usuario", user_id)
+        if biometria:
+            self._notificar("biometria", user_id)
         return True
-    
 
-    def get_trainers_by_specialty(self, specialty: str = None):
-        # Consulta base para obtener entrenadores activos
-        query = """
-            SELECT 
-                e.id_entrenador, 
-                e.nombre, 
-                e.especialidad, 
-                c.nombre_clase,
-                h.id_horario, 
-                h.dia_semana
-            FROM entrenadores e
-            INNER JOIN clases c ON c.id_entrenador = e.id_entrenador
-            INNER JOIN horario h ON h.id_clase = c.id_clase
-            WHERE e.estado = true
-        """
-        params = []
 
-        # Agregar filtro opcional por especialidad
+    def get_biometric_vectors(self):
+        filas = self._filas(queries.VECTORES_BIOMETRICOS, diccionarios=False)
+        return [(row[0], bytes(row[1])) for row in filas]
+
+    def get_biometric_profile(self, user_id: int = None, email: str = None):
+        if user_id is not None:
+            perfil = self._fila(queries.PERFIL_BIOMETRICO_POR_ID, (user_id,))
+        else:
+            perfil = self._fila(queries.PERFIL_BIOMETRICO_POR_EMAIL, (email,))
+
+        if perfil and perfil["vector_biometrico"] is not None:
+            perfil["vector_biometrico"] = bytes(perfil["vector_biometrico"])
+        return perfil
+
+    def get_trainers_by_specialty(self, specialty: str = None):
+        # Entrenadores activos, con filtro opcional por especialidad
         if specialty:
-            query += " AND e.especialidad = %s"
-            params.append(specialty)
+            return self._filas(queries.ENTRENADORES_POR_ESPECIALIDAD, (specialty,))
+        return self._filas(queries.ENTRENADORES)
 
-        with self.conn.cursor() as cur:
-            cur.execute(query, params)
-            result = cur.fetchall()
-
-        # Mapear los resultados a un formato de diccionario
-        return [
-            {
-                "id_entrenador": row[0],
-                "nombre": row[1],
-                "especialidad": row[2],
-                "nombre_clase": row[3],
-                "id_horario": row[4],
-                "dia_semana": row[5],
-            }
-            for row in result
-        ]
-    
 
     def get_class_details_by_schedule(self, id_horario: int):
-        query = """
-            SELECT  
-                e.nombre, 
-                e.descripcion, 
-                e.telefono,
-                e.correo,
-                c.nombre_clase,
-                c.descripcion AS descripcion_clase,
-                c.nivel,
-                h.dia_semana,
-                TO_CHAR(h.hora_inicio, 'HH24:MI') AS hora_inicio,
-                TO_CHAR(h.hora_fin, 'HH24:MI') AS hora_fin
-            FROM entrenadores e
-            INNER JOIN clases c ON c.id_entrenador = e.id_entrenador
-            INNER JOIN horario h ON h.id_clase = c.id_clase
-            WHERE h.id_horario = %s
-        """
-        params = [id_horario]
+        return self._fila(queries.DETALLE_CLASE, (id_horario,))
 
-        with self.conn.cursor() as cur:
-            cur.execute(query, params)
-            result = cur.fetchone()
+    def get_random_exercises(self, body_part, limit):
+        return self._filas(queries.EJERCICIOS_ALEATORIOS, (body_part, limit))
 
-        if not result:
-            return None
 
-        return {
-            "nombre": result[0],
-            "descripcion": result[1],
-            "telefono": result[2],
-            "correo": result[3],
-            "nombre_clase": result[4],
-            "descripcion_clase": result[5],
-            "nivel": result[6],
-            "dia_semana": result[7],
-            "hora_inicio": result[8],
-            "hora_fin": result[9],
-        }
-    
-    def get_random_exercises(self, body_part, limit):
-        query = """
-                SELECT id, name_es, equipment_es, target_es
-                FROM ejercicios
-                WHERE body_part_es = %s
-                ORDER BY RANDOM()
-                LIMIT %s
-            """
-        with self.conn.cursor() as cur:
-            cur.execute(query, (body_part, limit)) 
-            result = cur.fetchall()
-
-        return [
-            {"id": row[0], "name_es": row[1], "equipment_es": row[2], "target_es": row[3]}
-            for row in result
-        ]
-    
+    def get_all_exercises(self):
+        return self._filas(queries.EJERCICIOS)
 
     def save_routine(self, user_id, routine):
-        query = """
-            INSERT INTO usuario_rutinas (usuario_id, rutina)
-            VALUES (%s, %s)
-        """
-        with self.conn.cursor() as cur:
-            cur.execute(query, (user_id, json.dumps(routine)))
-            self.conn.commit()
+        self._escribir(queries.INSERTAR_RUTINA, (user_id, json.dumps(routine)), "rutina", user_id)
+
+    def save_routines_bulk(self, routines):
+        # routines: lista de (user_id, routine). Un solo COPY y un solo commit para todo el lote.
+        with self._cursor(queries.COPIAR_RUTINAS.nombre) as cur:
+            with cur.copy(queries.COPIAR_RUTINAS.sql) as copy:
+                for user_id, routine in routines:
+                    copy.write_row((user_id, json.dumps(routine)))
+            usuarios = {user_id for user_id, _ in routines}
+            self._publicar(cur, "rutina", *usuarios)
+        self._notificar("rutina", *usuarios)
+        return len(routines)
 
     def get_user_routine(self, user_id):
-        query = """
-            SELECT rutina
-            FROM usuario_rutinas
-            WHERE usuario_id = %s
-            ORDER BY fecha_creacion DESC
-            LIMIT 1
-        """
-        with self.conn.cursor() as cur:
-            cur.execute(query, (user_id,))
-            result = cur.fetchone()
+        # {"routine": ...} con el contenido JSON de la rutina más reciente
+        return self._fila(queries.RUTINA_ACTUAL, (user_id,))
+
+    def update_password_hash(self, user_id: int, password_hash: str):
+        with self._cursor(queries.ACTUALIZAR_PASSWORD.nombre) as cur:
+            self._ejecutar(cur, queries.ACTUALIZAR_PASSWORD, (password_hash, user_id))
+            self._publicar(cur, "usuario", user_id)
+        self._notificar("usuario", user_id)
 
-        if result:
-            return {
-                "routine": result[0],  # Contenido JSON de la rutina
-            }
-        else:
-            return None
-        
     def update_user_goals_in_db(self, usuario_id, objetivo=None, nivel_experiencia=None):
-        query = """
-            UPDATE usuarios
-            SET objetivo = COALESCE(%s, objetivo),
-                nivel_experiencia = COALESCE(%s, nivel_experiencia)
-            WHERE id = %s
-        """
-        with self.conn.cursor() as cur:
-            cur.execute(query, (objetivo, nivel_experiencia, usuario_id))
-            self.conn.commit()
+        self._escribir(queries.ACTUALIZAR_OBJETIVOS, (objetivo, nivel_experiencia, usuario_id), "usuario", usuario_id)
         return True
-    
+
     def save_user_progress(self, user_id, exercise_id, reps, weight=None):
-        query = """
-            INSERT INTO usuario_avances (usuario_id, ejercicio_id, repeticiones, peso)
-            VALUES (%s, %s, %s, %s)
-        """
-        with self.conn.cursor() as cur:
-            cur.execute(query, (user_id, exercise_id, reps, weight))
-            self.conn.commit()
+        self._escribir(queries.INSERTAR_AVANCE, (user_id, exercise_id, reps, weight), "progreso", user_id)
         return True
-    
-
-    def get_user_progress(self, user_id):
-        query = """
-            SELECT
-                u.id, 
-                u.repeticiones, 
-                u.peso, 
-                u.fecha, 
-                e.name_es
-            FROM usuario_avances u
-            INNER JOIN ejercicios e ON e.id = u.ejercicio_id
-            WHERE u.usuario_id = %s
-            ORDER BY u.fecha DESC
-        """
-        with self.conn.cursor() as cur:
-            cur.execute(query, (user_id,))
+
+
+    def get_user_progress(self, user_id, limit: int = config.PROGRESS_PAGE_SIZE, cursor: str = None,
+                          desde: date = None, hasta: date = None, ejercicio_id: int = None):
+        query, params = consulta_progreso(user_id, limit, cursor, desde, hasta, ejercicio_id)
+        with self._cursor("get_user_progress") as cur:
+            cur.execute(query, params)
             results = cur.fetchall()
 
-        if results:
-            return [
-                {
-                    "id": row[0],
-                    "repeticiones": row[1],
-                    "peso": row[2],
-                    "fecha": row[3].strftime('%d-%m-%Y'),
-                    "name_es": row[4]
-                }
-                for row in results
-            ]
-        else:
-            return []
+        return pagina_progreso(results, limit)
+
+    def save_user_progress_bulk(self, entries):
+        # Carga todo el lote con COPY en una tabla temporal y lo inserta en una sola
+        # transacción. Las filas cuyo (usuario_id, clave_idempotencia) ya existe se
+        # omiten, así un reintento de sincronización no duplica avances.
+        with self._cursor(queries.INSERTAR_LOTE_AVANCES.nombre) as cur:
+            self._ejecutar(cur, queries.CREAR_LOTE_AVANCES)
+            with cur.copy(queries.COPIAR_LOTE_AVANCES.sql) as copy:
+                for entry in entries:
+                    copy.write_row((
+                        entry["usuario_id"],
+                        entry["ejercicio_id"],
+                        entry["repeticiones"],
+                        entry["peso"],
+                        entry["fecha"],
+                        entry["idempotency_key"],
+                    ))
+            self._ejecutar(cur, queries.INSERTAR_LOTE_AVANCES)
+            usuarios = [row[0] for row in cur.fetchall()]
+            self._publicar(cur, "progreso", *set(usuarios))
+
+        self._notificar("progreso", *set(usuarios))
+        return len(usuarios)
+
+    def get_progress_series(self, user_id: int):
+        # Tuplas (ejercicio_id, name_es, repeticiones, peso, día); la analítica las vuelca a arrays
+        return self._filas(queries.SERIES_PROGRESO, (user_id,), diccionarios=False)
 
     def delete_user_progress(self, progress_id: int) -> bool:
-        query = "DELETE FROM usuario_avances WHERE id = %s"
-        with self.conn.cursor() as cur:
-            cur.execute(query, (progress_id,))
-            self.conn.commit()
+        with self._cursor(queries.ELIMINAR_AVANCE.nombre) as cur:
+            self._ejecutar(cur, queries.ELIMINAR_AVANCE, (progress_id,))
+            result = cur.fetchone()
             # Verificar si se eliminó alguna fila
-            return cur.rowcount > 0
-        
+            if result is None:
+                return False
+            self._publicar(cur, "progreso", result[0])
+        self._notificar("progreso", result[0])
+        return True
+
     def get_unique_body_parts(self):
-        query = """
-            SELECT body_part_es
-            FROM ejercicios
-            GROUP BY body_part_es
-        """
         try:
-            with self.conn.cursor() as cur:
-                cur.execute(query)
-                results = cur.fetchall()
-            return [row[0] for row in results]
+            return [row[0] for row in self._filas(queries.PARTES_DEL_CUERPO, diccionarios=False)]
         except Exception as e:
             raise Exception(f"Error al obtener body parts: {str(e)}")
-        
-    def get_exercises_filtered(self, body_part: str):
-        sql = """
-            SELECT id, name_es
-            FROM ejercicios
-            WHERE body_part_es = %s
-        """
-        params = [body_part]
 
+    def get_exercises_filtered(self, body_part: str):
         try:
-            # Ejecutar consulta
-            with self.conn.cursor() as cur:
-                cur.execute(sql, params)
-                results = cur.fetchall()
-            return [{"id": row[0], "name_es": row[1]} for row in results]
+            return self._filas(queries.EJERCICIOS_POR_PARTE, (body_part,))
         except Exception as e:
             raise Exception(f"Error al obtener ejercicios: {str(e)}")
-        
+
     def calcular_calorias(self, genero, edad, peso, altura, nivel_experiencia, objetivo):
         if genero == "masculino":
             bmr = 10 * peso + 6.25 * altura - 5 * edad + 5
@@ -362,6 +357,7 @@ class UserConnection():
         Genera un plan de alimentación para una semana completa. Considera desayuno, almuerzo, cena y snacks para cada día.
         """
         try:
+            import openai
             response = openai.ChatCompletion.create(
                 model="gpt-4o-mini",  # Cambia al modelo que prefieras
                 messages=[
@@ -377,22 +373,8 @@ class UserConnection():
         
     def fetch_recommendations(self, user_id: int):
         try:
-            # Consulta SQL
-            query = """
-                SELECT recomendaciones
-                FROM recomendaciones_diarias
-                WHERE id_usuario = %s
-            """
-            with self.conn.cursor() as cur:
-                cur.execute(query, (user_id,))
-                result = cur.fetchone()
-
-            if result:
-                return {
-                    "recomendaciones": result[0],  # Campo JSON de las recomendaciones
-                }
-            else:
-                return None
+            # {"recomendaciones": ...} con el campo JSON de las recomendaciones
+            return self._fila(queries.RECOMENDACIONES, (user_id,))
 
         except Exception as e:
             raise Exception(status_code=500, detail=f"Error al realizar la consulta: {str(e)}")
@@ -400,82 +382,65 @@ class UserConnection():
     def insert_recommendations(self, user_id: int, recommendations: dict):
 
         try:
-            # Consulta SQL
-            query = """
-                INSERT INTO public.recomendaciones_diarias (id_usuario, recomendaciones)
-                VALUES (%(id_usuario)s, %(recomendaciones)s)
-            """
             data = {
                 "id_usuario": user_id,
                 "recomendaciones": json.dumps(recommendations)  # Convertir JSON a string para insertar
             }
 
             # Ejecutar la consulta
-            with self.conn.cursor() as cur:
-                cur.execute(query, data)
-                self.conn.commit()
+            self._escribir(queries.INSERTAR_RECOMENDACIONES, data, "recomendaciones", user_id)
 
         except Exception as e:
             raise Exception(f"Error al insertar recomendaciones: {str(e)}")
-        
+
 
     # Método para obtener un ejercicio por ID desde la base de datos
     def fetch_exercise_by_id(self, exercise_id: int):
         try:
-            # Consulta SQL
-            query = """
-            SELECT id, name_es, body_part_es, target_es, equipment_es, instructions_es, gif_url 
-            FROM ejercicios
-            WHERE id = %s
-            """
-            with self.conn.cursor() as cur:
-                cur.execute(query, (exercise_id,))
-                result = cur.fetchone()
-
-            if result:
-                return {
-                    "id": result[0],
-                    "name_es": result[1],
-                    "body_part_es": result[2],
-                    "target_es": result[3],
-                    "equipment_es": result[4],
-                    "instructions_es": result[5],
-                    "gif_url": result[6],
-                }
-            else:
-                return None
+            return self._fila(queries.EJERCICIO_POR_ID, (exercise_id,))
         except Exception as e:
             raise Exception(f"Error al consultar la base de datos: {str(e)}")
 
     def fetch_user_routine(self, usuario_id: int):
         try:
-            # Consulta SQL
-            query = """
-            SELECT id, usuario_id, rutina
-            FROM public.usuario_rutinas
-            WHERE usuario_id = %s
-            """
-            with self.conn.cursor() as cur:
-                cur.execute(query, (usuario_id,))
-                result = cur.fetchone()
-
-            # Si hay un resultado, devolver la rutina
-            if result:
-                return {
-                    "id": result[0],
-                    "usuario_id": result[1],
-                    "routine": result[2]  # Este será un arreglo JSON desde la base de datos
-                }
-            else:
-                # Si no hay registro, devolver rutina vacía
+            result = self._fila(queries.RUTINA_USUARIO, (usuario_id,))
+
+            # Si no hay registro, devolver rutina vacía
+            if result is None:
                 return {
                     "id": None,
                     "usuario_id": usuario_id,
                     "routine": []
                 }
+            return result
 
         except Exception as e:
             raise Exception(f"Error al consultar la base de datos: {str(e)}")
 
-    def __def__(self):
-        self.conn.close()
\ No newline at end of file
+    def export_rows(self, entidad: str, user_id: int = None, tamaño_lote: int = config.EXPORT_BATCH_SIZE):
+        # Cursor con nombre (del lado del servidor): Postgres entrega las filas de a
+        # tamaño_lote, así la memoria no crece con el historial. La conexión queda
+        # tomada mientras el cliente consume la exportación.
+        columnas, query, params = consulta_exportacion(entidad, user_id)
+        with self.pool.connection() as conn:
+            with conn.cursor(name=f"exportar_{entidad}") as cur:
+                cur.itersize = tamaño_lote
+                cur.execute(query, params)
+                while True:
+                    filas = cur.fetchmany(tamaño_lote)
+                    if not filas:
+                        break
+                    yield filas
+
+    def write_stats(self):
+        if self.coalescer is None:
+            return {"activo": False}
+        return {"activo": True, **self.coalescer.stats()}
+
+    def close(self):
+        if self.bus is not None:
+            self.bus.stop()
+        # Primero se confirman las escrituras pendientes del coalescedor
+        if self.coalescer is not None:
+            self.coalescer.close()
+        self.pool.close()
\ No newline at end of file
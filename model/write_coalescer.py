@@ -0,0 +1,238 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+import config
+from model.metrics import registrar_consulta
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de los buckets del histograma de tamaños de lote
+BUCKETS_LOTE = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class _Escritura():
+    __slots__ = ("query", "params", "aviso", "futuro")
+
+    def __init__(self, query, params, aviso=None):
+        self.query = query
+        self.params = params
+        self.aviso = aviso
+        self.futuro = Future()
+
+
+class WriteCoalescer():
+    # Agrupa escrituras pequeñas de distintas peticiones (group commit): las junta
+    # durante unos milisegundos o hasta max_filas y las confirma en una sola
+    # transacción, con un savepoint por escritura para que cada llamador reciba su
+    # propio resultado o error. En modo síncrono cada escritura se confirma al
+    # momento, útil para pruebas. Ningún llamador espera más de timeout segundos:
+    # si el hilo de escritura falla o se cierra el coalescedor, las escrituras
+    # pendientes reciben el error.
+
+    def __init__(
+        self,
+        pool,
+        max_filas: int = config.WRITE_COALESCE_MAX_ROWS,
+        max_espera_ms: float = config.WRITE_COALESCE_MAX_DELAY_MS,
+        sincrono: bool = config.WRITE_COALESCE_SYNC,
+        timeout: float = config.WRITE_COALESCE_TIMEOUT,
+        publicar=None,
+    ):
+        self.pool = pool
+        self.max_filas = max_filas
+        self.max_espera = max_espera_ms / 1000
+        self.sincrono = sincrono
+        self.timeout = timeout
+        # publicar(conn, avisos) emite las invalidaciones del lote dentro de su transacción
+        self.publicar = publicar
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._cerrado = False
+        self._error = None
+        self._metricas = {
+            "lotes": 0,
+            "filas": 0,
+            "errores": 0,
+            "vencidas": 0,
+            "max_lote": 0,
+            "flush_total": 0.0,
+            "flush_max": 0.0,
+            "histograma": [0] * (len(BUCKETS_LOTE) + 1),
+        }
+        self._hilo = None
+        if not sincrono:
+            self._hilo = threading.Thread(target=self._bucle, name="write-coalescer", daemon=True)
+            self._hilo.start()
+
+    def submit(self, query, params, aviso=None):
+        # aviso: (entidad, clave) a invalidar cuando la escritura se confirme
+        escritura = _Escritura(query, params, aviso)
+        if self.sincrono:
+            self._flush([escritura])
+            return escritura.futuro
+        # Bajo el lock: close() y una falla del hilo marcan el cierre antes de vaciar
+        # la cola, así ninguna escritura queda en ella sin respuesta
+        with self._lock:
+            if self._cerrado:
+                raise RuntimeError("El coalescedor de escrituras está cerrado") from self._error
+            self._cola.put(escritura)
+        return escritura.futuro
+
+    def execute(self, query, params, aviso=None):
+        # Bloquea hasta que el lote que contiene esta escritura se confirma
+        futuro = self.submit(query, params, aviso)
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self._metricas["vencidas"] += 1
+            # Si el lote todavía no la tomó se descarta; si ya está en curso puede confirmarse igual
+            if futuro.cancel():
+                raise TimeoutError(f"La escritura no se ejecutó en {self.timeout} s") from None
+            raise TimeoutError(f"La escritura no se confirmó en {self.timeout} s y puede haberse aplicado") from None
+
+    def _bucle(self):
+        lote = []
+        try:
+            while True:
+                primera = self._cola.get()
+                if primera is None:
+                    return
+                lote = [primera]
+                limite = time.monotonic() + self.max_espera
+                while len(lote) < self.max_filas:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    try:
+                        siguiente = self._cola.get(timeout=restante)
+                    except queue.Empty:
+                        break
+                    if siguiente is None:
+                        self._flush(lote)
+                        return
+                    lote.append(siguiente)
+                self._flush(lote)
+                lote = []
+        except BaseException as e:
+            # Un error fuera de las escrituras (métricas, memoria...) termina el hilo:
+            # el lote en curso y lo encolado fallan en vez de esperar para siempre
+            logger.exception("El hilo del coalescedor de escrituras terminó con un error")
+            with self._lock:
+                self._error = e
+                self._cerrado = True
+            self._fallar(lote, e)
+            self._drenar(e)
+
+    @staticmethod
+    def _fallar(lote, error):
+        for escritura in lote:
+            try:
+                if not escritura.futuro.done():
+                    escritura.futuro.set_exception(error)
+            except InvalidStateError:
+                # El llamador la canceló al vencer su espera
+                pass
+
+    def _drenar(self, error):
+        pendientes = []
+        while True:
+            try:
+                escritura = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if escritura is not None:
+                pendientes.append(escritura)
+        self._fallar(pendientes, error)
+
+    def _flush(self, lote):
+        # Las escrituras canceladas por su llamador (espera vencida) no se ejecutan;
+        # las demás pasan a en curso y ya no pueden cancelarse
+        lote = [escritura for escritura in lote if escritura.futuro.set_running_or_notify_cancel()]
+        if not lote:
+            return
+        inicio = time.perf_counter()
+        resultados = []
+        try:
+            with self.pool.connection() as conn:
+                with conn.transaction():
+                    with conn.cursor() as cur:
+                        for escritura in lote:
+                            try:
+                                with conn.transaction():
+                                    cur.execute(escritura.query, escritura.params)
+                                    resultados.append((cur.rowcount, None))
+                            except Exception as e:
+                                resultados.append((None, e))
+                    # Un solo NOTIFY por lote, con los avisos de las escrituras que se aplicaron
+                    avisos = [
+                        escritura.aviso
+                        for escritura, (_, error) in zip(lote, resultados)
+                        if error is None and escritura.aviso is not None
+                    ]
+                    if self.publicar is not None and avisos:
+                        self.publicar(conn, avisos)
+        except Exception as e:
+            # Falló el commit o la conexión: ninguna escritura del lote quedó confirmada
+            resultados = [(None, e)] * len(lote)
+
+        duracion = time.perf_counter() - inicio
+        errores = sum(1 for _, error in resultados if error)
+        self._registrar(len(lote), errores, duracion)
+        registrar_consulta("write_coalescer_flush", duracion, len(lote), errores > 0)
+
+        # Los llamadores se liberan recién después del commit
+        for escritura, (filas, error) in zip(lote, resultados):
+            if error is None:
+                escritura.futuro.set_result(filas)
+            else:
+                escritura.futuro.set_exception(error)
+
+    def _registrar(self, tamaño, errores, duracion):
+        with self._lock:
+            m = self._metricas
+            m["lotes"] += 1
+            m["filas"] += tamaño
+            m["errores"] += errores
+            m["max_lote"] = max(m["max_lote"], tamaño)
+            m["flush_total"] += duracion
+            m["flush_max"] = max(m["flush_max"], duracion)
+            bucket = next((i for i, limite in enumerate(BUCKETS_LOTE) if tamaño <= limite), len(BUCKETS_LOTE))
+            m["histograma"][bucket] += 1
+
+    def stats(self):
+        with self._lock:
+            m = self._metricas
+            etiquetas = [f"<={limite}" for limite in BUCKETS_LOTE] + [f">{BUCKETS_LOTE[-1]}"]
+            return {
+                "sincrono": self.sincrono,
+                "max_filas": self.max_filas,
+                "max_espera_ms": self.max_espera * 1000,
+                "en_cola": self._cola.qsize(),
+                "lotes": m["lotes"],
+                "filas": m["filas"],
+                "errores": m["errores"],
+                "vencidas": m["vencidas"],
+                "lote_medio": round(m["filas"] / m["lotes"], 2) if m["lotes"] else 0.0,
+                "lote_max": m["max_lote"],
+                "flush_medio_ms": round(m["flush_total"] / m["lotes"] * 1000, 3) if m["lotes"] else 0.0,
+                "flush_max_ms": round(m["flush_max"] * 1000, 3),
+                "histograma_lotes": dict(zip(etiquetas, m["histograma"])),
+            }
+
+    def close(self):
+        # Confirma lo pendiente antes de cerrar; lo que no alcance a confirmarse en
+        # timeout segundos (o si el hilo ya había fallado) recibe un error
+        if self._hilo is None:
+            return
+        with self._lock:
+            if not self._cerrado:
+                self._cerrado = True
+                self._cola.put(None)
+        self._hilo.join(self.timeout)
+        self._drenar(RuntimeError("El coalescedor de escrituras se cerró antes de confirmar la escritura"))
+        if self._hilo.is_alive():
+            # Sigue trabado en un lote: el vaciado se llevó su marca de fin
+            self._cola.put(None)
@@ -0,0 +1,7 @@
+# Un módulo por área de la API. main.py importa solo los que indica
+# config.APP_ROUTERS; cada uno expone `router` y, si los necesita,
+# calentar() (precarga durante el arranque) y cerrar() (al apagar).
+ROUTERS = ("users", "biometrics", "exercises", "progress", "nutrition", "trainers")
+
+# Routers que dependen del pool facial (dlib); no se montan en modo solo lectura
+SOLO_ESCRITURA = ("biometrics",)
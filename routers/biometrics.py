@@ -0,0 +1,220 @@
+from fastapi import APIRouter, Form, HTTPException, Query, UploadFile
+from starlette.concurrency import run_in_threadpool
+from dependencies import conn, user_cache
+from model.face_index import FaceIndex, VectorCache
+from model.embedding_store import EmbeddingStore
+from model.face_encoder import FaceEncoder, FaceEncoderSaturado
+from model.invalidation import TODAS
+from model.metrics import metricas
+from schema.BiometricUpdate_schema import BiometricUpdateSchema
+import asyncio
+import time
+import numpy as np
+import config
+
+router = APIRouter()
+
+# Con FACE_STORE_DIR todos los workers comparten un único archivo mapeado en memoria
+if config.FACE_STORE_DIR:
+    face_index = EmbeddingStore(config.FACE_STORE_DIR, conn.get_biometric_vectors)
+else:
+    face_index = FaceIndex(conn.get_biometric_vectors)
+# dlib y OpenCV se cargan solo dentro de los procesos del pool facial
+face_encoder = FaceEncoder()
+vector_cache = VectorCache(config.FACE_VECTOR_CACHE_SIZE)
+
+def invalidar_vectores(entidad: str, clave):
+    if entidad == TODAS:
+        vector_cache.clear()
+    elif entidad == "usuario":
+        vector_cache.invalidate(clave)
+
+def sincronizar_indice(entidad: str, clave):
+    # El índice en memoria es una copia por worker: los registros biométricos hechos
+    # en otros workers llegan por el bus de invalidación ("biometria", solo cuando
+    # cambia el vector) y se releen de la base. Los de este worker ya los agrega
+    # update_user. Mientras el índice no se cargó no hay nada que actualizar.
+    if not face_index.cargado:
+        return
+    if entidad == TODAS:
+        face_index.invalidar()
+    elif entidad == "biometria":
+        perfil = conn.get_biometric_profile(user_id=clave)
+        if perfil and perfil["vector_biometrico"]:
+            face_index.upsert(clave, np.frombuffer(perfil["vector_biometrico"], dtype=np.float32))
+        else:
+            face_index.remove(clave)
+
+conn.suscribir(invalidar_vectores)
+# EmbeddingStore ya se comparte entre workers a través de sus archivos
+if isinstance(face_index, FaceIndex):
+    if conn.bus is None and config.WEB_CONCURRENCY > 1:
+        # Sin bus cada worker vería solo los registros biométricos hechos en él
+        raise RuntimeError("Con varios workers se necesita CACHE_INVALIDATION_BUS o FACE_STORE_DIR")
+    if conn.bus is not None:
+        # Solo los avisos de otros workers, que llegan en el hilo del bus
+        conn.bus.suscribir(sincronizar_indice)
+metricas.agregar_recolector(lambda: metricas.fijar("face_encoder_pending", face_encoder.stats()["pendientes"]))
+
+def calentar():
+    face_index.cargar()
+    face_encoder.calentar()
+
+def cerrar():
+    face_encoder.shutdown()
+
+async def calcular_vector_biometrico(imagen_bytes: bytes):
+    # Decodificación, detección y codificación corren en el pool de procesos.
+    # Devuelve el vector y los tiempos de cada etapa.
+    try:
+        vector_biometrico, tiempos = await face_encoder.encode(imagen_bytes)
+    except FaceEncoderSaturado as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+
+    if vector_biometrico is None:
+        raise HTTPException(status_code=400, detail="No se detectó un rostro en la imagen.")
+
+    # Validar tamaño del vector biométrico
+    if vector_biometrico.shape[0] != 128:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El vector biométrico tiene un tamaño inválido: {vector_biometrico.shape[0]}. Debe tener 128 elementos."
+        )
+
+    return vector_biometrico, tiempos
+
+def obtener_perfil_biometrico(user_id: int = None, email: str = None):
+    perfil = vector_cache.get(user_id=user_id, email=email)
+    if perfil is not None:
+        return perfil
+
+    usuario = conn.get_biometric_profile(user_id=user_id, email=email)
+    if not usuario:
+        return None
+
+    vector_bytes = usuario.pop("vector_biometrico")
+    perfil = {
+        "usuario": usuario,
+        "vector": np.frombuffer(vector_bytes, dtype=np.float32) if vector_bytes else None,
+    }
+    vector_cache.put(usuario["id"], usuario["email"], perfil)
+    return perfil
+@router.post("/api/user/login/face")
+async def login_face(
+    imagen: UploadFile,
+    user_id: int = Form(None),
+    email: str = Form(None),
+):
+    if user_id is None and not email:
+        raise HTTPException(status_code=400, detail="Debe indicar user_id o email")
+
+    try:
+        imagen_bytes = await imagen.read()
+
+        async def buscar_perfil():
+            inicio = time.perf_counter()
+            perfil = await run_in_threadpool(obtener_perfil_biometrico, user_id, email)
+            return perfil, time.perf_counter() - inicio
+
+        # La búsqueda del perfil (caché o base de datos) corre en paralelo con la codificación
+        (vector_biometrico, tiempos), (perfil, tiempo_perfil) = await asyncio.gather(
+            calcular_vector_biometrico(imagen_bytes),
+            buscar_perfil(),
+        )
+        tiempos["perfil"] = tiempo_perfil
+
+        if perfil is None:
+            raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+        if perfil["vector"] is None:
+            raise HTTPException(status_code=400, detail="El usuario no tiene un vector biométrico registrado")
+
+        inicio = time.perf_counter()
+        distancia = float(np.linalg.norm(perfil["vector"] - vector_biometrico))
+        tiempos["compare"] = time.perf_counter() - inicio
+
+        # El umbral es solo del servidor: si lo eligiera el cliente, cualquier rostro pasaría
+        if distancia > config.UMBRAL_DISTANCIA:
+            raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+
+        usuario = perfil["usuario"]
+        return {
+            "message": "Login exitoso",
+            "user_id": usuario["id"],
+            "nombre": usuario["nombre"],
+            "apellido": usuario["apellido"],
+            "email": usuario["email"],
+            "datos_completos": usuario["datos_completos"],
+            "distancia": distancia,
+            "tiempos_ms": {etapa: round(segundos * 1000, 3) for etapa, segundos in tiempos.items()},
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al verificar el rostro: {str(e)}")
+
+@router.put("/api/user/update/biometric/{user_id}")
+async def update_user(user_id: int, imagen: UploadFile, data: str = Form(...)):
+    # Las consultas a la base de datos bloquean: van al pool de hilos, como en login_face
+    user = await run_in_threadpool(user_cache.get_or_load, ("usuario", user_id), lambda: conn.get_user_by_id(user_id))
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+
+    parsed_data = BiometricUpdateSchema.model_validate_json(data)
+    data_values = parsed_data.model_dump()
+
+    try:
+        # Leer la imagen cargada y generar el vector biométrico
+        imagen_bytes = await imagen.read()
+        vector_biometrico, _ = await calcular_vector_biometrico(imagen_bytes)
+
+        # Convertir a bytes para almacenar en la base de datos
+        vector_biometrico_bytes = vector_biometrico.tobytes()
+        data_values["vector_biometrico"] = vector_biometrico_bytes
+
+        # Validar el tipo antes de enviarlo
+        if not isinstance(vector_biometrico_bytes, bytes):
+            raise HTTPException(status_code=500, detail="El vector biométrico no está en el formato esperado (bytes).")
+        
+        # Actualizar usuario en la base de datos
+        await run_in_threadpool(conn.update_user, user_id, data_values)
+        await run_in_threadpool(face_index.upsert, user_id, vector_biometrico)
+
+        return {"message": "Usuario actualizado exitosamente"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al procesar el vector biométrico: {str(e)}")
+
+@router.post("/api/user/identify")
+async def identify_user(
+    imagen: UploadFile,
+    k: int = Query(1, ge=1, le=20, description="Número máximo de candidatos"),
+    umbral: float = Query(None, gt=0, description="Distancia máxima para considerar una coincidencia (a lo sumo la del servidor)"),
+):
+    # El cliente puede pedir un umbral más estricto, nunca uno más permisivo
+    umbral = config.UMBRAL_DISTANCIA if umbral is None else min(umbral, config.UMBRAL_DISTANCIA)
+    try:
+        imagen_bytes = await imagen.read()
+        vector_biometrico, _ = await calcular_vector_biometrico(imagen_bytes)
+
+        # La primera búsqueda (o la siguiente a una invalidación) carga el índice desde la base
+        coincidencias = await run_in_threadpool(face_index.search, vector_biometrico, k=k, umbral=umbral)
+        if not coincidencias:
+            raise HTTPException(status_code=404, detail="No se encontró ningún usuario para el rostro enviado")
+
+        return {
+            "message": "Usuario identificado",
+            "user_id": coincidencias[0]["usuario_id"],
+            "coincidencias": coincidencias,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al identificar al usuario: {str(e)}")
+
+@router.get("/api/biometrics/stats")
+def get_biometrics_stats():
+    return face_encoder.stats()
@@ -0,0 +1,137 @@
+from fastapi import APIRouter, HTTPException, Query
+from dependencies import aconn, conn, leer_cacheado
+from model.invalidation import TODAS
+from model.exercise_catalog import ExerciseCatalog
+from model.routines import generar_rutina, level_config, objective_mapping
+from schema.RoutineBatch_schema import RoutineBatchRequest
+import time
+
+router = APIRouter()
+
+exercise_catalog = ExerciseCatalog(conn.get_all_exercises)
+
+def invalidar_catalogo(entidad: str, clave):
+    # Una recarga hecha en otro worker llega por el bus; aquí se recarga en el próximo uso
+    if entidad in (TODAS, "catalogo"):
+        exercise_catalog.invalidate()
+
+conn.suscribir(invalidar_catalogo)
+
+def calentar():
+    exercise_catalog.refresh()
+
+@router.post("/api/exercises/recommendations")
+def recommend_exercises(
+    user_id: int = Query(..., description="ID del usuario"),
+    objective: str = Query(..., description="Objetivo del usuario: Bajar de peso, Ganar masa muscular, Mantenerse en forma"),
+    experience_level: str = Query(..., description="Nivel de experiencia: Principiante, Intermedio, Avanzado")
+):
+    
+    # Verificar si ya existe una rutina para el usuario
+    existing_routine = conn.fetch_user_routine(user_id)
+    if existing_routine and existing_routine["routine"]:
+        return {
+            "message": "Rutina ya existente para este usuario",
+            "routine": existing_routine["routine"]
+        }
+
+
+    try:
+        routine = generar_rutina(exercise_catalog, objective, experience_level)
+        conn.save_routine(user_id, routine)     
+        return {"message": "Rutina generada exitosamente", "routine": routine}
+ 
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al generar la rutina: {str(e)}")
+
+@router.post("/api/exercises/recommendations/batch")
+def recommend_exercises_batch(batch: RoutineBatchRequest):
+    try:
+        inicio = time.perf_counter()
+        routines = []
+        errores = []
+        for item in batch.rutinas:
+            if item.objective not in objective_mapping or item.experience_level not in level_config:
+                errores.append({"user_id": item.user_id, "detail": "Objetivo o nivel de experiencia inválido"})
+                continue
+            routines.append((item.user_id, generar_rutina(exercise_catalog, item.objective, item.experience_level)))
+
+        guardadas = conn.save_routines_bulk(routines) if routines else 0
+        segundos = time.perf_counter() - inicio
+
+        return {
+            "message": "Rutinas generadas exitosamente",
+            "generadas": guardadas,
+            "errores": errores,
+            "segundos": round(segundos, 3),
+            "filas_por_segundo": round(guardadas / segundos, 1) if segundos > 0 else None,
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al generar las rutinas: {str(e)}")
+    
+@router.post("/api/exercises/catalog/refresh")
+def refresh_exercise_catalog():
+    try:
+        # Primero se avisa (también invalida el catálogo local) y después se recarga
+        conn.invalidar("catalogo", None)
+        total = exercise_catalog.refresh()
+        return {"message": "Catálogo de ejercicios recargado", "total": total}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al recargar el catálogo: {str(e)}")
+
+@router.get("/api/exercises/routine")
+async def get_user_routine(user_id: int = Query(..., description="ID del usuario")):
+    try:     
+        routine = await leer_cacheado(("rutina", user_id), lambda: aconn.get_user_routine(user_id))
+        if routine:
+            return {
+                "message": "Rutina encontrada",
+                "routine": routine["routine"],
+            }
+        else:
+            return {
+                "message": "No se encontró una rutina para el usuario",
+                "routine": None
+            }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar la rutina: {str(e)}")
+    
+@router.get("/api/exercises/body-parts")
+def get_body_parts():
+    try:
+        body_parts = conn.get_unique_body_parts()
+        return {"body_parts": body_parts}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener body parts: {str(e)}")
+    
+@router.get("/api/exercises/by-body-part")
+def get_exercises_by_body_part(
+    body_part: str
+):
+    try:
+        # Llamar al método para obtener los ejercicios
+        exercises = conn.get_exercises_filtered(body_part)
+        return {"exercises": exercises}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener ejercicios: {str(e)}")
+
+# Debe registrarse al final: /api/exercises/{exercise_id} capturaría las rutas anteriores
+@router.get("/api/exercises/{exercise_id}")
+async def get_exercise(exercise_id: int):
+    try:
+        # Llamada al método para obtener el ejercicio
+        exercise = await aconn.fetch_exercise_by_id(exercise_id)
+
+         # Validar si se encontró el ejercicio
+        if not exercise:
+            raise HTTPException(status_code=404, detail="Ejercicio no encontrado")
+
+        # Devolver la información del ejercicio
+        return {
+            "message": "Ejercicio encontrado",
+            "exercise": exercise
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar el ejercicio: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,210 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from dependencies import conn, user_cache
+from model.cache import TTLCache
+from model.nutrition import CohereClient, ParserPlanIncremental, PlanInvalido, clave_plan, construir_prompt, evento_sse, limpiar_recomendaciones
+from model.nutrition_jobs import NutritionJobQueue, ColaLlena
+from model.routines import level_config, objective_mapping
+from schema.NutritionPlan_schema import NutritionPlanRequest
+import config
+
+router = APIRouter()
+
+plan_cache = TTLCache(config.NUTRITION_CACHE_SIZE, config.NUTRITION_CACHE_TTL)
+
+# Cliente de IA intercambiable (en pruebas se puede reemplazar por un fake local).
+# El SDK de Cohere se importa recién en la primera llamada.
+plan_client = CohereClient()
+
+def calentar():
+    import model.meal_planner
+    if hasattr(plan_client, "calentar"):
+        plan_client.calentar()
+
+def iniciar():
+    # Los workers de solo lectura no toman trabajos (guardan recomendaciones)
+    if not config.APP_READ_ONLY:
+        nutrition_jobs.start()
+
+def cerrar():
+    nutrition_jobs.shutdown()
+
+def generar_plan_local(macros):
+    # El generador local usa numpy: se importa solo cuando hace falta un plan local
+    from model.meal_planner import generar_plan_local
+    return generar_plan_local(macros)
+
+def generar_plan_ia(data: NutritionPlanRequest, calorias, macros, timeout: float = config.NUTRITION_LLM_TIMEOUT):
+    raw_recommendations = plan_client.generar(
+        construir_prompt(data, calorias, macros),
+        timeout=timeout,
+    )
+    return limpiar_recomendaciones(raw_recommendations)
+
+def validar_objetivos(data: NutritionPlanRequest):
+    # Los mismos valores que aceptan las rutinas; con otros el cálculo de calorías falla
+    if data.nivel_experiencia not in level_config or data.objetivo not in objective_mapping:
+        raise HTTPException(status_code=400, detail="Objetivo o nivel de experiencia inválido")
+
+def calcular_objetivos(data: NutritionPlanRequest):
+    # Cálculo de calorías
+    calorias = conn.calcular_calorias(
+        data.genero,
+        data.edad,
+        data.peso_actual,
+        data.altura,
+        data.nivel_experiencia,
+        data.objetivo,
+    )
+
+    # Cálculo de macronutrientes
+    macros = conn.calcular_macros(calorias, data.objetivo)
+    return calorias, macros
+
+def construir_plan(
+    data: NutritionPlanRequest,
+    modo: str = "ia",
+    respaldo_local: bool = False,
+    timeout: float = config.NUTRITION_LLM_TIMEOUT,
+):
+    calorias, macros = calcular_objetivos(data)
+    fuente = "ia"
+
+    if modo == "local":
+        recommendations = generar_plan_local(macros)
+        fuente = "local"
+    else:
+        # Los planes se cachean por entradas cuantizadas; peticiones idénticas
+        # concurrentes comparten una sola llamada a la IA
+        clave = clave_plan(calorias, macros, data.objetivo, data.nivel_experiencia, data.genero)
+        try:
+            recommendations = plan_cache.get_or_load(clave, lambda: generar_plan_ia(data, calorias, macros, timeout))
+        except Exception:
+            # IA lenta, caída o con JSON inválido: usar el generador local
+            if not respaldo_local:
+                raise
+            recommendations = generar_plan_local(macros)
+            fuente = "local"
+
+    conn.insert_recommendations(data.id_usuario, recommendations)
+
+    return {
+        "calorias": calorias,
+        "macros": macros,
+        "recomendaciones": recommendations,  # Devuelve un JSON limpio
+        "fuente": fuente,
+    }
+
+# Los trabajos guardan la petición como JSON; cualquier worker puede procesarlos
+nutrition_jobs = NutritionJobQueue(lambda payload: construir_plan(NutritionPlanRequest.model_validate(payload)), conn.pool)
+
+@router.post("/api/nutrition-plan")
+def obtener_plan_alimenticio(
+    data: NutritionPlanRequest,
+    modo: str = Query("ia", pattern="^(ia|local)$", description="ia: plan generado por IA con respaldo local; local: solo generador local"),
+):
+    try:
+        validar_objetivos(data)
+        return construir_plan(data, modo=modo, respaldo_local=True, timeout=config.NUTRITION_SYNC_TIMEOUT)
+
+    except HTTPException:
+        raise
+    except AttributeError as e:
+        raise HTTPException(status_code=500, detail=f"Error al procesar la solicitud con Cohere: {str(e)}")
+    except PlanInvalido as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al generar plan: {str(e)}")
+
+@router.post("/api/nutrition-plan/stream")
+def obtener_plan_alimenticio_stream(data: NutritionPlanRequest):
+    # Se valida antes de abrir el stream: después ya no se puede responder con un código de error
+    validar_objetivos(data)
+    calorias, macros = calcular_objetivos(data)
+    clave = clave_plan(calorias, macros, data.objetivo, data.nivel_experiencia, data.genero)
+
+    def eventos():
+        # Calorías y macros son locales: se envían antes de llamar a la IA
+        yield evento_sse("macros", {"calorias": calorias, "macros": macros})
+        try:
+            recommendations = plan_cache.get(clave)
+            if recommendations is not None:
+                for day, meals in recommendations.items():
+                    yield evento_sse("dia", {"dia": day, "comidas": meals})
+            else:
+                parser = ParserPlanIncremental()
+                prompt = construir_prompt(data, calorias, macros)
+                try:
+                    for texto in plan_client.generar_stream(prompt, timeout=config.NUTRITION_LLM_TIMEOUT):
+                        for day, meals in parser.feed(texto):
+                            yield evento_sse("dia", {"dia": day, "comidas": meals})
+                    if not parser.dias:
+                        raise PlanInvalido("La IA no devolvió un JSON válido. Revisa el prompt o los datos.")
+                    recommendations = parser.dias
+                    plan_cache.put(clave, recommendations)
+                except Exception:
+                    # Completar con el generador local los días que la IA no llegó a enviar
+                    recommendations = dict(parser.dias)
+                    for day, meals in generar_plan_local(macros).items():
+                        if day not in recommendations:
+                            recommendations[day] = meals
+                            yield evento_sse("dia", {"dia": day, "comidas": meals, "fuente": "local"})
+
+            conn.insert_recommendations(data.id_usuario, recommendations)
+            yield evento_sse("fin", {"recomendaciones": recommendations})
+
+        except Exception as e:
+            yield evento_sse("error", {"detail": f"Error al generar plan: {str(e)}"})
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/api/nutrition-plan/jobs", status_code=202)
+def crear_trabajo_plan_alimenticio(data: NutritionPlanRequest):
+    try:
+        validar_objetivos(data)
+        job_id = nutrition_jobs.submit(data.model_dump(mode="json"))
+        return {"message": "Plan alimenticio en proceso", "job_id": job_id, "estado": "pendiente"}
+    except HTTPException:
+        raise
+    except ColaLlena as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al encolar el plan: {str(e)}")
+
+@router.get("/api/nutrition-plan/jobs/stats")
+def get_nutrition_jobs_stats():
+    return nutrition_jobs.stats()
+
+@router.get("/api/nutrition-plan/jobs/{job_id}")
+def get_trabajo_plan_alimenticio(job_id: str):
+    job = nutrition_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
+
+@router.get("/api/nutrition-plan/cache/stats")
+def get_nutrition_cache_stats():
+    return plan_cache.stats()
+    
+@router.get("/api/recommendations/daily")
+def get_daily_recommendations(
+    user_id: int = Query(..., description="ID del usuario"),):
+    try:
+        result = user_cache.get_or_load(("recomendaciones", user_id), lambda: conn.fetch_recommendations(user_id))
+
+        if result:
+            return {
+                "message": "Recomendaciones encontradas",
+                "recommendations": result["recomendaciones"],
+            }
+        else:
+            return {
+                "message": "No se encontraron recomendaciones para el usuario",
+                "recommendations": None,
+            }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar las recomendaciones: {str(e)}")
@@ -0,0 +1,172 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from dependencies import aconn, conn, leer_cacheado, verificar_admin
+from model.cache import TTLCache
+from model.export import EXPORTACIONES, FORMATOS, lotes_csv, lotes_ndjson
+from model.invalidation import TODAS
+from schema.Progress_schema import ProgressSchema
+from schema.ProgressBatch_schema import ProgressBatchItem
+from pydantic import TypeAdapter, ValidationError
+from typing import List
+import itertools
+from datetime import date
+import config
+
+router = APIRouter()
+
+analytics_cache = TTLCache(config.ANALYTICS_CACHE_SIZE, config.ANALYTICS_CACHE_TTL)
+
+def invalidar_analitica(entidad: str, clave):
+    if entidad == TODAS:
+        analytics_cache.clear()
+    elif entidad == "progreso":
+        analytics_cache.invalidate_where(lambda k: k[0] == clave)
+
+conn.suscribir(invalidar_analitica)
+
+def calentar():
+    # La analítica usa numpy; se importa en la primera consulta si no hay calentamiento
+    import model.progress_analytics
+
+@router.post("/api/progress")
+def register_progress(progress: ProgressSchema):
+    try:
+        # Llamar al método para guardar el progreso
+        success = conn.save_user_progress(
+            progress.usuario_id,
+            progress.ejercicio_id,
+            progress.repeticiones,
+            progress.peso
+        )
+
+        if success:
+            return {"message": "Avance registrado exitosamente"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al registrar el avance: {str(e)}")
+    
+progress_batch_adapter = TypeAdapter(List[ProgressBatchItem])
+
+@router.post("/api/progress/batch")
+async def register_progress_batch(request: Request):
+    # Acepta un arreglo JSON o NDJSON (una entrada por línea, Content-Type: application/x-ndjson)
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            entries = [ProgressBatchItem.model_validate_json(line) for line in body.splitlines() if line.strip()]
+        else:
+            entries = progress_batch_adapter.validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+    if len(entries) > config.PROGRESS_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"El lote supera el máximo de {config.PROGRESS_BATCH_MAX} registros")
+    if not entries:
+        return {"message": "Lote vacío", "recibidos": 0, "insertados": 0, "duplicados": 0}
+
+    try:
+        insertados = await run_in_threadpool(
+            conn.save_user_progress_bulk, [entry.model_dump() for entry in entries]
+        )
+        return {
+            "message": "Avances registrados exitosamente",
+            "recibidos": len(entries),
+            "insertados": insertados,
+            "duplicados": len(entries) - insertados,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al registrar los avances: {str(e)}")
+
+@router.get("/api/progress/{usuario_id}")
+async def get_user_progress(
+    usuario_id: int,
+    limit: int = Query(config.PROGRESS_PAGE_SIZE, ge=1, le=config.PROGRESS_PAGE_MAX, description="Registros por página"),
+    cursor: str = Query(None, description="Valor next_cursor de la página anterior"),
+    desde: date = Query(None, description="Fecha inicial (inclusive)"),
+    hasta: date = Query(None, description="Fecha final (inclusive)"),
+    ejercicio_id: int = Query(None, description="Filtrar por ejercicio"),
+):
+    try:
+        # Llamar al método para obtener una página del progreso del usuario
+        return await leer_cacheado(
+            ("progreso", usuario_id, limit, cursor, desde, hasta, ejercicio_id),
+            lambda: aconn.get_user_progress(usuario_id, limit, cursor, desde, hasta, ejercicio_id),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener el progreso: {str(e)}")
+
+@router.get("/api/progress/{usuario_id}/analytics")
+def get_user_progress_analytics(
+    usuario_id: int,
+    ventana: int = Query(4, ge=1, le=52, description="Semanas de la media móvil del 1RM"),
+):
+    try:
+        from model.progress_analytics import analizar_progreso
+        # Se recalcula solo después de registrar o eliminar avances del usuario
+        return analytics_cache.get_or_load(
+            (usuario_id, ventana),
+            lambda: analizar_progreso(conn.get_progress_series(usuario_id), ventana),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al calcular la analítica: {str(e)}")
+
+def respuesta_exportacion(datos: str, formato: str, usuario_id: int = None):
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {formato}")
+    entidades = list(EXPORTACIONES) if datos == "todo" else [datos]
+    if any(entidad not in EXPORTACIONES for entidad in entidades):
+        raise HTTPException(status_code=400, detail=f"Datos no soportados: {datos}")
+    if formato == "csv" and len(entidades) > 1:
+        raise HTTPException(status_code=400, detail="El formato CSV exporta un solo tipo de datos a la vez")
+
+    if formato == "csv":
+        entidad = entidades[0]
+        fragmentos = lotes_csv(EXPORTACIONES[entidad][0], conn.export_rows(entidad, usuario_id))
+    else:
+        fragmentos = itertools.chain.from_iterable(
+            lotes_ndjson(EXPORTACIONES[entidad][0], conn.export_rows(entidad, usuario_id), entidad if len(entidades) > 1 else None)
+            for entidad in entidades
+        )
+
+    # El primer fragmento se lee antes de responder para que un error de la base
+    # de datos todavía pueda devolverse como 500 y no como un stream cortado
+    try:
+        primero = next(fragmentos, "")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exportar los datos: {str(e)}")
+
+    nombre = f"{'usuario_' + str(usuario_id) if usuario_id is not None else 'socios'}_{datos}.{formato}"
+    return StreamingResponse(
+        itertools.chain([primero], fragmentos),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
+@router.get("/api/export/{usuario_id}")
+def export_user_history(
+    usuario_id: int,
+    datos: str = Query("todo", description="progreso, rutinas, recomendaciones o todo"),
+    formato: str = Query("ndjson", description="ndjson o csv"),
+):
+    return respuesta_exportacion(datos, formato, usuario_id)
+
+# Exporta los datos de todos los socios: solo con el token de administración
+@router.get("/api/admin/export", dependencies=[Depends(verificar_admin)])
+def export_all_members(
+    datos: str = Query("progreso", description="progreso, rutinas, recomendaciones o todo"),
+    formato: str = Query("ndjson", description="ndjson o csv"),
+):
+    return respuesta_exportacion(datos, formato)
+
+@router.delete("/api/progress/{progress_id}")
+def delete_user_progress(progress_id: int):
+    try:
+        success = conn.delete_user_progress(progress_id)
+        if success:
+            return {"message": "Registro eliminado exitosamente"}
+        else:
+            raise HTTPException(status_code=404, detail="Registro no encontrado")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al eliminar el registro: {str(e)}")
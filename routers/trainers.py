@@ -0,0 +1,79 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from dependencies import aconn, conn
+from model.cache import TTLCache
+from model.etag import etag_coincide, serializar_json
+from model.invalidation import TODAS
+import config
+
+router = APIRouter()
+
+# Guarda el cuerpo ya serializado y su ETag: claves ("entrenadores", specialty) y ("clase", id_horario)
+trainers_cache = TTLCache(config.TRAINERS_CACHE_SIZE, config.TRAINERS_CACHE_TTL)
+
+def invalidar_entrenadores(entidad: str, clave):
+    if entidad == TODAS:
+        trainers_cache.clear()
+    elif entidad == "entrenadores":
+        if clave is None:
+            trainers_cache.clear()
+        else:
+            # El listado sin filtro también incluye a esa especialidad
+            trainers_cache.invalidate(("entrenadores", clave))
+            trainers_cache.invalidate(("entrenadores", None))
+    elif entidad == "clase":
+        trainers_cache.invalidate(("clase", clave))
+
+conn.suscribir(invalidar_entrenadores)
+
+def respuesta_con_etag(request: Request, cuerpo: bytes, etag: str):
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cuerpo, media_type="application/json; charset=utf-8", headers=headers)
+
+@router.get("/api/trainers")
+async def get_trainers(request: Request, specialty: str = None):
+    try:
+        async def cargar():
+            return serializar_json(await aconn.get_trainers_by_specialty(specialty))
+
+        # Las peticiones simultáneas de una misma especialidad comparten una sola consulta
+        cacheado = await trainers_cache.aget_or_load(("entrenadores", specialty), cargar)
+        return respuesta_con_etag(request, *cacheado)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+@router.get("/api/class-details/{id_horario}")
+def get_class_details(request: Request, id_horario: int):
+    try:
+        def cargar():
+            trainer_details = conn.get_class_details_by_schedule(id_horario)
+            return serializar_json(trainer_details) if trainer_details else None
+
+        # También se guarda el resultado vacío para no repetir la consulta de horarios inexistentes
+        cacheado = trainers_cache.get_or_load(("clase", id_horario), cargar)
+        if not cacheado:
+            raise HTTPException(status_code=404, detail="Entrenador no encontrado")
+
+        return respuesta_con_etag(request, *cacheado)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/api/trainers/cache/invalidate")
+def invalidate_trainers_cache(specialty: str = None, id_horario: int = None):
+    # Sin parámetros se vacía todo (p. ej. después de editar entrenadores o horarios).
+    # La invalidación llega también a los demás workers.
+    if specialty is None and id_horario is None:
+        conn.invalidar("entrenadores", None)
+    if specialty is not None:
+        conn.invalidar("entrenadores", specialty)
+    if id_horario is not None:
+        conn.invalidar("clase", id_horario)
+    return {"message": "Caché de entrenadores invalidado"}
+
+@router.get("/api/trainers/cache/stats")
+def get_trainers_cache_stats():
+    return trainers_cache.stats()
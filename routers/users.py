@@ -0,0 +1,71 @@
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from starlette.concurrency import run_in_threadpool
+from dependencies import conn
+from model.password_hasher import PasswordHasher, PasswordHasherSaturado
+from model.metrics import metricas
+from schema.user_schema import UserSchema
+from schema.login_schema import LoginSchema
+from schema.UpdateUser_schema import UpdateUserSchema
+
+router = APIRouter()
+
+# El pool de bcrypt arranca con el primer registro o login (o en el calentamiento)
+password_hasher = PasswordHasher()
+
+metricas.agregar_recolector(lambda: metricas.fijar("password_hasher_pending", password_hasher.stats()["pendientes"]))
+
+def calentar():
+    password_hasher.calentar()
+
+def cerrar():
+    password_hasher.shutdown()
+
+@router.post("/api/user/insert")
+async def insert(user_data: UserSchema):
+    data = user_data.model_dump()
+    try:
+        data["password_hash"] = await password_hasher.hash(data["password_hash"])
+    except PasswordHasherSaturado as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+    await run_in_threadpool(conn.write, data)
+    return {"message": "Usuario creado exitosamente"}
+
+@router.post("/api/user/login")
+async def login(login_data: LoginSchema, background_tasks: BackgroundTasks):
+    user = await run_in_threadpool(conn.get_user_by_email, login_data.email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+    try:
+        valido, rehash = await password_hasher.verify(login_data.password_hash, user['password_hash'])
+    except PasswordHasherSaturado as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+    if valido:
+        if rehash:
+            # El hash usa un costo distinto al configurado: se regenera después de responder
+            background_tasks.add_task(
+                password_hasher.rehash,
+                login_data.password_hash,
+                lambda nuevo_hash: conn.update_password_hash(user["id"], nuevo_hash),
+            )
+        return {"message": "Login exitoso", "user_id": user["id"], "nombre": user["nombre"], "apellido": user["apellido"], "email": user["email"], "datos_completos": user["datos_completos"]}
+    raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+
+@router.get("/api/user/password-hasher/stats")
+def get_password_hasher_stats():
+    return password_hasher.stats()
+
+@router.put("/api/user/update-goals")
+def update_user_goals(update: UpdateUserSchema):
+    try:
+        # Llamar al método para realizar el update
+        success = conn.update_user_goals_in_db(
+            update.usuario_id,
+            update.objetivo,
+            update.nivel_experiencia
+        )
+
+        if success:
+            return {"message": "Objetivo y/o nivel actualizados exitosamente"}
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al actualizar los objetivos: {str(e)}")
@@ -0,0 +1,7 @@
+from datetime import datetime
+from typing import Optional
+from schema.Progress_schema import ProgressSchema
+
+class ProgressBatchItem(ProgressSchema):
+    fecha: Optional[datetime] = None
+    idempotency_key: Optional[str] = None
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import List
+
+class RoutineBatchItem(BaseModel):
+    user_id: int
+    objective: str
+    experience_level: str
+
+class RoutineBatchRequest(BaseModel):
+    rutinas: List[RoutineBatchItem]